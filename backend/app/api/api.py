@@ -1,9 +1,17 @@
-from fastapi import APIRouter
-from app.api.endpoints import chat, upload, analytics
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.endpoints import chat, upload, analytics, jobs
+from app.services.startup import readiness
 
 api_router = APIRouter()
 
+
+async def require_ready():
+    """503 + Retry-After while the background warm-up (models, Qdrant) is still running."""
+    if not readiness.ready:
+        raise HTTPException(status_code=503, detail="Service is warming up", headers={"Retry-After": "5"})
+
 # Підключаємо окремі файли з роутами
-api_router.include_router(chat.router, tags=["Chat"])
-api_router.include_router(upload.router, tags=["Files"])
-api_router.include_router(analytics.router, tags=["Analytics"])
\ No newline at end of file
+api_router.include_router(chat.router, tags=["Chat"], dependencies=[Depends(require_ready)])
+api_router.include_router(upload.router, tags=["Files"], dependencies=[Depends(require_ready)])
+api_router.include_router(jobs.router, tags=["Jobs"])
+api_router.include_router(analytics.router, tags=["Analytics"])
@@ -1,22 +1,20 @@
+import asyncio
 from fastapi import APIRouter
-import pandas as pd
-import os
-from app.core.config import settings
+from app.services.cache_service import response_cache, embedding_cache
+from app.services.analytics_service import analytics_engine
+from app.services.query_log import query_log
+from app.services.rerank_service import rerank_service
+from app.services.llm_service import llm_service
 
 router = APIRouter()
 
 @router.get("/analytics")
 async def get_analytics():
-    if not os.path.exists(settings.LOG_FILE):
-        return {"total": 0, "avg_latency": 0}
-    
-    try:
-        df = pd.read_csv(settings.LOG_FILE)
-        if df.empty: return {"total": 0}
-        
-        # (Тут твоя стара логіка аналітики)
-        total = len(df)
-        avg_lat = df["Latency"].mean() if "Latency" in df else 0
-        return {"total": total, "avg_latency": round(float(avg_lat), 2)}
-    except Exception:
-        return {"error": "Read failed"}
\ No newline at end of file
+    # Агрегати ведуться інкрементально: догортаємо лише рядки, записані після минулого разу (будь-яким воркером)
+    await asyncio.to_thread(query_log.sync_analytics)
+    return analytics_engine.snapshot()
+
+@router.get("/analytics/cache")
+async def get_cache_stats():
+    return {"responses": response_cache.stats(), "embeddings": embedding_cache.stats(), "log": query_log.stats(),
+            "rerank": rerank_service.stats(), "llm": llm_service.router.stats()}
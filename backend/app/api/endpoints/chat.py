@@ -1,73 +1,201 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schemas import QueryRequest, QueryResponse, FeedbackRequest
 from app.services.llm_service import llm_service
 from app.services.vector_service import vector_service
+from app.services.rerank_service import rerank_service
+from app.services.cache_service import response_cache
+from app.services.context_builder import plan_prompt
+from app.services.fusion import COSINE_KEY, SCORE_KIND_KEY
+from app.services.query_log import query_log
 import time
-import csv
-from datetime import datetime
+import json
 from app.core.config import settings
+from app.core.metrics import QUERY_STAGE_SECONDS, stage
 
 router = APIRouter()
 
+def _workspace(request: QueryRequest) -> str:
+    return request.workspace or settings.DEFAULT_WORKSPACE
+
+async def _retrieve(request: QueryRequest, user_query: str, timings: dict):
+    """Ембединг запиту + пошук у Qdrant, з замірами часу кожного етапу."""
+    with stage(QUERY_STAGE_SECONDS, "embed", timings):
+        try:
+            query_vector = await vector_service.embed_query(user_query)
+        except Exception as e:
+            print(f"⚠️ Embedding Error: {e}")
+            query_vector = None
+    # З переранжуванням беремо ширший список кандидатів, а в LLM іде менше, але кращих чанків
+    rerank = rerank_service.enabled and (request.rerank if request.rerank is not None else settings.RERANK_ENABLED)
+    with stage(QUERY_STAGE_SECONDS, "search", timings):
+        search_results = await vector_service.search(
+            user_query, limit=settings.RERANK_CANDIDATES if rerank else 5, query_vector=query_vector,
+            mode=request.retrieval_mode, dense_weight=request.dense_weight, sparse_weight=request.sparse_weight,
+            rrf_k=request.rrf_k, workspace=_workspace(request), filenames=request.filenames,
+            extensions=request.extensions
+        ) if query_vector else []
+    if rerank and search_results:
+        with stage(QUERY_STAGE_SECONDS, "rerank", timings):
+            search_results = await rerank_service.rerank(user_query, search_results, settings.RERANK_TOP_K)
+    return search_results, query_vector
+
+def _format_sources(search_results) -> list:
+    return [
+        {
+            "content": hit.payload.get('content', '')[:150] + "...",
+            # score — косинусна схожість (None, якщо хіт знайшов лише BM25); rank_score — скор, за яким відсортовано
+            "score": hit.payload.get(COSINE_KEY),
+            "rank_score": hit.score,
+            "score_kind": hit.payload.get(SCORE_KIND_KEY, "cosine"),
+            "filename": hit.payload.get('filename', 'Unknown'),
+            "page": hit.payload.get('page'),
+            "page_end": hit.payload.get('page_end')
+        }
+        for hit in search_results
+    ]
+
+def _cache_context_key(request: QueryRequest, search_results) -> str:
+    # Відповідь залежить і від попередніх реплік, тому вони теж входять у ключ
+    history = "\x1e".join(f"{m.role}:{m.content}" for m in request.messages[:-1])
+    return response_cache.context_key(
+        request.thinking_mode, request.temperature, [hit.id for hit in search_results], history, _workspace(request)
+    )
+
+def _source_files(request: QueryRequest, search_results) -> set:
+    workspace = _workspace(request)
+    return {(workspace, hit.payload.get('filename', 'Unknown')) for hit in search_results}
+
 @router.post("/query", response_model=QueryResponse)
 async def handle_query(request: QueryRequest):
     start_time = time.time()
-    
+
     # 1. Отримуємо текст запиту
     user_query = request.messages[-1].content
-    
+
     # 2. Шукаємо контекст (Vector DB)
-    search_results = vector_service.search(user_query, limit=5)
-    
-    context_str = ""
-    if search_results:
-        parts = [f"Source ({hit.payload.get('filename', '?')}): {hit.payload.get('content', '')}" for hit in search_results]
-        context_str = "\n\n".join(parts)
-
-    # 3. Генеруємо відповідь (LLM Service)
-    try:
-        response_text, used_model = await llm_service.generate_response(request, context_str)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
+    timings = {}
+    search_results, query_vector = await _retrieve(request, user_query, timings)
+    # Контекст + історія під токен-бюджет моделі (злиття сусідніх чанків, без дублів перекриття)
+    with stage(QUERY_STAGE_SECONDS, "context", timings):
+        plan = plan_prompt(request, search_results, llm_service.prompt_models(request))
+
+    # 3. Кеш відповідей, потім LLM
+    cache_key = _cache_context_key(request, search_results)
+    cached = response_cache.get(user_query, cache_key, query_vector) if settings.CACHE_ENABLED else None
+    if cached:
+        response_text, used_model = cached.response_text, cached.model
+    else:
+        try:
+            with stage(QUERY_STAGE_SECONDS, "llm", timings):
+                response_text, used_model = await llm_service.generate_response(plan.request, plan.context_str)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
+        if settings.CACHE_ENABLED:
+            response_cache.put(user_query, cache_key, response_text, used_model, _source_files(request, search_results), query_vector)
 
     latency = time.time() - start_time
+    QUERY_STAGE_SECONDS.observe(latency, stage="total")
     query_id = str(int(time.time() * 1000))
 
-    # 4. Логування (CSV)
-    try:
-        with open(settings.LOG_FILE, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                datetime.now().isoformat(), user_query, response_text, 
-                f"{latency:.2f}", used_model, "", query_id, request.thinking_mode
-            ])
-    except Exception as e:
-        print(f"⚠️ Log Error: {e}")
+    # 4. Логування (через чергу, запис у фоні)
+    query_log.log_query(
+        query_id, user_query, response_text, used_model, request.thinking_mode, request.mode,
+        latency, timings, cached=cached is not None
+    )
 
     # 5. Формуємо відповідь
-    sources_data = [
-        {"content": hit.payload.get('content', '')[:150] + "...", "score": hit.score, "filename": hit.payload.get('filename', 'Unknown')}
-        for hit in search_results
-    ]
-
     return QueryResponse(
         response_text=response_text,
-        sources=sources_data,
+        sources=_format_sources(search_results),
         latency=latency,
         query_id=query_id,
-        mode_used=request.thinking_mode
+        mode_used=request.thinking_mode,
+        cached=cached is not None,
+        timings=timings,
+        prompt_tokens=plan.prompt_tokens
+    )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/query/stream")
+async def handle_query_stream(request: QueryRequest):
+    """
+    Server-Sent Events variant of /query.
+    Frames: `sources` -> many `token` -> `done` (or `error`).
+    """
+    start_time = time.time()
+    user_query = request.messages[-1].content
+
+    timings = {}
+    search_results, query_vector = await _retrieve(request, user_query, timings)
+    # Контекст + історія під токен-бюджет моделі (злиття сусідніх чанків, без дублів перекриття)
+    with stage(QUERY_STAGE_SECONDS, "context", timings):
+        plan = plan_prompt(request, search_results, llm_service.prompt_models(request))
+
+    cache_key = _cache_context_key(request, search_results)
+    cached = response_cache.get(user_query, cache_key, query_vector) if settings.CACHE_ENABLED else None
+
+    async def event_stream():
+        yield _sse("sources", {"sources": _format_sources(search_results)})
+
+        parts = []
+        used_model = None
+        first_token_at = None
+        if cached:
+            first_token_at = time.time()
+            used_model = cached.model
+            parts.append(cached.response_text)
+            yield _sse("token", {"delta": cached.response_text})
+        else:
+            llm_start = time.perf_counter()
+            try:
+                async for delta, model_name in llm_service.stream_response(plan.request, plan.context_str):
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                    used_model = model_name
+                    parts.append(delta)
+                    yield _sse("token", {"delta": delta})
+            except Exception as e:
+                yield _sse("error", {"detail": f"AI Error: {str(e)}"})
+                return
+            # Не через stage(): span не можна тримати відкритим між yield стріму
+            timings["llm"] = time.perf_counter() - llm_start
+            QUERY_STAGE_SECONDS.observe(timings["llm"], stage="llm")
+            if settings.CACHE_ENABLED:
+                response_cache.put(user_query, cache_key, "".join(parts), used_model, _source_files(request, search_results), query_vector)
+
+        latency = time.time() - start_time
+        query_id = str(int(time.time() * 1000))
+        ttft = (first_token_at - start_time) if first_token_at else latency
+        QUERY_STAGE_SECONDS.observe(ttft, stage="ttft")
+        QUERY_STAGE_SECONDS.observe(latency, stage="total")
+
+        yield _sse("done", {
+            "latency": latency,
+            "ttft": ttft,
+            "model": used_model,
+            "query_id": query_id,
+            "mode_used": request.thinking_mode,
+            "cached": cached is not None,
+            "timings": timings,
+            "prompt": plan.stats()
+        })
+
+        # Лог пишемо один раз, коли стрім повністю завершився
+        query_log.log_query(
+            query_id, user_query, "".join(parts), used_model, request.thinking_mode, request.mode,
+            latency, timings, ttft=ttft, cached=cached is not None
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @router.post("/feedback")
 async def log_feedback(data: FeedbackRequest):
-    # (Тут проста логіка логування, можна залишити як було, або теж винести в сервіс)
-    try:
-        with open(settings.LOG_FILE, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                datetime.now().isoformat(), data.query, data.response, 
-                f"{data.latency:.2f}", settings.MODEL_NAME, data.feedback, data.query_id, "feedback"
-            ])
-        return {"status": "logged"}
-    except Exception as e:
-        return {"status": "error", "detail": str(e)}
\ No newline at end of file
+    query_log.log_feedback(data.query_id, data.feedback, data.query, data.response, data.latency)
+    return {"status": "logged"}
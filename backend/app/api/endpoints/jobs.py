@@ -0,0 +1,24 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from typing import List, Optional
+from app.core.config import settings
+from app.services.job_service import job_manager
+from app.models.schemas import WORKSPACE_PATTERN, JobResponse
+
+router = APIRouter()
+
+@router.post("/jobs/upload", response_model=JobResponse, status_code=202)
+async def enqueue_upload(file: UploadFile = File(...), workspace: Optional[str] = Form(None, pattern=WORKSPACE_PATTERN)):
+    """Як /upload, але повертає job одразу; індексація йде у фонових процесах."""
+    if not file.filename: raise HTTPException(status_code=400, detail="No filename")
+    job_id = await job_manager.submit(file, workspace or settings.DEFAULT_WORKSPACE)
+    return await job_manager.get(job_id)
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(limit: int = 50):
+    return await job_manager.list(limit)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    return job
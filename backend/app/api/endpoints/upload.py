@@ -1,93 +1,118 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.parser_service import parse_file # Якщо ти перейменував файл, зміни імпорт
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from typing import Optional
+from app.services.ingest_service import ingest_upload, ingest_archive, ingest_tree, tree_prefix, EmptyFileError
+from app.services.parser_service import ParseError
+from app.services.source_tree import is_archive, resolve_allowed_directory
 from app.services.vector_service import vector_service
-from app.models.schemas import FileUploadResponse, DeleteFileRequest
+from app.services.cache_service import response_cache
+from app.services.file_catalog import file_catalog
+from app.core.config import settings
+from app.core.metrics import INGEST_STAGE_SECONDS, stage
+from app.models.schemas import (
+    WORKSPACE_PATTERN, FileUploadResponse, DeleteFileRequest, DirectoryIngestRequest, TreeIngestResponse,
+)
+import asyncio
 import time
 
 router = APIRouter()
 
-def chunk_text(text: str, chunk_size: int = 2000, overlap: int = 200):
-    chunks = []
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
-
 @router.post("/upload", response_model=FileUploadResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), workspace: Optional[str] = Form(None, pattern=WORKSPACE_PATTERN)):
     start_time = time.time()
     if not file.filename: raise HTTPException(status_code=400, detail="No filename")
-    
-    # 1. Parsing
-    try:
-        text_content = await parse_file(file)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Parse error: {e}")
-
-    if not text_content.strip(): raise HTTPException(status_code=400, detail="Empty file")
+    workspace = workspace or settings.DEFAULT_WORKSPACE
 
-    # 2. Chunking
-    chunks = chunk_text(text_content)
-
-    # 3. Indexing
+    # Parsing -> Chunking -> Indexing одним потоком, без читання файлу цілком у пам'ять
     try:
-        for i, chunk in enumerate(chunks):
-            vector_service.add_document(
-                text=chunk, 
-                meta={"filename": file.filename, "chunk_index": i, "total_chunks": len(chunks)}
-            )
+        stats = await ingest_upload(file, workspace)
+    except EmptyFileError:
+        raise HTTPException(status_code=400, detail="Empty file")
+    except ParseError as e:
+        raise HTTPException(status_code=400, detail=f"Parse error: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Index error: {e}")
+    if stats["updated"] or stats["removed"]:
+        response_cache.invalidate_files([(workspace, file.filename)])
+    with stage(INGEST_STAGE_SECONDS, "catalog"):
+        await asyncio.to_thread(file_catalog.upsert, file.filename, stats["chunks"], stats["size_bytes"], workspace=workspace)
 
     duration = time.time() - start_time
+    INGEST_STAGE_SECONDS.observe(duration, stage="total")
     return FileUploadResponse(
         status="success", 
         filename=file.filename, 
-        chunks_count=len(chunks), 
-        duration=duration
+        workspace=workspace,
+        chunks_count=stats["chunks"], 
+        duration=duration,
+        skipped=stats["skipped"],
+        updated=stats["updated"],
+        removed=stats["removed"]
     )
 
+@router.post("/upload/archive", response_model=TreeIngestResponse)
+async def upload_archive(file: UploadFile = File(...), prefix: Optional[str] = Form(None),
+                         workspace: Optional[str] = Form(None, pattern=WORKSPACE_PATTERN)):
+    """Zip / tar з репозиторієм: розпаковуємо, обходимо паралельно, індексуємо одним батчевим пайплайном."""
+    if not file.filename: raise HTTPException(status_code=400, detail="No filename")
+    if not is_archive(file.filename):
+        raise HTTPException(status_code=400, detail="Expected a .zip or .tar(.gz/.bz2/.xz) archive")
+    workspace = workspace or settings.DEFAULT_WORKSPACE
+    try:
+        report = await ingest_archive(file, prefix, workspace)
+    except ParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Index error: {e}")
+    return TreeIngestResponse(status="success", source=file.filename, workspace=workspace, **report)
+
+@router.post("/upload/directory", response_model=TreeIngestResponse)
+async def upload_directory(req: DirectoryIngestRequest):
+    """Каталог на сервері (лише всередині INGEST_ROOTS)."""
+    try:
+        root = resolve_allowed_directory(req.path)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    workspace = req.workspace or settings.DEFAULT_WORKSPACE
+    try:
+        report = await ingest_tree(root, tree_prefix(root) if req.prefix is None else req.prefix, workspace)
+    except ParseError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Index error: {e}")
+    return TreeIngestResponse(status="success", source=req.path, workspace=workspace, **report)
+
 @router.get("/files")
-async def list_files():
-    # Простий обхід через scroll (можна оптимізувати в майбутньому)
+async def list_files(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                     workspace: Optional[str] = Query(None, pattern=WORKSPACE_PATTERN)):
+    # Читаємо з каталогу файлів, а не скролимо всю колекцію
+    workspace = workspace or settings.DEFAULT_WORKSPACE
     try:
-        unique = set()
-        offset = None
-        while True:
-            res = vector_service.client.scroll(
-                collection_name=vector_service.collection_name, 
-                limit=100, 
-                with_payload=True, 
-                with_vectors=False, 
-                offset=offset
-            )
-            points, offset = res
-            for p in points:
-                if p.payload: unique.add(p.payload.get("filename", "Unknown"))
-            if offset is None: break
-        return {"files": list(unique)}
+        items = await asyncio.to_thread(file_catalog.list, offset, limit, workspace)
+        return {
+            "files": [item["filename"] for item in items],
+            "items": items,
+            "workspace": workspace,
+            "total": await asyncio.to_thread(file_catalog.count, workspace),
+            "offset": offset,
+            "limit": limit,
+        }
     except Exception as e:
         return {"files": [], "error": str(e)}
 
+@router.get("/workspaces")
+async def list_workspaces():
+    """Workspaces that have indexed files, with file / chunk counts."""
+    return {"workspaces": await asyncio.to_thread(file_catalog.workspaces), "default": settings.DEFAULT_WORKSPACE}
+
 @router.post("/delete_file")
 async def delete_file(req: DeleteFileRequest):
-    # Тут потрібна логіка видалення через vector_service, 
-    # але поки можна залишити прямий виклик клієнта або додати метод в сервіс.
-    # Для швидкості:
-    from qdrant_client.http import models
+    workspace = req.workspace or settings.DEFAULT_WORKSPACE
     try:
-        vector_service.client.delete(
-            collection_name=vector_service.collection_name,
-            points_selector=models.FilterSelector(
-                filter=models.Filter(must=[
-                    models.FieldCondition(key="filename", match=models.MatchValue(value=req.filename))
-                ])
-            )
-        )
-        return {"status": "deleted", "filename": req.filename}
+        await vector_service.delete_file(req.filename, workspace)
+        await asyncio.to_thread(file_catalog.remove, req.filename, workspace)
+        response_cache.invalidate_files([(workspace, req.filename)])
+        return {"status": "deleted", "filename": req.filename, "workspace": workspace}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
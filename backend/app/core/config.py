@@ -9,23 +9,134 @@ class Settings:
 
     # --- API KEYS ---
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    GROQ_BASE_URL: str = os.getenv("GROQ_BASE_URL", "")  # "" = api.groq.com; для stub-сервера: http://127.0.0.1:9100
     
     # --- SENTRY ---
     # Додаємо DSN, бо main.py його шукає
     SENTRY_DSN: str = os.getenv("SENTRY_DSN", "https://162733163284ed4d753c832e2c17bdd1@o4510608367747072.ingest.de.sentry.io/4510608375873616")
+    # Частка запитів з трейсом / профілем (1.0 = кожен запит, відчутний overhead); 0 = вимкнено
+    SENTRY_TRACES_SAMPLE_RATE: float = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", 0.1))
+    SENTRY_PROFILES_SAMPLE_RATE: float = float(os.getenv("SENTRY_PROFILES_SAMPLE_RATE", 0.0))  # частка від уже трейснутих
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # GET /metrics (Prometheus)
 
     # --- DATABASE ---
     QDRANT_HOST: str = os.getenv("QDRANT_HOST", "localhost")
     QDRANT_PORT: int = int(os.getenv("QDRANT_PORT", 6333))
-    COLLECTION_NAME: str = "Vectrieve_knowledge"
+    QDRANT_LOCATION: str = os.getenv("QDRANT_LOCATION", "")  # ":memory:" або шлях = вбудований Qdrant для бенчмарків / офлайну (без /jobs: воркери ходять у сервер); "" = сервер
+    COLLECTION_NAME: str = "Vectrieve_knowledge"  # може бути alias (див. scripts/migrate_collection.py)
+    # Профіль зберігання нової колекції: memory | scalar | binary | disk (див. collection_profiles.py)
+    COLLECTION_PROFILE: str = os.getenv("COLLECTION_PROFILE", "memory")
+    HNSW_M: int = int(os.getenv("HNSW_M", 0))  # 0 = за замовчуванням Qdrant (16)
+    HNSW_EF_CONSTRUCT: int = int(os.getenv("HNSW_EF_CONSTRUCT", 0))  # 0 = за замовчуванням Qdrant (100)
+    HNSW_EF: int = int(os.getenv("HNSW_EF", 0))  # ef під час пошуку; 0 = за замовчуванням Qdrant
+    QUANTIZATION_OVERSAMPLING: float = float(os.getenv("QUANTIZATION_OVERSAMPLING", 0))  # 0 = значення профілю
+    # Простір (команда / проєкт): поле payload `workspace` з keyword-індексом, пошук фільтрується по ньому.
+    # Точки, створені до появи просторів, при старті потрапляють сюди
+    DEFAULT_WORKSPACE: str = os.getenv("DEFAULT_WORKSPACE", "default")
+    COLLECTION_REFRESH_SECONDS: int = int(os.getenv("COLLECTION_REFRESH_SECONDS", 30))  # 0 = без фонового оновлення
+    STARTUP_RETRY_MAX_SECONDS: float = float(os.getenv("STARTUP_RETRY_MAX_SECONDS", 30))  # стеля backoff між спробами етапів старту
+    STARTUP_MAX_ATTEMPTS: int = int(os.getenv("STARTUP_MAX_ATTEMPTS", 10))  # Спроби для моделей / каталогу при старті (0 = без ліміту), далі /health = 503
+
+    # --- INDEXING ---
+    EMBED_MODEL_NAME: str = "BAAI/bge-small-en-v1.5"
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", 64))  # Скільки чанків за один прогін ONNX
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", 256))  # Скільки точок за один запит до Qdrant
+    EMBED_WORKERS: int = int(os.getenv("EMBED_WORKERS", 2))  # Скільки ембедингів рахуємо паралельно
+    UPSERT_WAIT: bool = os.getenv("UPSERT_WAIT", "true").lower() == "true"  # False = не чекати індексації
+    EMBED_THREADS: int = int(os.getenv("EMBED_THREADS", 0))  # intra-op потоки ONNX у API / embed-сервері; 0 = всі ядра
+    # Спільний процес ембедингів для кількох воркерів (gunicorn.conf.py): "" = модель у кожному процесі
+    EMBED_SERVER_SOCKET: str = os.getenv("EMBED_SERVER_SOCKET", "")
+    EMBED_SERVER_MAX_BATCH: int = int(os.getenv("EMBED_SERVER_MAX_BATCH", 256))  # Текстів в одному виклику ONNX
+    EMBED_SERVER_MAX_WAIT_MS: float = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", 2))  # Вікно для зшивання запитів у батч
+    EMBED_SERVER_WAIT_SECONDS: float = float(os.getenv("EMBED_SERVER_WAIT_SECONDS", 300))  # Скільки API чекає на старт сервера
+
+    # --- CHUNKING ---
+    CHUNKING_STRATEGY: str = os.getenv("CHUNKING_STRATEGY", "auto")  # auto | code | prose | window (старі вікна по 2000 символів)
+    CHUNK_TARGET_TOKENS: int = int(os.getenv("CHUNK_TARGET_TOKENS", 350))
+    CHUNK_MAX_TOKENS: int = int(os.getenv("CHUNK_MAX_TOKENS", 500))  # bge-small обрізає все, що довше за 512 токенів
+
+    # --- RETRIEVAL ---
+    SPARSE_MODEL_NAME: str = os.getenv("SPARSE_MODEL_NAME", "Qdrant/bm25")  # "" = без BM25, тільки dense
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")  # dense | sparse | hybrid
+    HYBRID_PREFETCH: int = int(os.getenv("HYBRID_PREFETCH", 20))  # Скільки кандидатів бере кожна гілка перед RRF
+    RRF_K: int = int(os.getenv("RRF_K", 60))
+    SPARSE_SCORE_THRESHOLD: float = float(os.getenv("SPARSE_SCORE_THRESHOLD", 1.0))  # Мінімальний BM25-скор (0 = без порогу), щоб випадкові збіги слів не потрапляли в RRF
+
+    # --- RERANK ---
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL_NAME: str = os.getenv("RERANK_MODEL_NAME", "Xenova/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", 50))  # Скільки хітів беремо з Qdrant на переранжування
+    RERANK_TOP_K: int = int(os.getenv("RERANK_TOP_K", 3))  # Скільки чанків іде в LLM після переранжування
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", 16))
+    RERANK_BUDGET_MS: int = int(os.getenv("RERANK_BUDGET_MS", 300))  # Не встигли — лишаємо порядок з векторного пошуку
+    RERANK_CACHE_SIZE: int = int(os.getenv("RERANK_CACHE_SIZE", 20000))
+
+    # --- PDF EXTRACTION ---
+    PDF_EXTRACT_WORKERS: int = int(os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))  # 1 = без пулу процесів
+    PDF_PAGES_PER_SHARD: int = int(os.getenv("PDF_PAGES_PER_SHARD", 8))
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 24))  # Менші PDF читаємо в одному процесі
+
+    # --- INGESTION JOBS ---
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", 2))  # Окремі процеси, кожен зі своєю ONNX-моделлю
+    INGEST_EMBED_THREADS: int = int(os.getenv("INGEST_EMBED_THREADS", 0))  # ONNX-потоки на воркер; 0 = ядра / INGEST_WORKERS
+    JOBS_DB: str = os.getenv("JOBS_DB", "ingest_jobs.db")
+    JOBS_DIR: str = os.getenv("JOBS_DIR", "ingest_queue")  # Тут лежать файли, що чекають на обробку
+    CATALOG_DB: str = os.getenv("CATALOG_DB", "file_catalog.db")  # Реєстр проіндексованих файлів для /files
+
+    # --- REPOSITORY / ARCHIVE INGESTION ---
+    # Каталоги сервера, які можна індексувати через /upload/directory (через кому); порожньо = вимкнено
+    INGEST_ROOTS: list = [p.strip() for p in os.getenv("INGEST_ROOTS", "").split(",") if p.strip()]
+    INGEST_EXCLUDE_DIRS: list = [d.strip() for d in os.getenv("INGEST_EXCLUDE_DIRS", ".git,node_modules,__pycache__,.venv,venv").split(",") if d.strip()]
+    INGEST_MAX_FILE_MB: float = float(os.getenv("INGEST_MAX_FILE_MB", 5))  # Більші файли (бандли, дампи) пропускаємо
+    INGEST_MAX_ARCHIVE_MB: float = float(os.getenv("INGEST_MAX_ARCHIVE_MB", 200))
+    INGEST_MAX_EXTRACTED_MB: float = float(os.getenv("INGEST_MAX_EXTRACTED_MB", 1000))  # Захист від zip-бомб
+    INGEST_MAX_FILES: int = int(os.getenv("INGEST_MAX_FILES", 20000))
+    INGEST_WALK_WORKERS: int = int(os.getenv("INGEST_WALK_WORKERS", 8))  # Потоки для обходу каталогів
+    INGEST_PARSE_WORKERS: int = int(os.getenv("INGEST_PARSE_WORKERS", max(2, os.cpu_count() or 1)))  # Файли, що парсяться наперед
+
+    # --- ANSWER CACHE ---
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", 1000))
+    CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", 64))
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", 3600))
+    CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("CACHE_SIMILARITY_THRESHOLD", 0.97))  # 0 = тільки точні збіги
+    EMBED_CACHE_SIZE: int = int(os.getenv("EMBED_CACHE_SIZE", 4096))  # Кеш ембедингів запитів
 
     # --- MODELS ---
     MODEL_NAME: str = "llama-3.3-70b-versatile"
     LOCAL_MODEL_NAME: str = "qwen2.5-coder:7b"  # <-- Було відсутнє
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
 
+    # --- LLM ROUTER ---
+    GROQ_TIMEOUT_SECONDS: float = float(os.getenv("GROQ_TIMEOUT_SECONDS", 20))
+    GROQ_MAX_RETRIES: int = int(os.getenv("GROQ_MAX_RETRIES", 0))  # Повтори робить роутер (fallback / hedge)
+    CLOUD_MAX_CONCURRENCY: int = int(os.getenv("CLOUD_MAX_CONCURRENCY", 16))
+    LOCAL_MAX_CONCURRENCY: int = int(os.getenv("LOCAL_MAX_CONCURRENCY", 2))  # На весь сервер: Ollama одна, більше вона все одно ставить у чергу
+    API_WORKERS: int = int(os.getenv("API_WORKERS", 1))  # Процесів API (gunicorn.conf.py виставляє сам); LOCAL_MAX_CONCURRENCY ділиться між ними
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))  # Скільки чекати вільного слота провайдера
+    LLM_HEDGE_MS: float = float(os.getenv("LLM_HEDGE_MS", 0))  # Немає першого токена з хмари за N мс — паралельно стартуємо local; 0 = вимкнено
+    LLM_BREAKER_FAILURES: int = int(os.getenv("LLM_BREAKER_FAILURES", 3))  # Помилок підряд до відкриття circuit breaker
+    LLM_BREAKER_RESET_SECONDS: float = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+    LLM_EWMA_ALPHA: float = float(os.getenv("LLM_EWMA_ALPHA", 0.2))
+
+    # --- PROMPT BUDGET ---
+    # Максимум токенів промпта (system + контекст + історія + питання) для кожної моделі:
+    # розмір промпта — головне, від чого залежить prefill і латентність LLM
+    PROMPT_TOKEN_BUDGETS: dict = {
+        MODEL_NAME: int(os.getenv("CLOUD_PROMPT_TOKENS", 6000)),
+        LOCAL_MODEL_NAME: int(os.getenv("LOCAL_PROMPT_TOKENS", 3000)),
+    }
+    DEFAULT_PROMPT_TOKENS: int = int(os.getenv("DEFAULT_PROMPT_TOKENS", 4000))
+    CONTEXT_TOKEN_SHARE: float = float(os.getenv("CONTEXT_TOKEN_SHARE", 0.6))  # Частка бюджету під знайдений контекст
+
     # --- LOGGING ---
-    LOG_FILE: str = "chat_logs.csv" # <-- Було відсутнє
+    LOG_FILE: str = "chat_logs.csv" # Старий CSV-лог, лише для імпорту (scripts/import_csv_logs.py)
+    LOGS_DB: str = os.getenv("LOGS_DB", "logs.db")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # Якщо диск не встигає — рядки відкидаються
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", 500))
+    LOG_FLUSH_SECONDS: float = float(os.getenv("LOG_FLUSH_SECONDS", 1.0))
+    ANALYTICS_SNAPSHOT: str = os.getenv("ANALYTICS_SNAPSHOT", "analytics_snapshot.json")  # Агрегати для /analytics
+    ANALYTICS_SNAPSHOT_SECONDS: int = int(os.getenv("ANALYTICS_SNAPSHOT_SECONDS", 30))
 
     # --- THINKING MODES (Критично для llm_service) ---
     THINKING_MODES: dict = {
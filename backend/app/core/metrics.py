@@ -0,0 +1,109 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import sentry_sdk
+
+# Секунди: від ~1 мс (ембединг з кешу, запис логу) до хвилини (повільна генерація)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus text format, without the
+    prometheus_client dependency. observe() is a bisect and three additions under
+    a lock, so it is cheap enough to call on every request and from worker threads.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict[tuple, dict]:
+        """{labels: {"count", "sum", "buckets": [(le, cumulative count), ...]}}"""
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        result = {}
+        for key, values in series.items():
+            cumulative, running = [], 0
+            for le, n in zip(self.buckets + (float("inf"),), values[:-1]):
+                running += n
+                cumulative.append((le, running))
+            result[key] = {"count": running, "sum": values[-1], "buckets": cumulative}
+        return result
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, data in sorted(self.snapshot().items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            for le, count in data["buckets"]:
+                le_label = "+Inf" if le == float("inf") else repr(le)
+                bucket_labels = ",".join(labels + ['le="%s"' % le_label])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {data['sum']}")
+            lines.append(f"{self.name}_count{suffix} {data['count']}")
+        return lines
+
+
+QUERY_STAGE_SECONDS = Histogram(
+    "vectrieve_query_stage_seconds",
+    "Time spent in each /query stage (embed, search, rerank, context, llm, ttft, log_write, total).",
+    ("stage",),
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "vectrieve_ingest_stage_seconds",
+    "Time spent in each upload stage (spool, chunk, embed, upsert, catalog, total).",
+    ("stage",),
+)
+LLM_SECONDS = Histogram(
+    "vectrieve_llm_seconds",
+    "LLM time to first token and total generation time, per provider.",
+    ("provider", "phase"),
+)
+
+REGISTRY = (QUERY_STAGE_SECONDS, INGEST_STAGE_SECONDS, LLM_SECONDS)
+
+
+@contextmanager
+def stage(histogram: Histogram, name: str, timings: dict = None):
+    """
+    Times one pipeline stage: observes the histogram, stores the duration in
+    `timings` (the per-request breakdown returned to the client) and opens a
+    Sentry span (only recorded when the request's trace is sampled).
+    """
+    start = time.perf_counter()
+    with sentry_sdk.start_span(op=name):
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed, stage=name)
+            if timings is not None:
+                timings[name] = elapsed
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
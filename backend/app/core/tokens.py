@@ -0,0 +1,52 @@
+import re
+import numpy as np
+
+# Кожні 4 символи слова / числа та кожен символ пунктуації — приблизно так ріжуть текст BPE-токенайзери
+_PIECES = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Класи ASCII-символів для векторної оцінки; усе не-ASCII вважаємо літерами
+_ASCII_WORD = np.array([chr(c).isalnum() or chr(c) == "_" for c in range(128)])
+_ASCII_PUNCT = np.array([not (chr(c).isalnum() or chr(c) == "_" or chr(c).isspace()) for c in range(128)])
+
+# Службові токени на кожне повідомлення чату (роль, розділювачі)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast tokenizer-free estimate for Llama/Qwen-style BPE: a word costs ~1 token
+    per 4 characters, each punctuation mark is its own token. Slightly pessimistic
+    on English prose, close on code, and needs no model download.
+    """
+    if not text:
+        return 0
+    return len(_PIECES.findall(text))
+
+
+def line_token_counts(lines: list[str]) -> list[int]:
+    """
+    estimate_tokens for many lines in one numpy pass over their code points (what
+    the chunker calls for every line of every file). Exact for ASCII; non-ASCII
+    characters all count as letters.
+    """
+    if not lines:
+        return []
+    cp = np.frombuffer("".join(lines).encode("utf-32-le"), dtype=np.uint32)
+    ascii_cp = np.minimum(cp, 127)
+    is_ascii = cp < 128
+    word = ~is_ascii | _ASCII_WORD[ascii_cp]
+    punct = is_ascii & _ASCII_PUNCT[ascii_cp]
+
+    # Позиція символу всередині слова: токен починається на кожному 4-му
+    positions = np.arange(len(cp))
+    starts = word & ~np.concatenate(([False], word[:-1]))
+    run_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    marks = punct | (word & ((positions - run_start) % 4 == 0))
+
+    totals = np.concatenate(([0], np.cumsum(marks)))
+    ends = np.cumsum([len(line) for line in lines])
+    return np.diff(totals[np.concatenate(([0], ends))]).tolist()
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
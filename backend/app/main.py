@@ -1,19 +1,42 @@
 import sentry_sdk
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.metrics import render_metrics
 from app.api.api import api_router  # Ми створимо цей файл нижче
+from app.services.vector_service import vector_service
+from app.services.job_service import job_manager
+from app.services.query_log import query_log
+from app.services.rerank_service import rerank_service
+from app.services.parser_service import shutdown_pdf_pool
+from app.services.startup import readiness
 
 # 1. Sentry Init
 sentry_sdk.init(
     dsn=settings.SENTRY_DSN,
-    traces_sample_rate=1.0,
-    _experiments={"profiles_sample_rate": 1.0},
+    traces_sample_rate=settings.SENTRY_TRACES_SAMPLE_RATE,
+    profiles_sample_rate=settings.SENTRY_PROFILES_SAMPLE_RATE,
     send_default_pii=True
 )
 
 # 2. App Setup
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Моделі, Qdrant і каталог готуються у фоні: порт відкривається одразу, /health/ready каже коли готово
+    readiness.start()
+    job_manager.start()
+    query_log.start()
+    yield
+    await readiness.stop()
+    query_log.stop()
+    await job_manager.stop()
+    shutdown_pdf_pool()
+    rerank_service.close()
+    await vector_service.close()
+
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
 
 # 3. Middleware
 app.add_middleware(
@@ -29,7 +52,22 @@ app.include_router(api_router)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "version": settings.VERSION, "mode": "Refactored 🚀"}
+    """Liveness: the process is up and serving, even while models are still loading. 503 once warm-up gave up."""
+    body = {"status": "error" if readiness.failed else "ok", "version": settings.VERSION, "mode": "Refactored 🚀",
+            "ready": readiness.ready}
+    return JSONResponse(body, status_code=503 if readiness.failed else 200)
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: models loaded, collection reachable. 503 until then (and while Qdrant is retried)."""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text format: per-stage latency histograms for /query, uploads and LLM providers."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
+
+# Ім'я простору (workspace): латиниця, цифри, "_", "-", "."; None у запитах = settings.DEFAULT_WORKSPACE
+WORKSPACE_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
 
 class ChatMessage(BaseModel):
     role: str = Field(..., pattern="^(user|assistant|system)$")
@@ -10,8 +13,102 @@ class QueryRequest(BaseModel):
     # New fields (optional, so that the old code does not break)
     temperature: Optional[float] = 0.3
     model: Optional[str] = None 
+    thinking_mode: str = "mentor"
+    mode: str = "cloud"  # "cloud" | "local"
+    # Retrieval: None = settings.RETRIEVAL_MODE; ваги та k для злиття RRF у режимі hybrid
+    retrieval_mode: Optional[str] = Field(None, pattern="^(dense|sparse|hybrid)$")
+    dense_weight: float = Field(1.0, ge=0)
+    sparse_weight: float = Field(1.0, ge=0)
+    rrf_k: Optional[int] = Field(None, ge=1)
+    rerank: Optional[bool] = None  # None = settings.RERANK_ENABLED
+    # Пошук лише в межах простору, за бажанням — лише по цих файлах / розширеннях ("py", ".md")
+    workspace: Optional[str] = Field(None, pattern=WORKSPACE_PATTERN)
+    filenames: Optional[List[str]] = None
+    extensions: Optional[List[str]] = None
 
 class QueryResponse(BaseModel):
     response_text: str
     sources: List[Any] = [] 
-    latency: float
\ No newline at end of file
+    latency: float
+    query_id: Optional[str] = None
+    mode_used: Optional[str] = None
+    cached: bool = False
+    timings: Dict[str, float] = {}  # Секунди по етапах: embed / search / rerank / context / llm
+    prompt_tokens: Optional[int] = None  # Оцінка розміру промпта після підгонки під бюджет
+
+class FeedbackRequest(BaseModel):
+    query_id: str
+    feedback: str
+    query: str = ""
+    response: str = ""
+    latency: float = 0.0
+
+class FileUploadResponse(BaseModel):
+    status: str
+    filename: str
+    workspace: str
+    chunks_count: int
+    duration: float
+    # Інкрементальна переіндексація: скільки чанків пропущено / заново проіндексовано / видалено
+    skipped: int = 0
+    updated: int = 0
+    removed: int = 0
+
+class DirectoryIngestRequest(BaseModel):
+    path: str  # Каталог на сервері, всередині одного з INGEST_ROOTS
+    prefix: Optional[str] = None  # Префікс імен файлів; None = "<ім'я каталогу>/"
+    workspace: Optional[str] = Field(None, pattern=WORKSPACE_PATTERN)
+
+class TreeFileReport(BaseModel):
+    filename: str
+    status: str  # indexed | unchanged | failed
+    size_bytes: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    updated: int = 0
+    removed: int = 0
+    seconds: float = 0.0  # Парсинг + частка часу ембедингу/upsert батчів, у які потрапив файл
+    mb_per_sec: Optional[float] = None
+    chunks_per_sec: Optional[float] = None
+    error: Optional[str] = None
+
+class TreeIngestResponse(BaseModel):
+    status: str
+    source: str
+    workspace: str
+    files_indexed: int = 0
+    files_unchanged: int = 0
+    files_failed: int = 0
+    files_skipped: Dict[str, int] = {}  # Причина (gitignored / unsupported / too_large / ...) -> кількість
+    size_bytes: int = 0
+    chunks: int = 0
+    skipped: int = 0
+    updated: int = 0
+    removed: int = 0
+    walk_seconds: float = 0.0
+    duration: float = 0.0
+    mb_per_sec: Optional[float] = None
+    chunks_per_sec: Optional[float] = None
+    files: List[TreeFileReport] = []
+
+class DeleteFileRequest(BaseModel):
+    filename: str
+    workspace: Optional[str] = Field(None, pattern=WORKSPACE_PATTERN)
+
+class JobResponse(BaseModel):
+    job_id: str
+    filename: str
+    workspace: str
+    status: str  # queued | running | done | failed
+    size_bytes: int = 0
+    chunks_done: int = 0
+    skipped: int = 0
+    updated: int = 0
+    removed: int = 0
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    elapsed: Optional[float] = None
+    chunks_per_sec: Optional[float] = None
+    mb_per_sec: Optional[float] = None
@@ -0,0 +1,317 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+try:
+    import fcntl
+except ImportError:  # Windows: там лише один процес API, блокування не потрібне
+    fcntl = None
+from app.core.config import settings
+
+# Вікна для частки позитивних/негативних відгуків
+FEEDBACK_WINDOWS = {"1h": 3600, "24h": 24 * 3600, "7d": 7 * 24 * 3600}
+
+
+class QuantileSketch:
+    """
+    DDSketch-style streaming quantiles: values go into logarithmic buckets, so any
+    quantile is within `relative_accuracy` of the true value, memory is O(log range)
+    and adding a value is O(1). Only positive values are bucketed; 0 is counted apart.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        if value is None or value < 0:
+            return
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Середина бакета (gamma^(k-1), gamma^k] з відносною похибкою <= relative_accuracy
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return self.max
+
+    def summary(self) -> dict:
+        def r(v):
+            return round(v, 3) if v is not None else None
+        return {
+            "count": self.count,
+            "mean": r(self.sum / self.count) if self.count else None,
+            "p50": r(self.quantile(0.5)),
+            "p95": r(self.quantile(0.95)),
+            "p99": r(self.quantile(0.99)),
+            "max": r(self.max) if self.count else None,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy, "buckets": self.buckets,
+            "zeros": self.zeros, "count": self.count, "sum": self.sum, "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        sketch.zeros, sketch.count, sketch.sum, sketch.max = data["zeros"], data["count"], data["sum"], data["max"]
+        return sketch
+
+
+class RollingCounter:
+    """
+    Counts per key over a sliding time window. The window is split into 60 buckets;
+    running totals are kept, so expiring old buckets and reading totals is O(1) amortised.
+    """
+
+    def __init__(self, window_seconds: int, buckets: int = 60):
+        self.window = window_seconds
+        self.bucket_seconds = max(1, window_seconds // buckets)
+        self._buckets: deque = deque()  # (bucket_start, {key: n})
+        self.totals: dict[str, int] = {}
+
+    def _expire(self, now: float):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            _, counts = self._buckets.popleft()
+            for key, n in counts.items():
+                self.totals[key] -= n
+
+    def add(self, key: str, ts: float):
+        start = ts - ts % self.bucket_seconds
+        if not self._buckets or self._buckets[-1][0] < start:
+            self._buckets.append((start, {}))
+        # Події зі старшим ts (backfill не по порядку) рахуємо в останній бакет
+        counts = self._buckets[-1][1]
+        counts[key] = counts.get(key, 0) + 1
+        self.totals[key] = self.totals.get(key, 0) + 1
+        self._expire(ts)
+
+    def get(self, now: float = None) -> dict[str, int]:
+        self._expire(now or time.time())
+        return {k: v for k, v in self.totals.items() if v}
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "buckets": [[start, counts] for start, counts in self._buckets]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingCounter":
+        counter = cls(data["window"])
+        for start, counts in data["buckets"]:
+            counter._buckets.append((start, counts))
+            for key, n in counts.items():
+                counter.totals[key] = counter.totals.get(key, 0) + n
+        return counter
+
+
+class AnalyticsEngine:
+    """
+    Aggregates for /analytics: latency/TTFT quantile sketches, per-model / thinking-mode /
+    mode counts, cloud->local fallback and cache hit rates, rolling feedback ratios.
+    Fed incrementally from logs.db rows (QueryLog.sync_analytics), which all API
+    workers share, so every worker converges on the same numbers; the last folded
+    row ids are kept with the aggregates. State is snapshotted to JSON by a single
+    process (flock next to the snapshot); scripts/backfill_analytics.py rebuilds it.
+    """
+
+    def __init__(self, snapshot_path: str = None):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.RLock()
+        self._lock_file = None  # тримаємо flock, поки цей процес пише снапшот
+        self._saved_at = 0.0
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.latency = QuantileSketch()
+        self.ttft = QuantileSketch()
+        self.models: dict[str, int] = {}
+        self.thinking_modes: dict[str, int] = {}
+        self.modes: dict[str, int] = {}
+        self.fallbacks = 0
+        self.cached = 0
+        self.feedback: dict[str, int] = {}
+        self.feedback_windows = {name: RollingCounter(seconds) for name, seconds in FEEDBACK_WINDOWS.items()}
+        self.history: deque = deque(maxlen=50)
+        # id останніх врахованих рядків у logs.db
+        self.last_query_id = 0
+        self.last_feedback_id = 0
+
+    @staticmethod
+    def _bump(counter: dict, key):
+        key = key or "unknown"
+        counter[key] = counter.get(key, 0) + 1
+
+    def observe_query(self, model: str, thinking_mode: str, mode: str, latency: float,
+                      ttft: float = None, cached: bool = False, ts: float = None):
+        ts = ts or time.time()
+        with self._lock:
+            self.total += 1
+            self.latency.add(latency)
+            self.ttft.add(ttft)
+            self._bump(self.models, model)
+            self._bump(self.thinking_modes, thinking_mode)
+            self._bump(self.modes, mode)
+            # Просили хмару, а відповіла локальна модель
+            if mode == "cloud" and model == settings.LOCAL_MODEL_NAME:
+                self.fallbacks += 1
+            if cached:
+                self.cached += 1
+            self.history.append((ts, latency))
+
+    def observe_feedback(self, feedback: str, ts: float = None):
+        ts = ts or time.time()
+        with self._lock:
+            self._bump(self.feedback, feedback)
+            for counter in self.feedback_windows.values():
+                counter.add(feedback, ts)
+
+    def snapshot(self) -> dict:
+        """Independent of log size: every number is already aggregated."""
+        now = time.time()
+        with self._lock:
+            latency = self.latency.summary()
+            windows = {}
+            for name, counter in self.feedback_windows.items():
+                counts = counter.get(now)
+                pos, neg = counts.get("positive", 0), counts.get("negative", 0)
+                windows[name] = {
+                    "positive": pos, "negative": neg,
+                    "positive_ratio": round(pos / (pos + neg), 3) if pos + neg else None,
+                }
+            return {
+                # Поля, які вже читає дашборд
+                "total": self.total,
+                "avg_latency": round(latency["mean"] or 0, 2),
+                "likes": self.feedback.get("positive", 0),
+                "dislikes": self.feedback.get("negative", 0),
+                "models": dict(self.models),
+                "history": [
+                    {"Timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)), "Latency": round(lat or 0, 2)}
+                    for ts, lat in self.history
+                ],
+                # Детальніше
+                "latency": latency,
+                "ttft": self.ttft.summary(),
+                "thinking_modes": dict(self.thinking_modes),
+                "modes": dict(self.modes),
+                "fallback_rate": round(self.fallbacks / self.modes["cloud"], 4) if self.modes.get("cloud") else 0.0,
+                "cache_hit_rate": round(self.cached / self.total, 4) if self.total else 0.0,
+                "feedback": windows,
+            }
+
+    # --- Збереження / відновлення ---
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total": self.total, "latency": self.latency.to_dict(), "ttft": self.ttft.to_dict(),
+                "models": self.models, "thinking_modes": self.thinking_modes, "modes": self.modes,
+                "fallbacks": self.fallbacks, "cached": self.cached, "feedback": self.feedback,
+                "feedback_windows": {name: c.to_dict() for name, c in self.feedback_windows.items()},
+                "history": list(self.history),
+                "last_query_id": self.last_query_id, "last_feedback_id": self.last_feedback_id,
+            }
+
+    def load_dict(self, data: dict):
+        with self._lock:
+            self.reset()
+            self.total = data["total"]
+            self.latency = QuantileSketch.from_dict(data["latency"])
+            self.ttft = QuantileSketch.from_dict(data["ttft"])
+            self.models, self.thinking_modes, self.modes = data["models"], data["thinking_modes"], data["modes"]
+            self.fallbacks, self.cached, self.feedback = data["fallbacks"], data["cached"], data["feedback"]
+            for name, counter in data["feedback_windows"].items():
+                if name in self.feedback_windows:
+                    self.feedback_windows[name] = RollingCounter.from_dict(counter)
+            self.history.extend(tuple(item) for item in data["history"])
+            self.last_query_id, self.last_feedback_id = data["last_query_id"], data["last_feedback_id"]
+
+    def owns_snapshot(self) -> bool:
+        """
+        With several API workers only one of them writes the snapshot: an exclusive
+        flock next to it, held until the process exits. The others read it at start.
+        """
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.snapshot_path + ".lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    def save(self) -> bool:
+        """Writes the snapshot; False if there is no path or another process owns it."""
+        if not self.snapshot_path or not self.owns_snapshot():
+            return False
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, self.snapshot_path)
+        self._saved_at = time.time()
+        return True
+
+    def maybe_save(self):
+        """Called by the log writer after each flush; saves at most every ANALYTICS_SNAPSHOT_SECONDS."""
+        if time.time() - self._saved_at >= settings.ANALYTICS_SNAPSHOT_SECONDS:
+            try:
+                self.save()
+            except Exception as e:
+                print(f"⚠️ Analytics snapshot failed: {e}")
+
+    def load(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                self.load_dict(json.load(f))
+            return True
+        except Exception as e:
+            print(f"⚠️ Analytics snapshot unreadable, starting empty: {e}")
+            self.reset()
+            return False
+
+    def apply(self, queries: Iterable[tuple], feedback: Iterable[tuple]):
+        """
+        Folds log rows in id order:
+        queries -> (id, ts, model, thinking_mode, mode, latency, ttft, cached), feedback -> (id, ts, feedback).
+        """
+        for row_id, ts, model, thinking_mode, mode, latency, ttft, cached in queries:
+            with self._lock:
+                self.observe_query(model, thinking_mode, mode, latency, ttft, bool(cached), ts)
+                self.last_query_id = row_id
+        for row_id, ts, value in feedback:
+            with self._lock:
+                self.observe_feedback(value, ts)
+                self.last_feedback_id = row_id
+
+analytics_engine = AnalyticsEngine(settings.ANALYTICS_SNAPSHOT)
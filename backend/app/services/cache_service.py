@@ -0,0 +1,249 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+
+@dataclass
+class CachedAnswer:
+    response_text: str
+    model: str
+    context_key: str
+    filenames: frozenset
+    vector: Optional[np.ndarray]
+    size: int
+    created_at: float = field(default_factory=time.time)
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM answers.
+
+    Exact key = normalized query + workspace + thinking mode + temperature + retrieved
+    chunk IDs (+ chat history). Answers are tagged with the (workspace, filename) pairs
+    they were built from, for invalidation. On an exact miss, the semantic path compares the query
+    embedding with answers cached for the same context and accepts the best one
+    above `similarity_threshold`.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, similarity_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._by_context: dict[str, set] = {}  # context_key -> exact keys (для семантичного пошуку)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # --- Keys ---
+    @staticmethod
+    def normalize(query: str) -> str:
+        query = re.sub(r"\s+", " ", query.strip().lower())
+        return query.rstrip("?!. ")
+
+    @staticmethod
+    def context_key(thinking_mode: str, temperature: Optional[float], chunk_ids, history: str = "",
+                    workspace: str = "") -> str:
+        temp = "" if temperature is None else f"{temperature:.3f}"
+        ids = ",".join(sorted(str(i) for i in chunk_ids))
+        # Простір у ключі: без знайдених чанків контекст інакше збігався б між просторами
+        raw = "\x1f".join([thinking_mode.lower(), temp, ids, history, workspace])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def exact_key(cls, query: str, context_key: str) -> str:
+        raw = f"{context_key}\x1f{cls.normalize(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Public API ---
+    def get(self, query: str, context_key: str, query_vector=None) -> Optional[CachedAnswer]:
+        key = self.exact_key(query, context_key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+            if query_vector is not None and self.similarity_threshold > 0:
+                match_key = self._semantic_lookup(context_key, np.asarray(query_vector, dtype=np.float32), now)
+                if match_key is not None:
+                    self._entries.move_to_end(match_key)
+                    self.semantic_hits += 1
+                    return self._entries[match_key]
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, context_key: str, response_text: str, model: str, filenames, query_vector=None):
+        key = self.exact_key(query, context_key)
+        vector = None
+        if query_vector is not None:
+            vector = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        size = len(response_text.encode("utf-8")) + (vector.nbytes if vector is not None else 0) + 256
+        entry = CachedAnswer(
+            response_text=response_text,
+            model=model,
+            context_key=context_key,
+            filenames=frozenset(filenames),
+            vector=vector,
+            size=size,
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._by_context.setdefault(context_key, set()).add(key)
+            self._bytes += size
+            self._evict()
+
+    def invalidate_files(self, filenames) -> int:
+        """Drops every answer that was built from any of the given files ((workspace, filename) pairs)."""
+        filenames = set(filenames)
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.filenames & filenames]
+            for k in stale:
+                self._remove(k)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    # --- Internals (викликати лише під self._lock) ---
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _semantic_lookup(self, context_key: str, query_vector: np.ndarray, now: float) -> Optional[str]:
+        norm = np.linalg.norm(query_vector)
+        if norm == 0:
+            return None
+        query_vector = query_vector / norm
+
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._by_context.get(context_key, ())):
+            entry = self._entries[key]
+            if self._expired(entry, now):
+                self._remove(key)
+                continue
+            if entry.vector is None:
+                continue
+            score = float(np.dot(entry.vector, query_vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        group = self._by_context.get(entry.context_key)
+        if group is not None:
+            group.discard(key)
+            if not group:
+                del self._by_context[entry.context_key]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+
+class EmbeddingCache:
+    """Bounded, thread-safe LRU of query embeddings keyed on (model name, text hash)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name: str, text: str) -> tuple:
+        return model_name, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, model_name: str, text: str) -> Optional[list]:
+        key = self.key(model_name, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: list):
+        if self.max_entries <= 0:
+            return
+        key = self.key(model_name, text)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_bytes=settings.CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    similarity_threshold=settings.CACHE_SIMILARITY_THRESHOLD,
+)
+
+embedding_cache = EmbeddingCache(max_entries=settings.EMBED_CACHE_SIZE)
@@ -0,0 +1,290 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Iterable, Iterator, Optional
+from app.core.config import settings
+from app.core.tokens import estimate_tokens, line_token_counts
+from app.services.parser_service import CODE_EXTENSIONS, iter_file_pieces
+
+
+def iter_chunks_with_pages(
+    pieces: Iterable[tuple[str, Optional[int]]], chunk_size: int = 2000, overlap: int = 200
+) -> Iterator[tuple[str, Optional[int], Optional[int]]]:
+    """
+    Streaming chunker over (text, page) pieces. Yields (chunk, first_page, last_page)
+    with the same windows as chunk_text; only the unfinished tail (< chunk_size)
+    is kept between pieces, together with the page boundaries inside it.
+    """
+    step = chunk_size - overlap
+    buf = ""
+    starts: list[int] = []  # offsets у buf, де починається нова сторінка
+    pages: list[Optional[int]] = []
+
+    def page_at(pos: int) -> Optional[int]:
+        i = bisect_right(starts, pos) - 1
+        return pages[i] if i >= 0 else None
+
+    def trim(start: int):
+        nonlocal buf, starts, pages
+        buf = buf[start:]
+        keep = max(bisect_right(starts, start) - 1, 0)
+        starts = [max(s - start, 0) for s in starts[keep:]]
+        pages = pages[keep:]
+
+    for piece, page in pieces:
+        if not pages or pages[-1] != page:
+            starts.append(len(buf))
+            pages.append(page)
+        buf += piece
+        start = 0
+        while len(buf) - start >= chunk_size:
+            yield buf[start:start + chunk_size], page_at(start), page_at(start + chunk_size - 1)
+            start += step
+        trim(start)
+    while buf:
+        end = min(chunk_size, len(buf))
+        yield buf[:end], page_at(0), page_at(end - 1)
+        trim(step)
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = 2000, overlap: int = 200) -> Iterator[str]:
+    """
+    Streaming version of chunk_text: same windows, but the input arrives piece by piece
+    and only the unfinished tail (< chunk_size) is kept between pieces.
+    """
+    for chunk, _, _ in iter_chunks_with_pages(((p, None) for p in pieces), chunk_size, overlap):
+        yield chunk
+
+def chunk_text(text: str, chunk_size: int = 2000, overlap: int = 200):
+    return list(iter_chunks([text], chunk_size, overlap))
+
+# --- Structure-aware chunkers ---
+
+Piece = tuple[str, Optional[int]]
+Chunk = tuple[str, Optional[int], Optional[int]]
+
+# Початок нового логічного блоку в коді (функція / клас / метод / тип) на верхніх рівнях вкладеності
+_PY_BOUNDARY = re.compile(r"^\s{0,4}(?:(?:async\s+)?def\s|class\s)")
+_C_LIKE_BOUNDARY = re.compile(
+    r"^\s{0,4}(?:(?:export|default|public|private|protected|internal|static|final|abstract|async|pub(?:\([\w:]+\))?"
+    r"|override|virtual|unsafe|extern|inline)\s+)*"
+    r"(?:function\*?|class|interface|enum|struct|impl|trait|type|func|fn|def|module|namespace|record)\b"
+    r"|^\s{0,4}(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>"
+)
+_SQL_BOUNDARY = re.compile(r"^\s*(?:CREATE|ALTER|DROP|INSERT|UPDATE|DELETE|WITH|SELECT)\b", re.IGNORECASE)
+_SHELL_BOUNDARY = re.compile(r"^(?:function\s+)?[\w-]+\s*\(\)\s*\{|^:\w+")
+# Конфіги / розмітка: новий ключ або тег верхнього рівня
+_TOP_LEVEL_BOUNDARY = re.compile(r"^(?![\s}\])>,])\S")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s")
+
+_CODE_BOUNDARIES = {
+    ".py": _PY_BOUNDARY,
+    ".sql": _SQL_BOUNDARY,
+    ".sh": _SHELL_BOUNDARY, ".bat": _SHELL_BOUNDARY,
+    ".json": _TOP_LEVEL_BOUNDARY, ".yaml": _TOP_LEVEL_BOUNDARY, ".yml": _TOP_LEVEL_BOUNDARY,
+    ".xml": _TOP_LEVEL_BOUNDARY, ".html": _TOP_LEVEL_BOUNDARY, ".css": _TOP_LEVEL_BOUNDARY,
+    ".scss": _TOP_LEVEL_BOUNDARY, ".env": _TOP_LEVEL_BOUNDARY,
+}
+# Рядки, які "прилипають" до наступного блоку (декоратори, коментарі, порожні)
+_CODE_GLUE = re.compile(r"^\s*(?:@|#|//|/\*|\*|--|$)")
+_SENTENCE_END = re.compile(r"(?<=[.!?]\s)")
+PROSE_EXTENSIONS = {".md", ".txt", ".pdf"}
+
+
+def iter_line_batches(pieces: Iterable[Piece]) -> Iterator[list[tuple[str, Optional[int]]]]:
+    """
+    Re-cuts (text, page) pieces into whole lines (newline kept), each with the page it
+    starts on. Yields one list per piece, so per-line work can be done a piece at a time.
+    """
+    tail, tail_page = "", None
+    for text, page in pieces:
+        if not text:
+            continue
+        first_page = tail_page if tail else page
+        lines = (tail + text).splitlines(keepends=True)
+        tail, tail_page = "", None
+        if not lines[-1].endswith(("\n", "\r")):
+            tail, tail_page = lines.pop(), (first_page if len(lines) == 0 else page)
+        if lines:
+            yield [(line, first_page if i == 0 else page) for i, line in enumerate(lines)]
+    if tail:
+        yield [(tail, tail_page)]
+
+
+class _Packer:
+    """Packs segments (lists of (line, page, tokens)) into chunks of ~target_tokens, never above max_tokens."""
+
+    def __init__(self, target_tokens: int, max_tokens: int):
+        self.target = target_tokens
+        self.max = max_tokens
+        self.parts: list[str] = []
+        self.tokens = 0
+        self.first_page = self.last_page = None
+
+    def _append(self, text: str, page: Optional[int], tokens: int):
+        if not self.parts:
+            self.first_page = page
+        self.parts.append(text)
+        self.tokens += tokens
+        if page is not None:
+            self.last_page = page
+
+    def flush(self) -> Iterator[Chunk]:
+        if self.parts:
+            yield "".join(self.parts), self.first_page, self.last_page if self.last_page is not None else self.first_page
+        self.parts, self.tokens = [], 0
+        self.first_page = self.last_page = None
+
+    def add_segment(self, segment: list, tokens: int) -> Iterator[Chunk]:
+        if tokens > self.max:
+            # Завеликий блок (довга функція / сторінка без абзаців) пакуємо порядково
+            for text, page, line_tokens in segment:
+                if self.tokens + line_tokens > self.target:
+                    yield from self.flush()
+                self._append(text, page, line_tokens)
+            return
+        if self.tokens + tokens > self.target:
+            yield from self.flush()
+        for text, page, line_tokens in segment:
+            self._append(text, page, line_tokens)
+
+
+class StructuredChunker(ABC):
+    """
+    Splits a stream of (text, page) pieces at structural boundaries (see is_boundary)
+    and packs the resulting segments into chunks with a token-length target.
+    Only the current segment and chunk are held in memory. Unlike the window chunker
+    there is no overlap: chunks end where a function / paragraph ends.
+    """
+
+    def __init__(self, target_tokens: int = None, max_tokens: int = None):
+        self.target_tokens = target_tokens or settings.CHUNK_TARGET_TOKENS
+        self.max_tokens = max(max_tokens or settings.CHUNK_MAX_TOKENS, self.target_tokens)
+
+    @abstractmethod
+    def is_boundary(self, line: str, prev_line: str) -> bool:
+        """True if a new segment starts at `line`."""
+
+    def is_glue(self, line: str) -> bool:
+        return not line.strip()
+
+    def _split_line(self, line: str, tokens: int) -> list[tuple[str, int]]:
+        """
+        Returns [(text, tokens)]. A single line longer than max_tokens (minified code,
+        a PDF page without breaks) is cut by sentences, then by size.
+        """
+        if tokens <= self.max_tokens:
+            return [(line, tokens)]
+        parts, current, current_tokens = [], "", 0
+        for sentence in _SENTENCE_END.split(line):
+            sentence_tokens = estimate_tokens(sentence)
+            if current and current_tokens + sentence_tokens > self.target_tokens:
+                parts.append(current)
+                current, current_tokens = "", 0
+            current += sentence
+            current_tokens += sentence_tokens
+        if current:
+            parts.append(current)
+        step = self.target_tokens * 3  # ~3 символи на токен — з запасом для щільного тексту
+        pieces = []
+        for part in parts:
+            for text in ([part] if estimate_tokens(part) <= self.max_tokens else
+                         [part[i:i + step] for i in range(0, len(part), step)]):
+                pieces.append((text, estimate_tokens(text)))
+        return pieces
+
+    def chunk(self, pieces: Iterable[Piece]) -> Iterator[Chunk]:
+        packer = _Packer(self.target_tokens, self.max_tokens)
+        segment, prev = [], ""
+        for batch in iter_line_batches(pieces):
+            counts = line_token_counts([line for line, _ in batch])
+            for (line, page), tokens in zip(batch, counts):
+                if segment and self.is_boundary(line, prev):
+                    # Хвіст із коментарів / декораторів / порожніх рядків належить наступному блоку
+                    cut = len(segment)
+                    while cut and self.is_glue(segment[cut - 1][0]):
+                        cut -= 1
+                    if cut:
+                        yield from packer.add_segment(segment[:cut], sum(t for _, _, t in segment[:cut]))
+                        segment = segment[cut:]
+                for part, part_tokens in self._split_line(line, tokens):
+                    segment.append((part, page, part_tokens))
+                prev = line
+        if segment:
+            yield from packer.add_segment(segment, sum(t for _, _, t in segment))
+        yield from packer.flush()
+
+
+class CodeChunker(StructuredChunker):
+    """Cuts source code before functions / classes / methods, keeping decorators and leading comments attached."""
+
+    def __init__(self, boundary: re.Pattern = _C_LIKE_BOUNDARY, target_tokens: int = None, max_tokens: int = None):
+        super().__init__(target_tokens, max_tokens)
+        self.boundary = boundary
+
+    def is_glue(self, line: str) -> bool:
+        return bool(_CODE_GLUE.match(line))
+
+    def is_boundary(self, line: str, prev_line: str) -> bool:
+        return bool(self.boundary.match(line))
+
+
+class ProseChunker(StructuredChunker):
+    """Cuts prose at paragraphs (a blank line) and Markdown headings; long paragraphs fall back to sentences."""
+
+    def is_boundary(self, line: str, prev_line: str) -> bool:
+        if not line.strip():
+            return False
+        return not prev_line.strip() or bool(_HEADING.match(line))
+
+
+class WindowChunker:
+    """The original fixed character windows with overlap (CHUNKING_STRATEGY=window)."""
+
+    def __init__(self, chunk_size: int = 2000, overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk(self, pieces: Iterable[Piece]) -> Iterator[Chunk]:
+        return iter_chunks_with_pages(pieces, self.chunk_size, self.overlap)
+
+
+def get_chunker(filename: str, strategy: str = None):
+    """Chunker for a file: by extension when the strategy is "auto", else the named one."""
+    strategy = strategy or settings.CHUNKING_STRATEGY
+    if strategy == "window":
+        return WindowChunker()
+    _, ext = os.path.splitext(filename.lower())
+    if strategy == "prose" or (strategy == "auto" and (ext in PROSE_EXTENSIONS or ext not in CODE_EXTENSIONS)):
+        return ProseChunker()
+    if strategy in ("code", "auto"):
+        return CodeChunker(_CODE_BOUNDARIES.get(ext, _C_LIKE_BOUNDARY))
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+def iter_file_chunks(path: str, filename: str, strategy: str = None) -> Iterator[tuple[str, dict]]:
+    """
+    Parse + chunk as one lazy stream. Yields (chunk, extra_meta) where extra_meta
+    carries `page`/`page_end` for paged formats and `chunk_overlap` for window
+    chunks. Whitespace-only chunks are dropped.
+    """
+    chunker = get_chunker(filename, strategy)
+    overlap = getattr(chunker, "overlap", 0)  # структурні чанкери не перекриваються
+    for chunk, first_page, last_page in chunker.chunk(iter_file_pieces(path, filename)):
+        if not chunk.strip():
+            continue
+        meta = {"chunk_overlap": overlap} if overlap else {}
+        if first_page is not None:
+            meta["page"] = first_page
+            meta["page_end"] = last_page
+        yield chunk, meta
+
+def batch_texts_and_metas(batch: list[tuple[str, dict]], filename: str, first_index: int,
+                          workspace: str = None) -> tuple[list[str], list[dict]]:
+    """Splits a batch from iter_file_chunks into texts + payload metas for indexing."""
+    texts = [chunk for chunk, _ in batch]
+    workspace = workspace or settings.DEFAULT_WORKSPACE
+    metas = [
+        {"workspace": workspace, "filename": filename, "chunk_index": first_index + i, **extra}
+        for i, (_, extra) in enumerate(batch)
+    ]
+    return texts, metas
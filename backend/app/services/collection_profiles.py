@@ -0,0 +1,116 @@
+"""
+Storage / index profiles for the Qdrant collection (settings.COLLECTION_PROFILE).
+
+  memory   float32 vectors and the HNSW graph in RAM (Qdrant defaults), the original layout
+  scalar   int8 scalar quantization in RAM (4x smaller), float32 originals on disk;
+           the top candidates are rescored with the originals
+  binary   1-bit binary quantization in RAM (32x smaller), originals on disk; more
+           oversampling, because 384-d binary codes are coarse
+  disk     vectors, HNSW graph and payload on disk; smallest RAM, slowest queries
+
+All profiles except `memory` keep the payload (the bulky chunk `content`) on disk;
+only the indexed `filename` field is held in RAM. HNSW_M / HNSW_EF_CONSTRUCT override
+the graph parameters, HNSW_EF / QUANTIZATION_OVERSAMPLING the search-time ones.
+Changing the profile of an existing collection: scripts/migrate_collection.py.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from qdrant_client.http import models
+from app.services.point_builder import VECTOR_SIZE, sparse_vectors_config
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    name: str
+    quantization: Optional[str] = None  # None | "scalar" | "binary"
+    vectors_on_disk: bool = False
+    payload_on_disk: bool = False
+    hnsw_on_disk: bool = False
+    oversampling: Optional[float] = None  # скільки кандидатів брати з квантованого індексу перед rescore
+
+
+PROFILES = {
+    "memory": CollectionProfile("memory"),
+    "scalar": CollectionProfile("scalar", quantization="scalar", vectors_on_disk=True, payload_on_disk=True,
+                                oversampling=2.0),
+    "binary": CollectionProfile("binary", quantization="binary", vectors_on_disk=True, payload_on_disk=True,
+                                oversampling=4.0),
+    "disk": CollectionProfile("disk", vectors_on_disk=True, payload_on_disk=True, hnsw_on_disk=True),
+}
+
+
+def get_profile(name: str) -> CollectionProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown collection profile '{name}', expected one of: {', '.join(PROFILES)}") from None
+
+
+def quantization_config(profile: CollectionProfile):
+    if profile.quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if profile.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def hnsw_config(profile: CollectionProfile, m: int = 0, ef_construct: int = 0) -> Optional[models.HnswConfigDiff]:
+    """0 = Qdrant default (m=16, ef_construct=100)."""
+    if not (m or ef_construct or profile.hnsw_on_disk):
+        return None
+    return models.HnswConfigDiff(m=m or None, ef_construct=ef_construct or None, on_disk=profile.hnsw_on_disk or None)
+
+
+def create_collection_kwargs(profile: CollectionProfile, m: int = 0, ef_construct: int = 0, sparse: bool = True) -> dict:
+    """Keyword arguments for client.create_collection (without collection_name)."""
+    return {
+        "vectors_config": models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE, on_disk=profile.vectors_on_disk or None
+        ),
+        "sparse_vectors_config": sparse_vectors_config(on_disk=profile.vectors_on_disk) if sparse else None,
+        "on_disk_payload": profile.payload_on_disk or None,
+        "hnsw_config": hnsw_config(profile, m, ef_construct),
+        "quantization_config": quantization_config(profile),
+    }
+
+
+def search_params(profile: CollectionProfile, hnsw_ef: int = 0, oversampling: float = 0) -> Optional[models.SearchParams]:
+    """Dense-search params: hnsw_ef and, for quantized profiles, rescoring with oversampling."""
+    quantization = None
+    if profile.quantization:
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=oversampling or profile.oversampling)
+    if not (hnsw_ef or quantization):
+        return None
+    return models.SearchParams(hnsw_ef=hnsw_ef or None, quantization=quantization)
+
+
+def profile_mismatches(profile: CollectionProfile, info, m: int = 0, ef_construct: int = 0) -> list[str]:
+    """Differences between a profile and an existing collection's config (empty = matches)."""
+    config = info.config
+    vectors = config.params.vectors
+    current_quantization = None
+    if isinstance(config.quantization_config, models.ScalarQuantization):
+        current_quantization = "scalar"
+    elif isinstance(config.quantization_config, models.BinaryQuantization):
+        current_quantization = "binary"
+    elif config.quantization_config is not None:
+        current_quantization = "product"
+
+    diffs = []
+    if current_quantization != profile.quantization:
+        diffs.append(f"quantization {current_quantization} -> {profile.quantization}")
+    if bool(getattr(vectors, "on_disk", False)) != profile.vectors_on_disk:
+        diffs.append(f"vectors on_disk {bool(getattr(vectors, 'on_disk', False))} -> {profile.vectors_on_disk}")
+    if bool(config.params.on_disk_payload) != profile.payload_on_disk and profile.payload_on_disk:
+        # Qdrant-сервер і так за замовчуванням тримає payload на диску, тож "memory" тут не сперечається
+        diffs.append(f"on_disk_payload {bool(config.params.on_disk_payload)} -> True")
+    hnsw = config.hnsw_config
+    if bool(hnsw.on_disk) != profile.hnsw_on_disk:
+        diffs.append(f"hnsw on_disk {bool(hnsw.on_disk)} -> {profile.hnsw_on_disk}")
+    if m and hnsw.m != m:
+        diffs.append(f"hnsw m {hnsw.m} -> {m}")
+    if ef_construct and hnsw.ef_construct != ef_construct:
+        diffs.append(f"hnsw ef_construct {hnsw.ef_construct} -> {ef_construct}")
+    return diffs
@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from app.core.config import settings
+from app.core.tokens import estimate_tokens, message_tokens
+from app.models.schemas import QueryRequest
+
+# Запас під персону та інструкції системного промпта (див. LLMService._build_messages)
+SYSTEM_PROMPT_TOKENS = 96
+
+# Менший за це залишок бюджету не варто заповнювати обрізаним шматком
+MIN_PARTIAL_TOKENS = 64
+
+
+@dataclass
+class ContextBlock:
+    filename: str
+    content: str
+    page: int = None
+    page_end: int = None
+    first_index: int = None
+    last_index: int = None
+    score: float = 0.0
+    chunk_ids: list = field(default_factory=list)
+
+    def label(self) -> str:
+        if self.page is None:
+            return ""
+        return f", p. {self.page}" if self.page_end in (None, self.page) else f", pp. {self.page}-{self.page_end}"
+
+    def render(self, content: str = None) -> str:
+        return f"Source ({self.filename}{self.label()}): {self.content if content is None else content}"
+
+
+@dataclass
+class PromptPlan:
+    request: QueryRequest  # з урізаною історією
+    context_str: str
+    budget: int
+    context_tokens: int = 0
+    messages_tokens: int = 0  # історія + питання
+    chunks_used: int = 0
+    chunks_merged: int = 0
+    messages_dropped: int = 0
+    truncated: bool = False
+
+    @property
+    def prompt_tokens(self) -> int:
+        return SYSTEM_PROMPT_TOKENS + self.context_tokens + self.messages_tokens
+
+    def stats(self) -> dict:
+        return {
+            "budget": self.budget,
+            "prompt_tokens": self.prompt_tokens,
+            "context_tokens": self.context_tokens,
+            "messages_tokens": self.messages_tokens,
+            "chunks_used": self.chunks_used,
+            "chunks_merged": self.chunks_merged,
+            "messages_dropped": self.messages_dropped,
+            "truncated": self.truncated,
+        }
+
+
+def strip_overlap(previous: str, following: str, overlap: int) -> str:
+    """
+    Returns `following` without its first `overlap` chars if they repeat the end of
+    `previous`. Only window chunks overlap (payload `chunk_overlap`); structured
+    chunks end at a boundary, and a shared prefix/suffix there is real text.
+    """
+    if overlap and len(following) >= overlap and previous.endswith(following[:overlap]):
+        return following[overlap:]
+    return following
+
+
+def merge_hits(hits) -> tuple[list[ContextBlock], int]:
+    """
+    Groups hits by file, joins runs of consecutive chunk_index into one block with the
+    window overlap removed, and orders blocks by their best score.
+    Returns (blocks, number of chunks that were merged into a previous one).
+    """
+    by_file: dict[str, list] = {}
+    for hit in hits:
+        by_file.setdefault(hit.payload.get("filename", "?"), []).append(hit)
+
+    blocks, merged = [], 0
+    for filename, file_hits in by_file.items():
+        file_hits.sort(key=lambda h: (h.payload.get("chunk_index") is None, h.payload.get("chunk_index") or 0))
+        current = None
+        for hit in file_hits:
+            p = hit.payload
+            index = p.get("chunk_index")
+            content = p.get("content", "")
+            if current is not None and index is not None and current.last_index is not None and index == current.last_index + 1:
+                current.content += strip_overlap(current.content, content, p.get("chunk_overlap", 0))
+                current.last_index = index
+                current.page_end = p.get("page_end", current.page_end)
+                current.score = max(current.score, hit.score)
+                current.chunk_ids.append(hit.id)
+                merged += 1
+                continue
+            current = ContextBlock(
+                filename=filename, content=content, page=p.get("page"), page_end=p.get("page_end"),
+                first_index=index, last_index=index, score=hit.score, chunk_ids=[hit.id],
+            )
+            blocks.append(current)
+
+    blocks.sort(key=lambda b: b.score, reverse=True)
+    return blocks, merged
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text at a line boundary so that it fits into max_tokens (estimated)."""
+    lines, used, kept = text.splitlines(keepends=True), 0, []
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "".join(kept).rstrip() + "\n[...]"
+
+
+def build_context(hits, max_tokens: int) -> tuple[str, int, int, int, bool]:
+    """Returns (context_str, tokens, chunks used, chunks merged, truncated)."""
+    blocks, merged = merge_hits(hits)
+    parts, used, chunks, truncated = [], 0, 0, False
+    for block in blocks:
+        rendered = block.render()
+        cost = estimate_tokens(rendered) + 2  # + розділювач між джерелами
+        if used + cost <= max_tokens:
+            parts.append(rendered)
+            used += cost
+            chunks += len(block.chunk_ids)
+            continue
+        remaining = max_tokens - used - estimate_tokens(block.render("")) - 4
+        if remaining >= MIN_PARTIAL_TOKENS:
+            rendered = block.render(_truncate_to_tokens(block.content, remaining))
+            parts.append(rendered)
+            used += estimate_tokens(rendered) + 2
+            chunks += len(block.chunk_ids)
+        truncated = True
+        break
+    return "\n\n".join(parts), used, chunks, merged, truncated
+
+
+def prompt_budget(model: str) -> int:
+    return settings.PROMPT_TOKEN_BUDGETS.get(model, settings.DEFAULT_PROMPT_TOKENS)
+
+
+def plan_prompt(request: QueryRequest, hits, models: list[str]) -> PromptPlan:
+    """
+    Fits question + retrieved context + chat history into the prompt budget.
+    `models` are all models the request may reach (fallback / hedge send the same
+    prompt), so the smallest of their budgets is used.
+    The latest message is always kept; context gets up to CONTEXT_TOKEN_SHARE of the
+    budget; the rest goes to history, newest messages first (older ones are dropped).
+    """
+    budget = min(prompt_budget(model) for model in models)
+    messages = request.messages
+    question_tokens = message_tokens(messages[-1].content)
+    free = max(budget - SYSTEM_PROMPT_TOKENS - question_tokens, 0)
+
+    context_str, context_tokens, chunks, merged, truncated = build_context(
+        hits, min(int(budget * settings.CONTEXT_TOKEN_SHARE), free)
+    )
+
+    history_budget = free - context_tokens
+    kept, history_tokens = [], 0
+    for message in reversed(messages[:-1]):
+        cost = message_tokens(message.content)
+        if history_tokens + cost > history_budget:
+            break
+        kept.append(message)
+        history_tokens += cost
+    kept.reverse()
+
+    trimmed = request
+    if len(kept) != len(messages) - 1:
+        trimmed = request.model_copy(update={"messages": kept + [messages[-1]]})
+
+    return PromptPlan(
+        request=trimmed, context_str=context_str, budget=budget,
+        context_tokens=context_tokens, messages_tokens=history_tokens + question_tokens,
+        chunks_used=chunks, chunks_merged=merged,
+        messages_dropped=len(messages) - 1 - len(kept), truncated=truncated,
+    )
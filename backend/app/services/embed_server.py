@@ -0,0 +1,306 @@
+"""
+Shared embedding process for multi-worker deployments (see gunicorn.conf.py).
+
+One process loads the FastEmbed models once and serves every API worker over a
+Unix socket, instead of each worker holding its own ONNX session. Requests that
+arrive within EMBED_SERVER_MAX_WAIT_MS of each other (from any worker) are merged
+into one ONNX call of up to EMBED_SERVER_MAX_BATCH texts. Query embeddings have
+their own lane (batcher + thread), so they never wait behind an ingest batch.
+
+Wire format, both directions: struct "!II" (JSON length, body length), the JSON
+header, then a binary body.
+  request   {"op": "dense" | "sparse" | "sparse_query" | "info", "texts": [...], "query": bool}
+  response  {"ok": true, "count": n, "dim": d} + float32 body          (dense)
+            {"ok": true, "vectors": [[indices, values], ...]}            (sparse, sparse_query)
+            {"ok": false, "error": "..."}
+
+Run:  python -m app.services.embed_server [--socket PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import numpy as np
+from app.core.config import settings
+
+_HEADER = struct.Struct("!II")
+
+
+class EmbedServerError(Exception):
+    """The embedding process answered with an error or is not reachable."""
+
+
+def encode_message(header: dict, body: bytes = b"") -> bytes:
+    data = json.dumps(header).encode("utf-8")
+    return _HEADER.pack(len(data), len(body)) + data + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    json_len, body_len = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    header = json.loads(await reader.readexactly(json_len))
+    body = await reader.readexactly(body_len) if body_len else b""
+    return header, body
+
+
+def _sparse_pairs(embeddings) -> list:
+    return [[e.indices.tolist(), e.values.tolist()] for e in embeddings]
+
+
+class MicroBatcher:
+    """
+    Queue of (op, texts, future). The loop takes the first waiting request, waits
+    max_wait_ms for company, drains more while they fit into max_batch texts and
+    runs one model call per op. While a call is running new requests pile up, so
+    under load batches grow on their own without a longer wait.
+    """
+
+    def __init__(self, runners: dict[str, Callable[[list[str]], list]], max_batch: int, max_wait_ms: float,
+                 executor: ThreadPoolExecutor):
+        self.runners = runners
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._held: Optional[tuple] = None  # не влізло в попередній батч — іде першим у наступний
+        self.requests = 0
+        self.calls = 0
+        self.texts = 0
+        self.max_seen = 0
+
+    async def submit(self, op: str, texts: list[str]):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((op, texts, future))
+        return await future
+
+    def _drain(self, items: list, size: int) -> list:
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if size + len(item[1]) > self.max_batch:
+                self._held = item
+                break
+            items.append(item)
+            size += len(item[1])
+        return items
+
+    async def _run_group(self, op: str, group: list):
+        texts = [t for _, batch, _ in group for t in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.runners[op], texts)
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.calls += 1
+        self.requests += len(group)
+        self.texts += len(texts)
+        self.max_seen = max(self.max_seen, len(group))
+        offset = 0
+        for _, batch, future in group:
+            if not future.done():  # клієнт міг відвалитись
+                future.set_result(results[offset:offset + len(batch)])
+            offset += len(batch)
+
+    async def run(self):
+        while True:
+            if self._held is not None:
+                items, self._held = [self._held], None
+            else:
+                items = [await self.queue.get()]
+            if self.max_wait:
+                await asyncio.sleep(self.max_wait)
+            items = self._drain(items, len(items[0][1]))
+            groups: dict[str, list] = {}
+            for item in items:
+                groups.setdefault(item[0], []).append(item)
+            for op, group in groups.items():
+                await self._run_group(op, group)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "model_calls": self.calls,
+            "texts": self.texts,
+            "requests_per_call": round(self.requests / self.calls, 2) if self.calls else None,
+            "max_requests_per_call": self.max_seen,
+        }
+
+
+class EmbedServer:
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.model = None
+        self.sparse_model = None
+        self.dim = None
+        # Паралелізм усередині ONNX (EMBED_THREADS); окремий потік для запитів, щоб вони не стояли за батчами індексації
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-server")
+        self._query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-server-query")
+        self.batcher: Optional[MicroBatcher] = None
+        self.query_batcher: Optional[MicroBatcher] = None
+
+    def load_models(self):
+        from fastembed import SparseTextEmbedding, TextEmbedding
+        threads = settings.EMBED_THREADS or None
+        print(f"🚀 Loading FastEmbed {settings.EMBED_MODEL_NAME} (threads={threads or 'auto'})...")
+        self.model = TextEmbedding(model_name=settings.EMBED_MODEL_NAME, threads=threads)
+        self.dim = len(self._dense(["dim probe"])[0])
+        if settings.SPARSE_MODEL_NAME:
+            try:
+                self.sparse_model = SparseTextEmbedding(model_name=settings.SPARSE_MODEL_NAME, threads=threads)
+            except Exception as e:
+                print(f"⚠️ Sparse model unavailable, hybrid search disabled: {e}")
+
+    def _dense(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(list(self.model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE)), dtype=np.float32)
+
+    def _sparse(self, texts: list[str]) -> list:
+        return _sparse_pairs(self.sparse_model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE))
+
+    def _sparse_query(self, texts: list[str]) -> list:
+        return _sparse_pairs(self.sparse_model.query_embed(texts))
+
+    def info(self) -> dict:
+        return {"model": settings.EMBED_MODEL_NAME, "dim": self.dim, "sparse": self.sparse_model is not None,
+                "pid": os.getpid(), "lanes": {"query": self.query_batcher.stats(), "bulk": self.batcher.stats()}}
+
+    async def _answer(self, header: dict) -> bytes:
+        op, texts = header.get("op"), header.get("texts") or []
+        batcher = self.query_batcher if header.get("query") or op == "sparse_query" else self.batcher
+        if op == "info":
+            return encode_message({"ok": True, **self.info()})
+        if op == "dense":
+            vectors = await batcher.submit(op, texts) if texts else np.zeros((0, self.dim), dtype=np.float32)
+            return encode_message({"ok": True, "count": len(vectors), "dim": self.dim},
+                                  np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        if op in ("sparse", "sparse_query"):
+            if self.sparse_model is None:
+                raise EmbedServerError("No sparse model loaded")
+            return encode_message({"ok": True, "vectors": await batcher.submit(op, texts) if texts else []})
+        raise EmbedServerError(f"Unknown op: {op}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header, _ = await read_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                try:
+                    response = await self._answer(header)
+                except Exception as e:
+                    response = encode_message({"ok": False, "error": str(e)})
+                writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.load_models)
+        runners = {"dense": self._dense, "sparse": self._sparse, "sparse_query": self._sparse_query}
+        self.batcher = MicroBatcher(runners, settings.EMBED_SERVER_MAX_BATCH, settings.EMBED_SERVER_MAX_WAIT_MS,
+                                    self._executor)
+        self.query_batcher = MicroBatcher(runners, settings.EMBED_SERVER_MAX_BATCH, settings.EMBED_SERVER_MAX_WAIT_MS,
+                                          self._query_executor)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # лишився від попереднього запуску
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        batchers = [asyncio.create_task(b.run()) for b in (self.batcher, self.query_batcher)]
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"🧠 Embedding server ready on {self.socket_path} in {time.perf_counter() - start:.1f}s (pid {os.getpid()})")
+        try:
+            await stop.wait()
+        finally:
+            server.close()
+            for task in batchers:
+                task.cancel()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class EmbedClient:
+    """
+    Async client used by VectorService when EMBED_SERVER_SOCKET is set. Each
+    in-flight request holds its own connection; idle ones are kept for reuse.
+    """
+
+    def __init__(self, socket_path: str, max_idle: int = 16):
+        self.socket_path = socket_path
+        self.max_idle = max_idle
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _request(self, header: dict) -> tuple[dict, bytes]:
+        for attempt in range(2):
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else await asyncio.open_unix_connection(self.socket_path)
+            try:
+                writer.write(encode_message(header))
+                await writer.drain()
+                response, body = await read_message(reader)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                writer.close()
+                # Збережене з'єднання могло померти разом зі старим процесом сервера — пробуємо нове
+                if reused and attempt == 0:
+                    continue
+                raise EmbedServerError(f"Embedding server connection failed: {e}") from e
+            except BaseException:
+                writer.close()
+                raise
+            if len(self._idle) < self.max_idle:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            if not response.get("ok"):
+                raise EmbedServerError(response.get("error", "unknown error"))
+            return response, body
+
+    async def info(self) -> dict:
+        return (await self._request({"op": "info"}))[0]
+
+    async def wait_ready(self, timeout: float) -> dict:
+        """Polls until the server answers (it binds the socket only after loading the models)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return await self.info()
+            except (OSError, EmbedServerError):
+                if time.monotonic() > deadline:
+                    raise EmbedServerError(f"Embedding server on {self.socket_path} not ready after {timeout:.0f}s")
+                await asyncio.sleep(0.5)
+
+    async def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        """`query`: goes through the server's query lane, ahead of ingest batches."""
+        response, body = await self._request({"op": "dense", "texts": texts, "query": query})
+        return np.frombuffer(body, dtype=np.float32).reshape(response["count"], response["dim"]).tolist()
+
+    async def embed_sparse(self, texts: list[str], query: bool = False) -> list[tuple[list, list]]:
+        response, _ = await self._request({"op": "sparse_query" if query else "sparse", "texts": texts})
+        return response["vectors"]
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=settings.EMBED_SERVER_SOCKET or "/tmp/vectrieve-embed.sock")
+    args = parser.parse_args()
+    asyncio.run(EmbedServer(args.socket).serve())
+
+
+if __name__ == "__main__":
+    main()
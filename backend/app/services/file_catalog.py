@@ -0,0 +1,117 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Optional
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    workspace TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER,
+    uploaded_at REAL NOT NULL,
+    PRIMARY KEY (workspace, filename)
+);
+"""
+
+_UPSERT = (
+    "INSERT INTO files (workspace, filename, chunks, size_bytes, uploaded_at) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(workspace, filename) DO UPDATE SET chunks = excluded.chunks, "
+    "size_bytes = COALESCE(excluded.size_bytes, files.size_bytes), uploaded_at = excluded.uploaded_at"
+)
+
+
+class FileCatalog:
+    """
+    Sidecar registry of indexed files per workspace (SQLite, WAL). Kept in sync by
+    upload, delete and finished ingestion jobs, so listing files costs O(files)
+    instead of scrolling every chunk in Qdrant.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(files)")}
+            if columns and "workspace" not in columns:
+                # Каталог з часів до просторів: первинний ключ змінився, тож переносимо таблицю
+                conn.execute("ALTER TABLE files RENAME TO files_v1")
+                conn.executescript(_SCHEMA)
+                conn.execute(
+                    "INSERT INTO files SELECT ?, filename, chunks, size_bytes, uploaded_at FROM files_v1",
+                    (settings.DEFAULT_WORKSPACE,),
+                )
+                conn.execute("DROP TABLE files_v1")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert(self, filename: str, chunks: int, size_bytes: Optional[int] = None, uploaded_at: float = None,
+               workspace: str = settings.DEFAULT_WORKSPACE):
+        with self._connect() as conn:
+            conn.execute(_UPSERT, (workspace, filename, chunks, size_bytes, uploaded_at or time.time()))
+
+    def upsert_many(self, rows: list[tuple[str, int, Optional[int]]], workspace: str = settings.DEFAULT_WORKSPACE):
+        """(filename, chunks, size_bytes) rows in one transaction, for tree ingestion."""
+        if not rows:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                _UPSERT, [(workspace, filename, chunks, size_bytes, now) for filename, chunks, size_bytes in rows]
+            )
+
+    def remove(self, filename: str, workspace: str = settings.DEFAULT_WORKSPACE):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE workspace = ? AND filename = ?", (workspace, filename))
+
+    def get(self, filename: str, workspace: str = settings.DEFAULT_WORKSPACE) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM files WHERE workspace = ? AND filename = ?", (workspace, filename)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def workspaces(self) -> list[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT workspace, COUNT(*) AS files, SUM(chunks) AS chunks, SUM(size_bytes) AS size_bytes "
+                "FROM files GROUP BY workspace ORDER BY workspace"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def list(self, offset: int = 0, limit: int = 100, workspace: str = settings.DEFAULT_WORKSPACE) -> list[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM files WHERE workspace = ? ORDER BY filename LIMIT ? OFFSET ?", (workspace, limit, offset)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self, workspace: Optional[str] = None) -> int:
+        """Files in one workspace; None = in all of them."""
+        with self._connect() as conn:
+            if workspace is None:
+                return conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM files WHERE workspace = ?", (workspace,)).fetchone()[0]
+
+    def replace_all(self, counts: dict[tuple[str, str], int]):
+        """Rebuilds the catalog from {(workspace, filename): chunks} (sizes are unknown after a rebuild)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files")
+            conn.executemany(
+                "INSERT INTO files (workspace, filename, chunks, size_bytes, uploaded_at) VALUES (?, ?, ?, NULL, ?)",
+                [(workspace, name, chunks, now) for (workspace, name), chunks in counts.items()],
+            )
+
+
+file_catalog = FileCatalog(settings.CATALOG_DB)
@@ -0,0 +1,39 @@
+from typing import Iterable
+
+
+def rrf_fuse(ranked_lists: Iterable[tuple[list, float]], k: int = 60, limit: int = 5) -> list:
+    """
+    Weighted Reciprocal Rank Fusion: score(doc) = sum(weight / (k + rank)), rank from 1.
+    Takes (hits, weight) pairs of Qdrant ScoredPoints and returns the top `limit`
+    hits with `score` replaced by the fused score. Raw scores of different
+    retrievers (cosine vs BM25) are not comparable, ranks are.
+    """
+    scores: dict = {}
+    hits: dict = {}
+    for ranked, weight in ranked_lists:
+        if weight <= 0:
+            continue
+        for rank, hit in enumerate(ranked, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + weight / (k + rank)
+            hits.setdefault(hit.id, hit)
+    best = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [hits[doc_id].model_copy(update={"score": scores[doc_id]}) for doc_id in best]
+
+
+SCORE_KIND_KEY = "_score_kind"
+COSINE_KEY = "_cosine"
+
+
+def label_scores(hits: list, kind: str, cosine: dict = None) -> list:
+    """
+    Records in each hit's payload what `score` is ("cosine", "bm25", "rrf", "rerank")
+    and, when known, the dense cosine similarity, so callers never show an RRF or
+    BM25 value as if it were a similarity. Returns `hits`.
+    """
+    for hit in hits:
+        hit.payload[SCORE_KIND_KEY] = kind
+        if kind == "cosine":
+            hit.payload[COSINE_KEY] = hit.score
+        elif cosine is not None:
+            hit.payload[COSINE_KEY] = cosine.get(hit.id)
+    return hits
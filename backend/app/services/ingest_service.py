@@ -0,0 +1,267 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Iterator
+from fastapi import UploadFile
+from app.core.config import settings
+from app.core.metrics import INGEST_STAGE_SECONDS, stage
+from app.services.cache_service import response_cache
+from app.services.chunking_service import batch_texts_and_metas, iter_file_chunks
+from app.services.file_catalog import file_catalog
+from app.services.parser_service import ParseError, spool_upload
+from app.services.point_builder import ReindexPlan
+from app.services.source_tree import ARCHIVE_SUFFIXES, ArchiveError, extract_archive, remove_tree, walk_tree
+from app.services.vector_service import vector_service
+
+
+class EmptyFileError(ParseError):
+    """Nothing indexable was extracted from the file."""
+
+
+def _take(iterator: Iterator, n: int) -> list:
+    return list(itertools.islice(iterator, n))
+
+async def index_chunk_stream(chunks: Iterator[tuple[str, dict]], filename: str, workspace: str) -> dict:
+    """
+    Pulls chunks from a (blocking) iterator in bounded batches and indexes them
+    incrementally: only new/changed chunks are embedded, vanished ones are deleted.
+    At most UPSERT_BATCH_SIZE chunks are held in memory at once.
+    Returns {"chunks", "skipped", "updated", "removed"}.
+    """
+    step = settings.UPSERT_BATCH_SIZE
+    plan = ReindexPlan(await vector_service.file_points(filename, workspace))
+    total = 0
+    while True:
+        try:
+            # Парсинг і чанкінг ліниві: реально виконуються тут, при витягуванні пачки
+            with stage(INGEST_STAGE_SECONDS, "chunk"):
+                batch = await asyncio.to_thread(_take, chunks, step)
+        except ParseError:
+            raise
+        except Exception as e:
+            raise ParseError(str(e)) from e
+        if not batch:
+            break
+
+        texts, metas = batch_texts_and_metas(batch, filename, total, workspace)
+        new_texts, new_metas, updates = plan.diff(texts, metas)
+        await vector_service.add_documents(new_texts, new_metas)
+        await vector_service.update_payloads(updates)
+        total += len(batch)
+
+    if total == 0:
+        raise EmptyFileError("Empty file")
+
+    await vector_service.delete_points(plan.removed_ids())
+    # Загальну кількість чанків знаємо лише в кінці стріму
+    await vector_service.set_file_payload(filename, {"total_chunks": total}, workspace)
+    if plan.removed:
+        await vector_service.refresh_state()
+    return plan.stats(total)
+
+async def ingest_upload(file: UploadFile, workspace: str) -> dict:
+    """Spool to disk -> extract incrementally -> chunk as a stream -> embed/upsert in batches."""
+    with stage(INGEST_STAGE_SECONDS, "spool"):
+        path = await spool_upload(file)
+    try:
+        stats = await index_chunk_stream(iter_file_chunks(path, file.filename), file.filename, workspace)
+        stats["size_bytes"] = os.path.getsize(path)
+        return stats
+    finally:
+        os.remove(path)
+
+
+def _chunk_source_file(source, filename: str, workspace: str) -> tuple[list[str], list[dict], float]:
+    """Parses + chunks one file of a tree (runs in a worker thread)."""
+    start = time.perf_counter()
+    batch = list(iter_file_chunks(source.path, filename))
+    texts, metas = batch_texts_and_metas(batch, filename, 0, workspace)
+    return texts, metas, time.perf_counter() - start
+
+
+def _file_report(filename: str, size_bytes: int) -> dict:
+    return {
+        "filename": filename, "status": "unchanged", "size_bytes": size_bytes,
+        "chunks": 0, "skipped": 0, "updated": 0, "removed": 0,
+        "seconds": 0.0, "mb_per_sec": None, "chunks_per_sec": None, "error": None,
+    }
+
+
+class TreeIndexer:
+    """
+    One embed/upsert pipeline for a whole tree of files. Files are parsed and chunked
+    by INGEST_PARSE_WORKERS threads; their new chunks are pooled into cross-file batches
+    of UPSERT_BATCH_SIZE, so a repository of small files still embeds in full batches.
+    Each file is still re-indexed incrementally (ReindexPlan). Embedding time of a
+    batch is attributed to its files by their share of its chunks.
+    """
+
+    def __init__(self, prefix: str = "", workspace: str = settings.DEFAULT_WORKSPACE):
+        self.prefix = prefix
+        self.workspace = workspace
+        self.reports: dict[str, dict] = {}
+        self._texts: list[str] = []
+        self._metas: list[dict] = []
+        self._updates: list[tuple[str, dict]] = []
+        self._deletes: list[str] = []
+        self._totals: list[tuple[str, int]] = []
+        self._waiting: list[str] = []  # файли, чиї зміни ще лежать у буфері
+
+    async def _add_file(self, filename: str, texts: list[str], metas: list[dict]):
+        known = await asyncio.to_thread(file_catalog.get, filename, self.workspace)
+        # Нових файлів (немає в каталозі) ще нема в Qdrant: не скролимо колекцію заради порожнього результату
+        plan = ReindexPlan(await vector_service.file_points(filename, self.workspace) if known else {})
+        for meta in metas:
+            meta["total_chunks"] = len(texts)
+        new_texts, new_metas, updates = plan.diff(texts, metas)
+        removed = plan.removed_ids()
+        # skipped буває і в нового файлу (повтори чанків у ньому самому), тоді known = None
+        if plan.skipped and (known is None or known["chunks"] != len(texts)):
+            self._totals.append((filename, len(texts)))
+
+        report = self.reports[filename]
+        report.update(plan.stats(len(texts)))
+        report["status"] = "indexed" if new_texts or updates or removed else "unchanged"
+        self._texts += new_texts
+        self._metas += new_metas
+        self._updates += updates
+        self._deletes += removed
+        self._waiting.append(filename)
+        if len(self._texts) >= settings.UPSERT_BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        start = time.perf_counter()
+        texts, metas = self._texts, self._metas
+        self._texts, self._metas = [], []
+        await vector_service.add_documents(texts, metas)
+        await vector_service.update_payloads(self._updates)
+        await vector_service.delete_points(self._deletes)
+        for filename, total in self._totals:
+            await vector_service.set_file_payload(filename, {"total_chunks": total}, self.workspace)
+        self._updates, self._deletes, self._totals = [], [], []
+
+        elapsed = time.perf_counter() - start
+        owners: dict[str, int] = {}
+        for meta in metas:
+            owners[meta["filename"]] = owners.get(meta["filename"], 0) + 1
+        for filename, count in owners.items():
+            self.reports[filename]["seconds"] += elapsed * count / len(metas)
+
+        finished = [self.reports[f] for f in self._waiting]
+        self._waiting = []
+        rows = [(r["filename"], r["chunks"], r["size_bytes"]) for r in finished]
+        await asyncio.to_thread(file_catalog.upsert_many, rows, self.workspace)
+
+    async def run(self, files: list) -> list[dict]:
+        """Indexes every SourceFile; a file that fails to parse is reported and skipped."""
+        # Наступні файли парсяться, поки поточні ембедяться; вікно обмежує пам'ять
+        window = max(1, settings.INGEST_PARSE_WORKERS)
+        sources = iter(files)
+        in_flight = deque()
+
+        def submit(source):
+            filename = f"{self.prefix}{source.rel_path}"
+            in_flight.append((filename, source, asyncio.create_task(asyncio.to_thread(_chunk_source_file, source, filename, self.workspace))))
+
+        for source in itertools.islice(sources, window):
+            submit(source)
+        try:
+            while in_flight:
+                filename, source, task = in_flight.popleft()
+                next_source = next(sources, None)
+                if next_source:
+                    submit(next_source)
+                report = self.reports[filename] = _file_report(filename, source.size_bytes)
+                try:
+                    texts, metas, report["seconds"] = await task
+                except Exception as e:
+                    report.update(status="failed", error=str(e))
+                    continue
+                if not texts:
+                    report.update(status="failed", error="Empty file")
+                    continue
+                await self._add_file(filename, texts, metas)
+            await self.flush()
+        finally:
+            for _, _, task in in_flight:
+                task.cancel()
+
+        for report in self.reports.values():
+            if report["seconds"] and report["status"] != "failed":
+                report["seconds"] = round(report["seconds"], 4)
+                report["mb_per_sec"] = round(report["size_bytes"] / (1024 * 1024) / report["seconds"], 3)
+                report["chunks_per_sec"] = round(report["chunks"] / report["seconds"], 2)
+        return list(self.reports.values())
+
+
+async def ingest_tree(root: str, prefix: str = "", workspace: str = settings.DEFAULT_WORKSPACE) -> dict:
+    """
+    Walks a directory (in parallel, honouring .gitignore and size limits) and indexes
+    every supported file through one batched pipeline. Returns per-file reports and
+    aggregate totals / throughput.
+    """
+    start = time.perf_counter()
+    walk = await asyncio.to_thread(walk_tree, root)
+    walk_seconds = time.perf_counter() - start
+
+    files = await TreeIndexer(prefix, workspace).run(walk.files)
+    changed = [(workspace, f["filename"]) for f in files if f["updated"] or f["removed"]]
+    if changed:
+        response_cache.invalidate_files(changed)
+    if any(f["removed"] for f in files):
+        await vector_service.refresh_state()
+
+    duration = time.perf_counter() - start
+    indexed = [f for f in files if f["status"] != "failed"]
+    size_bytes = sum(f["size_bytes"] for f in indexed)
+    chunks = sum(f["chunks"] for f in indexed)
+    by_status = {status: sum(f["status"] == status for f in files) for status in ("indexed", "unchanged", "failed")}
+    return {
+        "files_indexed": by_status["indexed"],
+        "files_unchanged": by_status["unchanged"],
+        "files_failed": by_status["failed"],
+        "files_skipped": walk.skipped,
+        "size_bytes": size_bytes,
+        "chunks": chunks,
+        "skipped": sum(f["skipped"] for f in indexed),
+        "updated": sum(f["updated"] for f in indexed),
+        "removed": sum(f["removed"] for f in indexed),
+        "walk_seconds": round(walk_seconds, 3),
+        "duration": round(duration, 3),
+        "mb_per_sec": round(size_bytes / (1024 * 1024) / duration, 3) if duration else None,
+        "chunks_per_sec": round(chunks / duration, 2) if duration else None,
+        "files": files,
+    }
+
+
+async def ingest_archive(file: UploadFile, prefix: str = None, workspace: str = settings.DEFAULT_WORKSPACE) -> dict:
+    """Spools an uploaded zip/tar, extracts it safely into a temp dir and runs ingest_tree on it."""
+    path = await spool_upload(file)
+    dest = tempfile.mkdtemp(prefix="vectrieve_tree_")
+    try:
+        if os.path.getsize(path) > settings.INGEST_MAX_ARCHIVE_MB * 1024 * 1024:
+            raise ArchiveError(f"Archive is larger than {settings.INGEST_MAX_ARCHIVE_MB} MB (INGEST_MAX_ARCHIVE_MB)")
+        await asyncio.to_thread(extract_archive, path, file.filename, dest)
+        root = dest
+        # GitHub-архіви кладуть усе в один каталог "repo-main/": не дублюємо його в іменах файлів
+        entries = os.listdir(dest)
+        if len(entries) == 1 and os.path.isdir(os.path.join(dest, entries[0])):
+            root = os.path.join(dest, entries[0])
+        return await ingest_tree(root, tree_prefix(file.filename) if prefix is None else prefix, workspace)
+    finally:
+        os.remove(path)
+        await asyncio.to_thread(remove_tree, dest)
+
+
+def tree_prefix(name: str) -> str:
+    """Default filename prefix for a tree: "repo/" for repo.zip, repo.tar.gz or /srv/repo."""
+    base = os.path.basename(name.rstrip("/\\"))
+    for suffix in ARCHIVE_SUFFIXES:
+        if base.lower().endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return f"{base}/" if base else ""
@@ -0,0 +1,96 @@
+"""
+Code that runs inside the ingestion worker processes.
+
+Each process loads its own FastEmbed model and a synchronous Qdrant client once
+(in `init_worker`) and then processes whole jobs: parse -> chunk -> embed -> upsert.
+Nothing here may import vector_service, which belongs to the API process.
+"""
+import itertools
+import os
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from app.core.config import settings
+from app.services.chunking_service import batch_texts_and_metas, iter_file_chunks
+from app.services.job_store import JobStore
+from app.services.point_builder import (
+    POSITION_KEYS, ReindexPlan, build_points, file_filter, has_sparse_vectors, payload_update_ops, to_sparse_vector,
+)
+
+_model = None
+_sparse_model = None
+_client = None
+_store = None
+
+
+def init_worker(threads: int = None):
+    global _model, _sparse_model, _client, _store
+    from fastembed import SparseTextEmbedding, TextEmbedding
+
+    _model = TextEmbedding(model_name=settings.EMBED_MODEL_NAME, threads=threads)
+    _client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+    # BM25 пишемо лише якщо колекція має sparse-вектор (див. VectorService.ensure_collection)
+    if settings.SPARSE_MODEL_NAME and has_sparse_vectors(_client.get_collection(settings.COLLECTION_NAME)):
+        try:
+            _sparse_model = SparseTextEmbedding(model_name=settings.SPARSE_MODEL_NAME)
+        except Exception as e:
+            print(f"⚠️ Sparse model unavailable in worker {os.getpid()}: {e}")
+    _store = JobStore(settings.JOBS_DB)
+    print(f"👷 Ingest worker {os.getpid()} ready")
+
+
+def _file_points(collection: str, filename: str, workspace: str) -> dict[str, dict]:
+    existing = {}
+    offset = None
+    while True:
+        points, offset = _client.scroll(
+            collection_name=collection,
+            scroll_filter=file_filter(filename, workspace),
+            limit=1000,
+            with_payload=list(POSITION_KEYS),
+            with_vectors=False,
+            offset=offset,
+        )
+        for p in points:
+            existing[str(p.id)] = p.payload or {}
+        if offset is None:
+            return existing
+
+
+def run_ingest_job(job_id: str, path: str, filename: str, workspace: str) -> dict:
+    """
+    Indexes one spooled file incrementally (see ReindexPlan) and returns
+    {"chunks", "skipped", "updated", "removed"}. Progress goes to JobStore.
+    """
+    collection = settings.COLLECTION_NAME
+    plan = ReindexPlan(_file_points(collection, filename, workspace))
+    chunks = iter_file_chunks(path, filename)
+    total = 0
+    while True:
+        batch = list(itertools.islice(chunks, settings.UPSERT_BATCH_SIZE))
+        if not batch:
+            break
+        texts, metas = batch_texts_and_metas(batch, filename, total, workspace)
+        texts, metas, updates = plan.diff(texts, metas)
+        if texts:
+            vectors = [v.tolist() for v in _model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE)]
+            sparse = None
+            if _sparse_model is not None:
+                sparse = [to_sparse_vector(e) for e in _sparse_model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE)]
+            _client.upsert(collection_name=collection, points=build_points(texts, metas, vectors, sparse), wait=settings.UPSERT_WAIT)
+        if updates:
+            _client.batch_update_points(collection_name=collection, update_operations=payload_update_ops(updates), wait=settings.UPSERT_WAIT)
+        total += len(batch)
+        _store.update_progress(job_id, total)
+
+    if total == 0:
+        raise ValueError("Empty file")
+
+    removed = plan.removed_ids()
+    if removed:
+        _client.delete(collection_name=collection, points_selector=models.PointIdsList(points=removed))
+    _client.set_payload(
+        collection_name=collection,
+        payload={"total_chunks": total},
+        points=models.FilterSelector(filter=file_filter(filename, workspace))
+    )
+    return plan.stats(total)
@@ -0,0 +1,201 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from fastapi import UploadFile
+try:
+    import fcntl
+except ImportError:  # Windows: там лише один процес API, блокування не потрібне
+    fcntl = None
+from app.core.config import settings
+from app.services.cache_service import response_cache
+from app.services.file_catalog import file_catalog
+from app.services.ingest_worker import init_worker, run_ingest_job
+from app.services.job_store import JobStore
+from app.services.parser_service import READ_BLOCK_SIZE
+from app.services.vector_service import vector_service
+
+
+def job_workspace(job: dict) -> str:
+    return job.get("workspace") or settings.DEFAULT_WORKSPACE
+
+
+def job_view(job: dict) -> dict:
+    """Public representation of a job row with progress and throughput numbers."""
+    started, finished = job.get("started_at"), job.get("finished_at")
+    elapsed = None
+    if started:
+        elapsed = (finished or time.time()) - started
+    chunks_per_sec = mb_per_sec = None
+    if elapsed:
+        chunks_per_sec = round(job["chunks_done"] / elapsed, 2)
+        if finished:
+            mb_per_sec = round(job["size_bytes"] / (1024 * 1024) / elapsed, 3)
+    return {
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "workspace": job_workspace(job),
+        "status": job["status"],
+        "size_bytes": job["size_bytes"],
+        "chunks_done": job["chunks_done"],
+        "skipped": job["skipped"],
+        "updated": job["updated"],
+        "removed": job["removed"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": started,
+        "finished_at": finished,
+        "elapsed": round(elapsed, 3) if elapsed is not None else None,
+        "chunks_per_sec": chunks_per_sec,
+        "mb_per_sec": mb_per_sec,
+    }
+
+
+def _copy_upload(src, dst_path: str):
+    src.seek(0)
+    with open(dst_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, READ_BLOCK_SIZE)
+
+
+class JobManager:
+    """
+    Background ingestion: uploads are persisted to JOBS_DIR + JobStore and processed
+    by a pool of INGEST_WORKERS separate processes, so FastEmbed can use every core
+    and the HTTP request returns immediately.
+    """
+
+    def __init__(self):
+        self.store: Optional[JobStore] = None
+        self._lock_file = None  # тримаємо flock, поки цей процес — диспетчер
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._running: dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # Ділимо ядра між воркерами, щоб ONNX-потоки не конкурували між собою
+        threads = settings.INGEST_EMBED_THREADS or max(1, (os.cpu_count() or 1) // settings.INGEST_WORKERS)
+        return ProcessPoolExecutor(
+            max_workers=settings.INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(threads,),
+        )
+
+    def _try_lead(self) -> bool:
+        """
+        With several API workers only one of them runs jobs (and owns the process
+        pool): an exclusive flock next to JOBS_DB. The others just queue uploads;
+        when the leader exits its lock is released and the next poll takes over.
+        """
+        if self._lock_file is not None:
+            return True
+        lock_file = open(settings.JOBS_DB + ".lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        # Лише диспетчер має право повертати "running" у чергу: інші процеси не знають, чиї це задачі
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            print(f"♻️ Requeued {requeued} interrupted ingestion job(s)")
+        self._pool = self._create_pool()
+        print(f"👷 Job dispatcher running in pid {os.getpid()}")
+        return True
+
+    def is_leader(self) -> bool:
+        """True if this process is (or just became) the job dispatcher."""
+        return self.store is not None and self._try_lead()
+
+    def start(self):
+        os.makedirs(settings.JOBS_DIR, exist_ok=True)
+        self.store = JobStore(settings.JOBS_DB)
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for task in self._running.values():
+            task.cancel()
+        if self._pool:
+            # Незавершені задачі лишаються в статусі running і повернуться в чергу при старті
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def submit(self, file: UploadFile, workspace: str = settings.DEFAULT_WORKSPACE) -> str:
+        job_id = uuid.uuid4().hex
+        _, ext = os.path.splitext(file.filename or "")
+        path = os.path.join(settings.JOBS_DIR, f"{job_id}{ext.lower()}")
+        await asyncio.to_thread(_copy_upload, file.file, path)
+        await asyncio.to_thread(self.store.create, file.filename, path, os.path.getsize(path), job_id, workspace)
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        return job_view(job) if job else None
+
+    async def list(self, limit: int = 50) -> list[dict]:
+        return [job_view(j) for j in await asyncio.to_thread(self.store.list, limit)]
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            while self._try_lead() and len(self._running) < settings.INGEST_WORKERS:
+                job = await asyncio.to_thread(self.store.claim_next)
+                if job is None:
+                    break
+                self._running[job["id"]] = asyncio.create_task(self._run(job))
+            try:
+                # Прокидаємось на новий submit/завершення, або раз на кілька секунд
+                await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: dict):
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        workspace = job_workspace(job)
+        try:
+            stats = await loop.run_in_executor(pool, run_ingest_job, job["id"], job["path"], job["filename"], workspace)
+            # sqlite-виклики блокують: не тримаємо ними event loop
+            await asyncio.to_thread(self.store.finish, job["id"], chunks_done=stats["chunks"], stats=stats)
+            if stats["updated"] or stats["removed"]:
+                response_cache.invalidate_files([(workspace, job["filename"])])
+            await asyncio.to_thread(file_catalog.upsert, job["filename"], stats["chunks"], job["size_bytes"],
+                                    workspace=workspace)
+            await vector_service.refresh_state()
+            print(f"✅ Job {job['id']} ({job['filename']}): {stats['chunks']} chunks, "
+                  f"{stats['updated']} indexed, {stats['skipped']} unchanged, {stats['removed']} removed")
+        except BrokenProcessPool as e:
+            await asyncio.to_thread(self.store.finish, job["id"], error=f"Worker crashed: {e}")
+            if self._pool is pool:
+                print(f"⚠️ Ingest worker crashed, restarting pool: {e}")
+                self._pool = self._create_pool()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.finish, job["id"], error=str(e))
+            print(f"❌ Job {job['id']} ({job['filename']}) failed: {e}")
+        finally:
+            self._running.pop(job["id"], None)
+            self._wakeup.set()
+
+        if os.path.exists(job["path"]):
+            os.remove(job["path"])
+
+
+job_manager = JobManager()
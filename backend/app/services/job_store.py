@@ -0,0 +1,128 @@
+import sqlite3
+from contextlib import contextmanager
+import time
+import uuid
+from typing import Optional
+
+# Статуси: queued -> running -> done | failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    workspace TEXT,
+    path TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+"""
+
+# Колонки, додані після першої версії схеми (для вже існуючих баз)
+_MIGRATIONS = {
+    "skipped": "ALTER TABLE jobs ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0",
+    "updated": "ALTER TABLE jobs ADD COLUMN updated INTEGER NOT NULL DEFAULT 0",
+    "removed": "ALTER TABLE jobs ADD COLUMN removed INTEGER NOT NULL DEFAULT 0",
+    "workspace": "ALTER TABLE jobs ADD COLUMN workspace TEXT",  # NULL = settings.DEFAULT_WORKSPACE
+}
+
+
+class JobStore:
+    """
+    Persistent ingestion queue in SQLite (WAL). Shared by the API process and the
+    worker processes: workers report progress by updating their own row.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in _MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(ddl)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, filename: str, path: str, size_bytes: int, job_id: str = None, workspace: str = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, filename, workspace, path, size_bytes, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, workspace, path, size_bytes, QUEUED, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> list[dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def claim_next(self) -> Optional[dict]:
+        """Atomically moves the oldest queued job to running and returns it."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, chunks_done = 0, error = NULL WHERE id = ?",
+                (RUNNING, time.time(), row["id"]),
+            )
+        job = dict(row)
+        job["status"] = RUNNING
+        return job
+
+    def update_progress(self, job_id: str, chunks_done: int):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET chunks_done = ? WHERE id = ?", (chunks_done, job_id))
+
+    def finish(self, job_id: str, chunks_done: int = None, error: str = None, stats: dict = None):
+        """Marks the job done or failed. `stats` carries the incremental reindex counters."""
+        status = FAILED if error else DONE
+        stats = stats or {}
+        with self._connect() as conn:
+            if chunks_done is None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (status, error, time.time(), job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, chunks_done = ?, skipped = ?, updated = ?, removed = ?, "
+                    "finished_at = ? WHERE id = ?",
+                    (status, error, chunks_done, stats.get("skipped", 0), stats.get("updated", 0),
+                     stats.get("removed", 0), time.time(), job_id),
+                )
+
+    def requeue_interrupted(self) -> int:
+        """Jobs that were running when the server stopped go back to the queue."""
+        with self._connect() as conn:
+            cur = conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+            return cur.rowcount
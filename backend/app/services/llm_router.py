@@ -0,0 +1,323 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+from app.core.config import settings
+from app.core.metrics import LLM_SECONDS
+
+
+class ProviderUnavailable(Exception):
+    """No provider could serve the request (all failed, busy or behind an open breaker)."""
+
+
+class Ewma:
+    """Exponentially weighted moving average; None until the first value."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    def add(self, x: float):
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold consecutive failures) -> open -> (reset_seconds) ->
+    half_open: exactly one probe request goes through; its success closes the
+    breaker, its failure opens it again for another reset_seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+    def release(self):
+        """The request was cancelled before it proved anything (e.g. it lost a hedge race)."""
+        self._probing = False
+
+
+class Provider(ABC):
+    """
+    One LLM backend behind the router: a concurrency limit (semaphore), a circuit
+    breaker and EWMAs of time-to-first-token, total latency and error rate.
+    Subclasses implement _stream().
+    """
+
+    def __init__(self, name: str, model: str, max_concurrency: int, breaker: CircuitBreaker = None):
+        self.name = name
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = breaker or CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.ttft = Ewma(settings.LLM_EWMA_ALPHA)
+        self.latency = Ewma(settings.LLM_EWMA_ALPHA)
+        self.error_rate = Ewma(settings.LLM_EWMA_ALPHA)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0  # черга на семафор не дочекалась / breaker відкритий
+        self.cancelled = 0  # програли hedge або клієнт пішов
+
+    @abstractmethod
+    def _stream(self, messages: list, temperature: float) -> AsyncIterator[str]:
+        """Yields the answer's text deltas."""
+
+    def score(self) -> float:
+        """Lower is better: expected time to first token, inflated by the recent error rate."""
+        ttft = self.ttft.value if self.ttft.value is not None else 0.0
+        return ttft * (1 + 4 * (self.error_rate.value or 0.0))
+
+    async def stream(self, messages: list, temperature: float) -> AsyncIterator[str]:
+        """_stream() wrapped in the breaker, the semaphore and the stats."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), settings.LLM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            self.breaker.release()
+            raise ProviderUnavailable(f"{self.name}: {self.max_concurrency} generations already running")
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+
+        self.in_flight += 1
+        self.requests += 1
+        start = time.perf_counter()
+        first = None
+        try:
+            async for delta in self._stream(messages, temperature):
+                if first is None:
+                    first = time.perf_counter()
+                    self.ttft.add(first - start)
+                    LLM_SECONDS.observe(first - start, provider=self.name, phase="ttft")
+                yield delta
+        except Exception:
+            self.failures += 1
+            self.error_rate.add(1.0)
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # CancelledError / GeneratorExit: відмова не з вини провайдера
+            self.cancelled += 1
+            self.breaker.release()
+            raise
+        else:
+            self.error_rate.add(0.0)
+            self.latency.add(time.perf_counter() - start)
+            LLM_SECONDS.observe(time.perf_counter() - start, provider=self.name, phase="total")
+            if first is None:
+                self.ttft.add(time.perf_counter() - start)
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        def r(v):
+            return round(v, 4) if v is not None else None
+        return {
+            "model": self.model,
+            "breaker": self.breaker.state,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "ttft_ewma": r(self.ttft.value),
+            "latency_ewma": r(self.latency.value),
+            "error_rate_ewma": r(self.error_rate.value),
+        }
+
+
+class GroqProvider(Provider):
+    def __init__(self, client, model: str = None):
+        super().__init__("cloud", model or settings.MODEL_NAME, settings.CLOUD_MAX_CONCURRENCY)
+        self.client = client
+
+    async def _stream(self, messages, temperature):
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=1024,
+            stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class OllamaProvider(Provider):
+    def __init__(self, client, model: str = None):
+        # Ліміт на весь сервер, тож кожен воркер бере свою частку (але хоча б 1 слот)
+        per_worker = max(1, settings.LOCAL_MAX_CONCURRENCY // max(1, settings.API_WORKERS))
+        super().__init__("local", model or settings.LOCAL_MODEL_NAME, per_worker)
+        self.client = client
+
+    async def _stream(self, messages, temperature):
+        stream = await self.client.chat(
+            model=self.model,
+            messages=messages,
+            options={'temperature': temperature},
+            stream=True
+        )
+        async for part in stream:
+            delta = part['message']['content']
+            if delta:
+                yield delta
+
+
+class LLMRouter:
+    """
+    Picks and races providers for one generation:
+      - providers behind an open breaker are skipped without a request;
+      - a provider that fails before its first token is replaced by the next one;
+      - with hedge_ms > 0, if the current provider has produced no token within
+        hedge_ms, the next one is started too and whichever answers first wins
+        (the other is cancelled);
+      - once a token has been sent, the answer is committed to that provider.
+    """
+
+    def __init__(self, providers: dict[str, Provider], hedge_ms: float = 0):
+        self.providers = providers
+        self.hedge_ms = hedge_ms
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def candidates(self, preferred: str, allow_fallback: bool = True) -> list[Provider]:
+        """
+        Providers to try, in order: the preferred one, then the others by score()
+        (their TTFT / error EWMAs). Providers behind an open breaker are left out;
+        the breaker's half-open probe is what brings them back.
+        """
+        primary = self.providers.get(preferred)
+        if not allow_fallback:
+            return [primary] if primary else []
+        others = sorted((p for name, p in self.providers.items() if name != preferred), key=lambda p: p.score())
+        ordered = ([primary] if primary else []) + others
+        return [p for p in ordered if p.breaker.state != "open"]
+
+    async def stream(self, messages: list, temperature: float, candidates: list[Provider]) -> AsyncIterator[tuple[str, str]]:
+        """Yields (token_delta, model) from the winning provider."""
+        pending = list(candidates)
+        if not pending:
+            raise ProviderUnavailable("No LLM provider available (all circuit breakers open)")
+        racers: dict[asyncio.Task, tuple[Provider, AsyncIterator]] = {}
+        launched: list[AsyncIterator] = []
+        errors = []
+        hedged = False
+
+        def launch():
+            provider = pending.pop(0)
+            gen = provider.stream(messages, temperature)
+            launched.append(gen)
+            racers[asyncio.ensure_future(gen.__anext__())] = (provider, gen)
+
+        winner = None
+        launch()
+        try:
+            while racers:
+                timeout = None
+                if self.hedge_ms and pending and not hedged and len(racers) == 1:
+                    timeout = self.hedge_ms / 1000
+                done, _ = await asyncio.wait(racers, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    print(f"⏱️ No first token in {self.hedge_ms:.0f} ms, hedging with {pending[0].name}...")
+                    launch()
+                    continue
+                for task in done:
+                    provider, gen = racers.pop(task)
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        errors.append(f"{provider.name}: {e}")
+                        print(f"⚠️ {provider.name} failed ({e})")
+                        continue
+                    winner = (provider, gen, first)
+                    break
+                if winner:
+                    break
+                if not racers and pending:
+                    self.fallbacks += 1
+                    launch()
+        finally:
+            for task in racers:
+                task.cancel()
+            if racers:
+                await asyncio.gather(*racers, return_exceptions=True)
+            # Хто програв (у т.ч. видав перший токен у тому ж раунді) — закриваємо, щоб звільнити слот семафора
+            for gen in launched:
+                if winner is None or gen is not winner[1]:
+                    await gen.aclose()
+
+        if winner is None:
+            raise ProviderUnavailable("; ".join(errors) or "No LLM provider available")
+        provider, gen, first = winner
+        if hedged and provider is not candidates[0]:
+            self.hedge_wins += 1
+        try:
+            if first is None:
+                return
+            yield first, provider.model
+            async for delta in gen:
+                yield delta, provider.model
+        finally:
+            # Клієнт пішов посеред відповіді — генерація провайдера теж закривається одразу
+            await gen.aclose()
+
+    async def generate(self, messages: list, temperature: float, candidates: list[Provider]) -> tuple[str, str]:
+        parts, model = [], None
+        async for delta, model in self.stream(messages, temperature, candidates):
+            parts.append(delta)
+        return "".join(parts), model or candidates[0].model
+
+    def stats(self) -> dict:
+        return {
+            "hedge_ms": self.hedge_ms,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "fallbacks": self.fallbacks,
+            "providers": {name: p.stats() for name, p in self.providers.items()},
+        }
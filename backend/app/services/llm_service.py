@@ -1,8 +1,8 @@
-import os
 from groq import AsyncGroq
 import ollama
 from app.core.config import settings
 from app.models.schemas import QueryRequest
+from app.services.llm_router import GroqProvider, LLMRouter, OllamaProvider
 
 class LLMService:
     def __init__(self):
@@ -10,16 +10,27 @@ class LLMService:
         self.groq_client = None
         if settings.GROQ_API_KEY:
             try:
-                self.groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+                # Ретраї робить роутер (fallback / hedge), а не SDK: інакше збій Groq коштує кілька таймаутів
+                self.groq_client = AsyncGroq(
+                    api_key=settings.GROQ_API_KEY,
+                    base_url=settings.GROQ_BASE_URL or None,
+                    timeout=settings.GROQ_TIMEOUT_SECONDS,
+                    max_retries=settings.GROQ_MAX_RETRIES,
+                )
                 print(f"☁️ Groq Client initialized: {settings.MODEL_NAME}")
             except Exception as e:
                 print(f"⚠️ Groq Init Warning: {e}")
 
-    async def generate_response(self, request: QueryRequest, context_str: str) -> tuple[str, str]:
-        """
-        Генерує відповідь, вибираючи між Cloud (Groq) та Local (Ollama).
-        Повертає: (response_text, used_model_name)
-        """
+        # Асинхронний клієнт Ollama, щоб локальна генерація не блокувала event loop
+        self.ollama_client = ollama.AsyncClient(host=settings.OLLAMA_HOST)
+
+        providers = {"local": OllamaProvider(self.ollama_client)}
+        if self.groq_client:
+            providers = {"cloud": GroqProvider(self.groq_client), **providers}
+        self.router = LLMRouter(providers, hedge_ms=settings.LLM_HEDGE_MS)
+
+    def _build_messages(self, request: QueryRequest, context_str: str) -> tuple[list, float]:
+        """Збирає системний промпт + історію чату. Повертає: (messages, temperature)"""
         # 1. Вибір персони (Thinking Mode)
         mode_key = request.thinking_mode.lower()
         persona = settings.THINKING_MODES.get(mode_key, settings.THINKING_MODES["mentor"])
@@ -49,38 +60,38 @@ class LLMService:
         messages = [{"role": "system", "content": system_prompt}]
         for m in request.messages:
             messages.append({"role": m.role, "content": m.content})
+        return messages, temperature
 
-        # 4. Логіка вибору провайдера (Cloud vs Local)
-        force_local = (request.mode == "local") or (not self.groq_client)
-        
-        if force_local:
-            return self._run_local(messages, temperature)
-        else:
-            try:
-                return await self._run_cloud(messages, temperature)
-            except Exception as e:
-                print(f"⚠️ Cloud failed ({e}). Switching to LOCAL...")
-                return self._run_local(messages, temperature)
+    def _force_local(self, request: QueryRequest) -> bool:
+        return (request.mode == "local") or (not self.groq_client)
+
+    def _candidates(self, request: QueryRequest):
+        # Режим local ніколи не відправляє запит у хмару
+        if self._force_local(request):
+            return self.router.candidates("local", allow_fallback=False)
+        return self.router.candidates("cloud")
 
-    async def _run_cloud(self, messages, temperature):
-        """Виклик Groq API"""
-        print(f"☁️ Using Groq ({settings.MODEL_NAME})...")
-        completion = await self.groq_client.chat.completions.create(
-            model=settings.MODEL_NAME,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=1024
-        )
-        return completion.choices[0].message.content, settings.MODEL_NAME
+    def prompt_models(self, request: QueryRequest) -> list[str]:
+        """Every model the request may end up on (the prompt must fit the smallest budget)."""
+        candidates = self._candidates(request)
+        return [c.model for c in candidates] or [settings.LOCAL_MODEL_NAME]
 
-    def _run_local(self, messages, temperature):
-        """Виклик Ollama (Local)"""
-        print(f"🔒 Using Local ({settings.LOCAL_MODEL_NAME})...")
-        response = ollama.chat(
-            model=settings.LOCAL_MODEL_NAME,
-            messages=messages,
-            options={'temperature': temperature}
-        )
-        return response['message']['content'], settings.LOCAL_MODEL_NAME
+    async def generate_response(self, request: QueryRequest, context_str: str) -> tuple[str, str]:
+        """
+        Генерує відповідь через роутер провайдерів (Cloud / Local).
+        Повертає: (response_text, used_model_name)
+        """
+        messages, temperature = self._build_messages(request, context_str)
+        return await self.router.generate(messages, temperature, self._candidates(request))
+
+    async def stream_response(self, request: QueryRequest, context_str: str):
+        """
+        Потокова версія generate_response.
+        Async-генератор пар (token_delta, used_model_name).
+        Fallback / hedge на інший провайдер можливий лише поки не віддано жодного токена.
+        """
+        messages, temperature = self._build_messages(request, context_str)
+        async for delta, model in self.router.stream(messages, temperature, self._candidates(request)):
+            yield delta, model
 
-llm_service = LLMService()
\ No newline at end of file
+llm_service = LLMService()
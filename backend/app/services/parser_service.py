@@ -1,71 +1,182 @@
+import asyncio
+import itertools
+import multiprocessing
 import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
 from fastapi import UploadFile
+from app.core.config import settings
 
 # Список розширень, які ми будемо читати як звичайний текст (код)
 CODE_EXTENSIONS = {
-    '.py', '.js', '.ts', '.tsx', '.jsx', 
-    '.java', '.cpp', '.c', '.h', '.cs', 
-    '.go', '.rs', '.php', '.rb', 
-    '.json', '.yaml', '.yml', '.xml', 
-    '.html', '.css', '.scss', '.sql', 
+    '.py', '.js', '.ts', '.tsx', '.jsx',
+    '.java', '.cpp', '.c', '.h', '.cs',
+    '.go', '.rs', '.php', '.rb',
+    '.json', '.yaml', '.yml', '.xml',
+    '.html', '.css', '.scss', '.sql',
     '.sh', '.bat', '.md', '.txt', '.env'
 }
 
-async def read_text_file(file: UploadFile) -> str:
-    """Reads generic text or code files."""
-    content = await file.read()
-    try:
-        return content.decode("utf-8")
-    except UnicodeDecodeError:
-        # Fallback for Windows-1251 or other encodings if UTF-8 fails
+# Скільки символів/байтів читаємо за раз: пам'ять не залежить від розміру файлу
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class ParseError(Exception):
+    """The uploaded file could not be read or extracted."""
+
+
+def _copy_to_disk(src, suffix: str) -> str:
+    src.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="vectrieve_") as dst:
+        shutil.copyfileobj(src, dst, READ_BLOCK_SIZE)
+        return dst.name
+
+async def spool_upload(file: UploadFile) -> str:
+    """
+    Copies the upload to a temp file on disk block by block and returns its path.
+    The caller is responsible for deleting it.
+    """
+    _, ext = os.path.splitext(file.filename or "")
+    return await asyncio.to_thread(_copy_to_disk, file.file, ext.lower())
+
+def _detect_encoding(path: str) -> tuple[str, str]:
+    """Returns (encoding, errors) for open(). Validates by streaming, without loading the file."""
+    # Fallback for Windows-1251 or other encodings if UTF-8 fails
+    for encoding in ("utf-8", "windows-1251"):
         try:
-            return content.decode("windows-1251")
-        except:
-            return content.decode("utf-8", errors="ignore")
+            with open(path, encoding=encoding) as f:
+                while f.read(READ_BLOCK_SIZE):
+                    pass
+            return encoding, "strict"
+        except UnicodeDecodeError:
+            continue
+    return "utf-8", "ignore"
 
-async def read_pdf(file: UploadFile) -> str:
-    """Extracts text from PDF using pypdf."""
+def iter_text_file(path: str) -> Iterator[str]:
+    """Reads generic text or code files in blocks."""
+    encoding, errors = _detect_encoding(path)
+    with open(path, encoding=encoding, errors=errors) as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+def _open_pdf(path: str):
     try:
         import pypdf
     except ImportError:
-        return "[Error] pypdf library not installed. Please run: pip install pypdf"
-
-    content = await file.read()
-    
-    # Save to temp file because pypdf needs a file stream or path
-    import io
-    pdf_file = io.BytesIO(content)
-    
-    text = []
+        raise ParseError("pypdf library not installed. Please run: pip install pypdf")
     try:
-        reader = pypdf.PdfReader(pdf_file)
-        for page in reader.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text.append(extracted)
-        return "\n".join(text)
+        return pypdf.PdfReader(path)
     except Exception as e:
-        return f"[Error parsing PDF: {str(e)}]"
+        raise ParseError(f"Error parsing PDF: {e}")
 
-async def parse_file(file: UploadFile) -> str:
+def _extract_pages(reader, start: int, end: int) -> list[tuple[int, str]]:
+    pages = []
+    for index in range(start, end):
+        try:
+            extracted = reader.pages[index].extract_text()
+        except Exception as e:
+            print(f"⚠️ PDF page {index + 1} skipped: {e}")
+            continue
+        if extracted:
+            pages.append((index + 1, extracted))
+    return pages
+
+def _extract_page_range(path: str, start: int, end: int) -> list[tuple[int, str]]:
+    """Extracts pages [start, end) (0-based). Runs in the PDF process pool, so it opens its own reader."""
+    return _extract_pages(_open_pdf(path), start, end)
+
+_pdf_pool = None
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pdf_pool
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+def iter_pdf_pages(path: str, workers: int = None) -> Iterator[tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order, skipping empty pages.
+    Large PDFs are sharded into page ranges and extracted by a process pool
+    (pypdf is pure Python, so threads would not help); a bounded window of
+    shards is in flight, so memory stays proportional to the window, not the book.
+    """
+    workers = settings.PDF_EXTRACT_WORKERS if workers is None else workers
+    reader = _open_pdf(path)
+    total = len(reader.pages)
+    shard = max(1, settings.PDF_PAGES_PER_SHARD)
+
+    if workers <= 1 or total < settings.PDF_PARALLEL_MIN_PAGES:
+        for start in range(0, total, shard):
+            yield from _extract_pages(reader, start, min(start + shard, total))
+        return
+    del reader
+
+    pool = _get_pdf_pool()
+    ranges = iter([(start, min(start + shard, total)) for start in range(0, total, shard)])
+    in_flight = deque()
+    for start, end in itertools.islice(ranges, workers * 2):
+        in_flight.append(pool.submit(_extract_page_range, path, start, end))
+    while in_flight:
+        pages = in_flight.popleft().result()
+        next_range = next(ranges, None)
+        if next_range:
+            in_flight.append(pool.submit(_extract_page_range, path, *next_range))
+        yield from pages
+
+def iter_pdf_text(path: str) -> Iterator[tuple[str, int]]:
+    """Extracts text from PDF page by page using pypdf. Yields (text, page_number)."""
+    first = True
+    for page_number, extracted in iter_pdf_pages(path):
+        # Сторінки розділяємо переносом рядка, як і раніше при "\n".join(...)
+        yield (extracted if first else "\n" + extracted), page_number
+        first = False
+
+def iter_file_pieces(path: str, filename: str) -> Iterator[tuple[str, Optional[int]]]:
     """
     Main entry point for parsing files.
-    Determines functionality based on file extension.
+    Yields (text_piece, page_number) pairs based on the file extension;
+    page_number is None for formats without pages.
     """
-    filename = file.filename.lower()
-    _, ext = os.path.splitext(filename)
+    _, ext = os.path.splitext(filename.lower())
 
     # 1. Parsing Code / Text
     if ext in CODE_EXTENSIONS:
         print(f"📄 Detected code/text file: {ext}")
-        return await read_text_file(file)
+        return ((block, None) for block in iter_text_file(path))
 
     # 2. Parsing PDF
     elif ext == '.pdf':
         print(f"📕 Detected PDF file.")
-        return await read_pdf(file)
+        return iter_pdf_text(path)
 
     # 3. Unsupported
     else:
         print(f"⚠️ Unsupported file type: {ext}")
-        return f"[System: Unsupported file type '{ext}'. Content could not be indexed.]"
\ No newline at end of file
+        return iter([(f"[System: Unsupported file type '{ext}'. Content could not be indexed.]", None)])
+
+def iter_file_text(path: str, filename: str) -> Iterator[str]:
+    """Yields the document text piece by piece (without page numbers)."""
+    return (text for text, _ in iter_file_pieces(path, filename))
+
+async def parse_file(file: UploadFile) -> str:
+    """Whole-document convenience wrapper. Prefer the streaming ingest pipeline for uploads."""
+    path = await spool_upload(file)
+    try:
+        return await asyncio.to_thread(lambda: "".join(iter_file_text(path, file.filename)))
+    finally:
+        os.remove(path)
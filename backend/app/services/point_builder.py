@@ -0,0 +1,156 @@
+import hashlib
+import os
+import uuid
+from qdrant_client.http import models
+from app.core.config import settings
+
+# Розмірність BAAI/bge-small-en-v1.5
+VECTOR_SIZE = 384
+
+# Іменований sparse-вектор (BM25) поруч із неіменованим dense-вектором
+SPARSE_VECTOR_NAME = "bm25"
+
+# Фіксований namespace для детермінованих ID чанків (не змінювати: ID у колекції від нього залежать)
+POINT_NAMESPACE = uuid.UUID("6f1c2b8e-3d4a-5e6f-8a9b-0c1d2e3f4a5b")
+
+# Поля payload, які можуть змінитися без зміни тексту чанку (зсув позиції у файлі, зміна чанкера)
+POSITION_KEYS = ("chunk_index", "page", "page_end", "chunk_overlap")
+
+# Поля payload з keyword-індексом, за якими фільтрується пошук
+FILTER_KEYS = ("workspace", "filename", "extension")
+
+
+def point_id(filename: str, content: str, workspace: str = None) -> str:
+    """
+    Deterministic point ID: same workspace + file + chunk text -> same point.
+    The default workspace keeps the pre-workspace IDs, so existing points stay valid.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    key = f"{filename}\x1f{digest}"
+    if workspace and workspace != settings.DEFAULT_WORKSPACE:
+        key = f"{workspace}\x1e{key}"
+    return str(uuid.uuid5(POINT_NAMESPACE, key))
+
+
+def file_extension(filename: str) -> str:
+    """"src/App.PY" -> ".py" (the `extension` payload field)."""
+    return os.path.splitext(filename)[1].lower()
+
+
+def normalize_extension(ext: str) -> str:
+    """User input "py" / ".PY" -> ".py"."""
+    return "." + ext.strip().lstrip(".").lower()
+
+
+def sparse_vectors_config(on_disk: bool = False) -> dict:
+    # IDF рахує сам Qdrant по колекції, тому в точках зберігаємо лише частоти термів
+    index = models.SparseIndexParams(on_disk=True) if on_disk else None
+    return {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF, index=index)}
+
+
+def has_sparse_vectors(collection_info) -> bool:
+    return SPARSE_VECTOR_NAME in (collection_info.config.params.sparse_vectors or {})
+
+
+def to_sparse_vector(embedding) -> models.SparseVector:
+    """FastEmbed SparseEmbedding -> Qdrant SparseVector."""
+    return models.SparseVector(indices=embedding.indices.tolist(), values=embedding.values.tolist())
+
+
+def build_points(texts: list[str], metas: list[dict], vectors: list, sparse_vectors: list = None) -> list[models.PointStruct]:
+    """
+    Single place that defines how a chunk becomes a Qdrant point, shared by the
+    API process (VectorService) and the ingestion worker processes.
+    """
+    points = []
+    for i, (text, meta, vector) in enumerate(zip(texts, metas, vectors)):
+        payload = {"content": text}
+        if meta: payload.update(meta)
+        payload.setdefault("workspace", settings.DEFAULT_WORKSPACE)
+        filename = payload.get("filename")
+        if filename:
+            payload["extension"] = file_extension(filename)
+        doc_id = point_id(filename, text, payload["workspace"]) if filename else str(uuid.uuid4())
+        if sparse_vectors is not None:
+            vector = {"": vector, SPARSE_VECTOR_NAME: sparse_vectors[i]}
+        points.append(models.PointStruct(id=doc_id, vector=vector, payload=payload))
+    return points
+
+
+def file_filter(filename: str, workspace: str) -> models.Filter:
+    return models.Filter(must=[
+        models.FieldCondition(key="workspace", match=models.MatchValue(value=workspace)),
+        models.FieldCondition(key="filename", match=models.MatchValue(value=filename)),
+    ])
+
+
+def search_filter(workspace: str, filenames: list[str] = None, extensions: list[str] = None) -> models.Filter:
+    """Scopes a search to one workspace, optionally to some files and/or file extensions."""
+    must = [models.FieldCondition(key="workspace", match=models.MatchValue(value=workspace))]
+    if filenames:
+        must.append(models.FieldCondition(key="filename", match=models.MatchAny(any=list(filenames))))
+    if extensions:
+        must.append(models.FieldCondition(
+            key="extension", match=models.MatchAny(any=[normalize_extension(e) for e in extensions])
+        ))
+    return models.Filter(must=must)
+
+
+def unscoped_filter() -> models.Filter:
+    """Points written before workspaces existed (no `workspace` field)."""
+    return models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key="workspace"))])
+
+
+def payload_update_ops(updates: list[tuple[str, dict]]) -> list[models.SetPayloadOperation]:
+    return [
+        models.SetPayloadOperation(set_payload=models.SetPayload(payload=payload, points=[pid]))
+        for pid, payload in updates
+    ]
+
+
+class ReindexPlan:
+    """
+    Incremental re-indexing of one file. Knows which points the file already has
+    (id -> position payload) and, batch by batch, decides what actually needs work:
+    new/changed chunks are embedded, unchanged ones are skipped (at most their
+    position payload is patched), and whatever was not seen again gets removed.
+    """
+
+    def __init__(self, existing: dict[str, dict]):
+        self.existing = existing
+        self.seen: set[str] = set()
+        self.skipped = 0
+        self.updated = 0
+        self.removed = 0
+
+    def diff(self, texts: list[str], metas: list[dict]):
+        """Returns (texts_to_embed, their_metas, payload_updates)."""
+        new_texts, new_metas, updates = [], [], []
+        for text, meta in zip(texts, metas):
+            pid = point_id(meta["filename"], text, meta.get("workspace"))
+            if pid in self.seen:
+                # Дублікат чанку в межах того ж файлу
+                self.skipped += 1
+                continue
+            self.seen.add(pid)
+
+            old = self.existing.get(pid)
+            if old is None:
+                new_texts.append(text)
+                new_metas.append(meta)
+                self.updated += 1
+                continue
+
+            self.skipped += 1
+            changed = {k: meta.get(k) for k in POSITION_KEYS if old.get(k) != meta.get(k)}
+            if changed:
+                updates.append((pid, changed))
+        return new_texts, new_metas, updates
+
+    def removed_ids(self) -> list[str]:
+        ids = [pid for pid in self.existing if pid not in self.seen]
+        self.removed = len(ids)
+        return ids
+
+    def stats(self, chunks: int) -> dict:
+        return {"chunks": chunks, "skipped": self.skipped, "updated": self.updated, "removed": self.removed}
@@ -0,0 +1,234 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import QUERY_STAGE_SECONDS, stage
+from app.services.analytics_service import analytics_engine
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    query_id TEXT,
+    query TEXT,
+    response TEXT,
+    model TEXT,
+    thinking_mode TEXT,
+    mode TEXT,
+    cached INTEGER NOT NULL DEFAULT 0,
+    latency REAL,
+    ttft REAL,
+    embed_s REAL,
+    search_s REAL,
+    llm_s REAL
+);
+CREATE INDEX IF NOT EXISTS idx_queries_ts ON queries(ts);
+CREATE INDEX IF NOT EXISTS idx_queries_query_id ON queries(query_id);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    query_id TEXT,
+    feedback TEXT NOT NULL,
+    query TEXT,
+    response TEXT,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_ts ON feedback(ts);
+"""
+
+_QUERY_COLUMNS = (
+    "ts", "query_id", "query", "response", "model", "thinking_mode", "mode",
+    "cached", "latency", "ttft", "embed_s", "search_s", "llm_s",
+)
+_FEEDBACK_COLUMNS = ("ts", "query_id", "feedback", "query", "response", "latency")
+
+_INSERTS = {
+    "queries": f"INSERT INTO queries ({', '.join(_QUERY_COLUMNS)}) VALUES ({', '.join('?' * len(_QUERY_COLUMNS))})",
+    "feedback": f"INSERT INTO feedback ({', '.join(_FEEDBACK_COLUMNS)}) VALUES ({', '.join('?' * len(_FEEDBACK_COLUMNS))})",
+}
+
+_STOP = object()
+
+
+class QueryLog:
+    """
+    Query/feedback log in SQLite (WAL). Request handlers only put a tuple on an
+    in-memory queue; a background thread writes rows in batches, one transaction
+    per batch, so logging never blocks the request path. If the queue is full
+    (the disk cannot keep up) rows are dropped and counted instead of waiting.
+    The analytics engine (if given) is fed from the table itself, not from this
+    process's calls, so with several workers it also sees the others' rows.
+    """
+
+    def __init__(self, db_path: str, analytics=None):
+        self.db_path = db_path
+        self.analytics = analytics
+        self.dropped = 0
+        self.written = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._sync_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    # --- Запис ---
+
+    def start(self):
+        if self.analytics is not None:
+            # Снапшот — лише точка старту (немає його — рахуємо з нуля), решту рядків догортаємо з логу
+            if not self.analytics.load():
+                self.analytics.reset()
+            self.sync_analytics()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="query-log", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flushes everything that is still queued and stops the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+        if self.analytics is not None:
+            self.sync_analytics()
+            self.analytics.save()
+
+    def _put(self, table: str, row: tuple):
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def log_query(
+        self, query_id: str, query: str, response: str, model: str, thinking_mode: str, mode: str,
+        latency: float, timings: dict = None, ttft: float = None, cached: bool = False, ts: float = None,
+    ):
+        timings = timings or {}
+        ts = ts or time.time()
+        self._put("queries", (
+            ts, query_id, query, response, model, thinking_mode, mode, int(cached),
+            latency, ttft, timings.get("embed"), timings.get("search"), timings.get("llm"),
+        ))
+
+    def log_feedback(self, query_id: str, feedback: str, query: str = "", response: str = "",
+                     latency: float = None, ts: float = None):
+        ts = ts or time.time()
+        self._put("feedback", (ts, query_id, feedback, query, response, latency))
+
+    def _flush_loop(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + settings.LOG_FLUSH_SECONDS
+            # Збираємо пачку: до LOG_BATCH_SIZE рядків або LOG_FLUSH_SECONDS очікування
+            while len(batch) < settings.LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [b for b in batch if b is not _STOP]
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        rows: dict[str, list] = {}
+        for table, row in batch:
+            rows.setdefault(table, []).append(row)
+        try:
+            with stage(QUERY_STAGE_SECONDS, "log_write"), self._connect() as conn:
+                for table, values in rows.items():
+                    conn.executemany(_INSERTS[table], values)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"⚠️ Log Error: {e}")
+            return
+        if self.analytics is not None:
+            self.sync_analytics()
+            self.analytics.maybe_save()
+
+    def write_now(self, table: str, rows: list[tuple]):
+        """Synchronous bulk insert (imports / backfills), bypassing the queue."""
+        with self._connect() as conn:
+            conn.executemany(_INSERTS[table], rows)
+
+    # --- Читання ---
+
+    def iter_queries(self, batch_size: int = 10000):
+        """Streams (ts, model, thinking_mode, mode, latency, ttft, cached) in time order."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "SELECT ts, model, thinking_mode, mode, latency, ttft, cached FROM queries ORDER BY ts"
+            )
+            while rows := cur.fetchmany(batch_size):
+                yield from (tuple(r) for r in rows)
+
+    def iter_feedback(self, batch_size: int = 10000):
+        """Streams (ts, feedback) in time order."""
+        with self._connect() as conn:
+            cur = conn.execute("SELECT ts, feedback FROM feedback ORDER BY ts")
+            while rows := cur.fetchmany(batch_size):
+                yield from (tuple(r) for r in rows)
+
+    def _rows_after(self, sql: str, after_id: int, batch_size: int = 10000):
+        with self._connect() as conn:
+            cur = conn.execute(sql, (after_id,))
+            while rows := cur.fetchmany(batch_size):
+                yield from (tuple(r) for r in rows)
+
+    def sync_analytics(self):
+        """Folds rows written since the last sync, by any process, into the analytics engine."""
+        if self.analytics is None:
+            return
+        with self._sync_lock:
+            try:
+                self.analytics.apply(
+                    self._rows_after(
+                        "SELECT id, ts, model, thinking_mode, mode, latency, ttft, cached FROM queries "
+                        "WHERE id > ? ORDER BY id", self.analytics.last_query_id
+                    ),
+                    self._rows_after(
+                        "SELECT id, ts, feedback FROM feedback WHERE id > ? ORDER BY id", self.analytics.last_feedback_id
+                    ),
+                )
+            except Exception as e:
+                print(f"⚠️ Analytics sync failed: {e}")
+
+    def rebuild_analytics(self):
+        self.analytics.reset()
+        self.sync_analytics()
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+query_log = QueryLog(settings.LOGS_DB, analytics=analytics_engine)
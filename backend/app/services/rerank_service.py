@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.core.config import settings
+from app.services.fusion import label_scores
+
+
+class RerankService:
+    """
+    Second retrieval stage: a small ONNX cross-encoder (FastEmbed TextCrossEncoder)
+    re-scores the top-N vector hits against the query and keeps the best k.
+
+    Scoring runs in batches in its own thread, and stops between batches once the
+    per-request budget is spent; the request then falls back to vector order.
+    (query, chunk) scores are kept in an LRU cache, so a partially scored request
+    still makes the next identical one cheaper.
+    """
+
+    def __init__(self, model=None):
+        # Без переданої моделі крос-енкодер вантажить load() під час warm-up
+        self.model = model
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._scores: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.reranked = 0
+        self.budget_fallbacks = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.model is not None
+
+    def load(self):
+        """Loads the cross-encoder if RERANK_ENABLED (blocking). Until then rerank is off."""
+        if self.model is not None or not settings.RERANK_ENABLED:
+            return
+        try:
+            from fastembed.rerank.cross_encoder import TextCrossEncoder
+            print(f"🚀 Loading reranker {settings.RERANK_MODEL_NAME}...")
+            self.model = TextCrossEncoder(model_name=settings.RERANK_MODEL_NAME)
+        except Exception as e:
+            print(f"⚠️ Reranker unavailable, using vector order: {e}")
+
+    @staticmethod
+    def _key(query: str, hit) -> tuple:
+        # ID точки детермінований від вмісту чанку, тож пара (запит, id) однозначно задає скор
+        return hashlib.sha1(query.encode("utf-8")).hexdigest(), str(hit.id)
+
+    def _cache_get(self, key: tuple) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def _cache_put(self, key: tuple, score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > settings.RERANK_CACHE_SIZE:
+                self._scores.popitem(last=False)
+
+    def _score_sync(self, query: str, hits: list, deadline: float) -> Optional[list[float]]:
+        """Scores for all hits, or None if the budget ran out first."""
+        scores: list[Optional[float]] = []
+        missing = []
+        for i, hit in enumerate(hits):
+            score = self._cache_get(self._key(query, hit))
+            scores.append(score)
+            if score is None:
+                missing.append(i)
+        self.cache_hits += len(hits) - len(missing)
+        self.cache_misses += len(missing)
+
+        step = settings.RERANK_BATCH_SIZE
+        for start in range(0, len(missing), step):
+            if time.perf_counter() > deadline:
+                return None
+            batch = missing[start:start + step]
+            texts = [hits[i].payload.get("content", "") for i in batch]
+            for i, score in zip(batch, self.model.rerank(query, texts, batch_size=step)):
+                score = float(score)
+                scores[i] = score
+                self._cache_put(self._key(query, hits[i]), score)
+        return scores
+
+    async def rerank(self, query: str, hits: list, top_k: int, budget_ms: float = None) -> list:
+        """Returns the top_k hits by cross-encoder score (score replaced), or hits[:top_k] on timeout."""
+        if not self.enabled or len(hits) <= 1:
+            return hits[:top_k]
+        budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000
+
+        loop = asyncio.get_running_loop()
+        try:
+            scores = await loop.run_in_executor(self._executor, self._score_sync, query, hits, deadline)
+        except Exception as e:
+            print(f"⚠️ Rerank Error: {e}")
+            scores = None
+        if scores is None:
+            self.budget_fallbacks += 1
+            return hits[:top_k]
+
+        self.reranked += 1
+        order = sorted(range(len(hits)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return label_scores([hits[i].model_copy(update={"score": scores[i]}) for i in order], "rerank")
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "reranked": self.reranked,
+            "budget_fallbacks": self.budget_fallbacks,
+            "cache_entries": len(self._scores),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+rerank_service = RerankService()
@@ -0,0 +1,298 @@
+import os
+import re
+import shutil
+import stat
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Optional
+from app.core.config import settings
+from app.services.parser_service import CODE_EXTENSIONS, READ_BLOCK_SIZE, ParseError
+
+# Що взагалі вміємо індексувати з дерева файлів (без заглушки "Unsupported file type")
+TREE_EXTENSIONS = CODE_EXTENSIONS | {".pdf"}
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class ArchiveError(ParseError):
+    """The archive is malformed, unsafe or over the size limits."""
+
+
+def _translate(pattern: str) -> str:
+    """One gitignore glob -> regex over a '/'-separated relative path."""
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    """
+    Rules of one .gitignore file (base = its directory, relative to the tree root).
+    Supports comments, negation (!), directory-only rules (trailing /), anchored
+    rules (containing /), *, ?, [...] and **.
+    """
+
+    def __init__(self, lines, base: str = ""):
+        self.base = base.strip("/")
+        self.rules: list[tuple[re.Pattern, bool, bool]] = []  # (regex, negated, dir_only)
+        for line in lines:
+            line = line.rstrip("\n\r")
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            regex = _translate(line.lstrip("/"))
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            self.rules.append((re.compile(regex + r"\Z"), negated, dir_only))
+
+    @classmethod
+    def from_file(cls, path: str, base: str = "") -> "GitIgnore":
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return cls(f, base)
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True = ignored, False = re-included by a ! rule, None = no rule applies."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+def is_ignored(rules: tuple, rel_path: str, is_dir: bool) -> bool:
+    """Deeper .gitignore files and later rules win, as in git."""
+    ignored = False
+    for gitignore in rules:
+        result = gitignore.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+@dataclass
+class SourceFile:
+    path: str      # абсолютний шлях на диску
+    rel_path: str  # шлях від кореня дерева через "/"
+    size_bytes: int
+
+
+@dataclass
+class WalkResult:
+    files: list = field(default_factory=list)
+    skipped: dict = field(default_factory=dict)  # причина -> кількість файлів
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+
+def _scan_directory(root: str, rel_dir: str, rules: tuple, max_file_bytes: int, exclude: set):
+    """Lists one directory. Returns (files, [(subdir_rel, rules)], skip reasons)."""
+    directory = os.path.join(root, rel_dir) if rel_dir else root
+    gitignore = os.path.join(directory, ".gitignore")
+    if os.path.isfile(gitignore):
+        rules = rules + (GitIgnore.from_file(gitignore, rel_dir),)
+
+    files, subdirs, skipped = [], [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            # Посилання не проходимо: вони можуть вести за межі дозволеного кореня
+            if entry.is_symlink():
+                skipped.append("symlink")
+                continue
+            if entry.is_dir():
+                if entry.name in exclude or is_ignored(rules, rel, True):
+                    continue
+                subdirs.append((rel, rules))
+            elif entry.is_file():
+                if is_ignored(rules, rel, False):
+                    skipped.append("gitignored")
+                elif os.path.splitext(entry.name)[1].lower() not in TREE_EXTENSIONS:
+                    skipped.append("unsupported")
+                else:
+                    size = entry.stat().st_size
+                    if size > max_file_bytes:
+                        skipped.append("too_large")
+                    elif size == 0:
+                        skipped.append("empty")
+                    else:
+                        files.append(SourceFile(entry.path, rel, size))
+    return files, subdirs, skipped
+
+
+def walk_tree(root: str, max_file_bytes: int = None, max_files: int = None, workers: int = None) -> WalkResult:
+    """
+    Lists indexable files under root: directories are scanned in parallel by a thread
+    pool (listing is I/O-bound), .gitignore files are honoured at every level, and
+    INGEST_EXCLUDE_DIRS, symlinks, unsupported types and oversized files are skipped.
+    Files come back sorted by path, so results do not depend on scan order.
+    """
+    max_file_bytes = max_file_bytes or int(settings.INGEST_MAX_FILE_MB * 1024 * 1024)
+    max_files = max_files or settings.INGEST_MAX_FILES
+    exclude = set(settings.INGEST_EXCLUDE_DIRS)
+    result = WalkResult()
+
+    with ThreadPoolExecutor(max_workers=workers or settings.INGEST_WALK_WORKERS, thread_name_prefix="walk") as pool:
+        pending = {pool.submit(_scan_directory, root, "", (), max_file_bytes, exclude)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, skipped = future.result()
+                result.files.extend(files)
+                for reason in skipped:
+                    result.skip(reason)
+                for rel, rules in subdirs:
+                    pending.add(pool.submit(_scan_directory, root, rel, rules, max_file_bytes, exclude))
+            if len(result.files) > max_files:
+                for future in pending:
+                    future.cancel()
+                raise ArchiveError(f"More than {max_files} indexable files (INGEST_MAX_FILES)")
+
+    result.files.sort(key=lambda f: f.rel_path)
+    return result
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _safe_member_path(dest: str, name: str) -> Optional[str]:
+    """Target path inside dest, or None for absolute / '..' names (zip-slip)."""
+    name = name.replace("\\", "/")
+    if name.startswith("/") or re.match(r"^[A-Za-z]:", name):
+        return None
+    target = os.path.normpath(os.path.join(dest, name))
+    if os.path.commonpath([dest, target]) != dest:
+        return None
+    return target
+
+
+def _copy_limited(src, target: str, budget: int) -> int:
+    """Copies at most `budget` bytes, trusting the stream rather than the header's size."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    written = 0
+    with open(target, "wb") as dst:
+        while True:
+            block = src.read(READ_BLOCK_SIZE)
+            if not block:
+                return written
+            written += len(block)
+            if written > budget:
+                raise ArchiveError(f"Archive expands beyond {settings.INGEST_MAX_EXTRACTED_MB} MB (INGEST_MAX_EXTRACTED_MB)")
+            dst.write(block)
+
+
+def extract_archive(path: str, filename: str, dest: str) -> int:
+    """
+    Extracts a zip / tar(.gz/.bz2/.xz) archive into dest. Only regular files are
+    written; absolute and '..' paths, links and devices are dropped, and the total
+    extracted size and file count are capped. Returns the number of files written.
+    """
+    dest = os.path.realpath(dest)
+    budget = int(settings.INGEST_MAX_EXTRACTED_MB * 1024 * 1024)
+    count = 0
+    try:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    mode = info.external_attr >> 16
+                    if info.is_dir() or (stat.S_IFMT(mode) and not stat.S_ISREG(mode)):
+                        continue
+                    target = _safe_member_path(dest, info.filename)
+                    if target is None:
+                        continue
+                    with archive.open(info) as src:
+                        budget -= _copy_limited(src, target, budget)
+                    count += 1
+                    if count > settings.INGEST_MAX_FILES:
+                        raise ArchiveError(f"More than {settings.INGEST_MAX_FILES} files in the archive")
+        else:
+            with tarfile.open(path, mode="r:*") as archive:
+                for member in archive:
+                    if not member.isreg():
+                        continue
+                    target = _safe_member_path(dest, member.name)
+                    if target is None:
+                        continue
+                    src = archive.extractfile(member)
+                    if src is None:
+                        continue
+                    with src:
+                        budget -= _copy_limited(src, target, budget)
+                    count += 1
+                    if count > settings.INGEST_MAX_FILES:
+                        raise ArchiveError(f"More than {settings.INGEST_MAX_FILES} files in the archive")
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ArchiveError(f"Cannot read archive: {e}") from e
+    return count
+
+
+def resolve_allowed_directory(path: str) -> str:
+    """
+    Real path of a server-local directory, which must lie inside one of INGEST_ROOTS.
+    Raises PermissionError otherwise (no roots configured = feature disabled).
+    """
+    if not settings.INGEST_ROOTS:
+        raise PermissionError("Directory ingestion is disabled (set INGEST_ROOTS)")
+    real = os.path.realpath(path)
+    for root in settings.INGEST_ROOTS:
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, real]) == root:
+            if not os.path.isdir(real):
+                raise FileNotFoundError(f"Not a directory: {path}")
+            return real
+    raise PermissionError(f"{path} is outside INGEST_ROOTS")
+
+
+def remove_tree(path: str):
+    shutil.rmtree(path, ignore_errors=True)
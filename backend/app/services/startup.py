@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Optional
+from app.core.config import settings
+from app.services.file_catalog import file_catalog
+from app.services.job_service import job_manager
+from app.services.rerank_service import rerank_service
+from app.services.vector_service import vector_service
+
+
+class Readiness:
+    """
+    Background warm-up after uvicorn has bound the port: embedding models, reranker,
+    Qdrant collection, file catalog and one warm-up embedding (the first ONNX run
+    is several times slower than the rest). Every stage is retried with capped
+    backoff, so a blip at boot delays readiness instead of killing the worker;
+    Qdrant is waited for indefinitely, the other stages give up after
+    STARTUP_MAX_ATTEMPTS and then /health (liveness) answers 503 too.
+    /health/ready and the API routes answer 503 until done. After that the job
+    dispatcher process (only) moves pre-workspace points to DEFAULT_WORKSPACE.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.failed = False  # warm-up здався: liveness теж падає
+        self.stage: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.attempts = 0
+        self.timings: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._backfill_task: Optional[asyncio.Task] = None
+        self._started_at = time.perf_counter()
+
+    async def _timed(self, name: str, coro):
+        self.stage = name
+        start = time.perf_counter()
+        result = await coro
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    async def _retry(self, name: str, make_coro, max_attempts: int = 0):
+        """Awaits make_coro() until it succeeds, with capped exponential backoff (max_attempts 0 = forever)."""
+        delay = min(1.0, settings.STARTUP_RETRY_MAX_SECONDS)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await make_coro()
+                self.last_error = None
+                return result
+            except Exception as e:
+                self.last_error = f"{name}: {e}"
+                if max_attempts and attempt >= max_attempts:
+                    raise
+                print(f"⚠️ Startup stage '{name}' failed ({e}), retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.STARTUP_RETRY_MAX_SECONDS)
+
+    async def _ensure_collection(self):
+        self.attempts += 1
+        await vector_service.ensure_collection()
+
+    async def _rebuild_catalog(self):
+        if vector_service.points_count and await asyncio.to_thread(file_catalog.count) == 0:
+            # Колекція є, а каталогу ще немає (перший запуск після оновлення) — будуємо його один раз
+            counts = await vector_service.file_chunk_counts()
+            await asyncio.to_thread(file_catalog.replace_all, counts)
+            print(f"📚 File catalog rebuilt: {len(counts)} files in {len({w for w, _ in counts})} workspace(s)")
+
+    async def _backfill_workspaces(self):
+        # Один раз і в одному процесі (диспетчер задач), поза readiness: інші воркери вже обслуговують запити
+        if not job_manager.is_leader():
+            return
+        try:
+            await vector_service.backfill_workspace()
+        except Exception as e:
+            print(f"⚠️ Workspace backfill failed, retried on next start: {e}")
+
+    async def warm_up(self):
+        # Qdrant чекаємо скільки завгодно (це зовнішній сервіс), решту етапів — STARTUP_MAX_ATTEMPTS спроб
+        limit = settings.STARTUP_MAX_ATTEMPTS
+        try:
+            await self._timed("models", self._retry("models", vector_service.load, limit))
+            await self._timed("reranker", self._retry("reranker", lambda: asyncio.to_thread(rerank_service.load), limit))
+            await self._timed("qdrant", self._retry("qdrant", self._ensure_collection))
+            await self._timed("catalog", self._retry("catalog", self._rebuild_catalog, limit))
+            await self._timed("warmup_embed", self._retry("warmup_embed", lambda: vector_service.embed(["warm up"]), limit))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Етап так і не вдався (немає моделі в кеші й мережі) — /health віддає 503, щоб оркестратор перезапустив процес
+            self.failed = True
+            print(f"❌ Startup failed at '{self.stage}' after {limit} attempts: {e}")
+            return
+        vector_service.start_background_refresh()
+        self.timings["total"] = round(time.perf_counter() - self._started_at, 3)
+        self.stage = None
+        self.ready = True
+        print(f"✅ Ready in {self.timings['total']:.1f}s {self.timings}")
+        self._backfill_task = asyncio.create_task(self._backfill_workspaces())
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self.warm_up())
+
+    async def stop(self):
+        for task in (self._task, self._backfill_task):
+            if task and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = self._backfill_task = None
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else ("error" if self.failed else "starting"),
+            "stage": self.stage,
+            "last_error": self.last_error,
+            "qdrant_attempts": self.attempts,
+            "timings": self.timings,
+        }
+
+
+readiness = Readiness()
@@ -1,60 +1,412 @@
-import uuid
-from qdrant_client import QdrantClient
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
-from fastembed import TextEmbedding
 from app.core.config import settings  # <-- Оновлений імпорт
+from app.core.metrics import INGEST_STAGE_SECONDS, stage
+from app.services.cache_service import embedding_cache
+from app.services.embed_server import EmbedClient
+from app.services.fusion import label_scores, rrf_fuse
+from app.services.point_builder import (
+    FILTER_KEYS, POSITION_KEYS, SPARSE_VECTOR_NAME, build_points, file_extension, file_filter, has_sparse_vectors,
+    payload_update_ops, search_filter, to_sparse_vector, unscoped_filter,
+)
+from app.services.collection_profiles import create_collection_kwargs, get_profile, profile_mismatches, search_params
 
 class VectorService:
     def __init__(self):
         print("🔌 Connecting to Qdrant...")
-        self.client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
+        if settings.QDRANT_LOCATION == ":memory:":
+            self.client = AsyncQdrantClient(location=":memory:")
+        elif settings.QDRANT_LOCATION:
+            self.client = AsyncQdrantClient(path=settings.QDRANT_LOCATION)
+        else:
+            self.client = AsyncQdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT)
         self.collection_name = settings.COLLECTION_NAME
-        
-        print("🚀 Loading FastEmbed...")
-        self.model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-        self._ensure_collection_exists()
+        self.profile = get_profile(settings.COLLECTION_PROFILE)
+        self.search_params = search_params(self.profile, settings.HNSW_EF, settings.QUANTIZATION_OVERSAMPLING)
+        self.model_name = settings.EMBED_MODEL_NAME
 
-    def _ensure_collection_exists(self):
+        # Моделі вантажить load_models() (фоновий warm-up у lifespan), а не імпорт модуля:
+        # інакше uvicorn не відкриває порт, поки не завантажиться / не скачається ONNX
+        self.model = None
+        # BM25 для гібридного пошуку (точні ідентифікатори, назви функцій, тексти помилок)
+        self.sparse_model = None
+        self.sparse_enabled = False  # True, коли і модель є, і колекція має sparse-вектор
+        self._load_lock = threading.Lock()
+        # EMBED_SERVER_SOCKET: моделі живуть в одному спільному процесі (embed_server), тут лише клієнт
+        self.remote = EmbedClient(settings.EMBED_SERVER_SOCKET) if settings.EMBED_SERVER_SOCKET else None
+        self.remote_info = None
+
+        # ONNX-інференс CPU-bound, тому виносимо його з event loop в обмежений пул
+        self._executor = ThreadPoolExecutor(max_workers=settings.EMBED_WORKERS, thread_name_prefix="embed")
+
+        # Локальний знімок стану колекції, щоб search не ходив у get_collection на кожен запит.
+        # None = ще невідомо (тоді пошук просто йде в Qdrant)
+        self.points_count = None
+        self.collection_status = None
+        self.state_refreshed_at = None
+        self._refresh_task = None
+
+    def load_models(self):
+        """Loads the FastEmbed models (blocking, idempotent). fastembed itself is imported here too."""
+        with self._load_lock:
+            if self.model is not None:
+                return
+            from fastembed import SparseTextEmbedding, TextEmbedding
+            threads = settings.EMBED_THREADS or None
+            print("🚀 Loading FastEmbed...")
+            model = TextEmbedding(model_name=self.model_name, threads=threads)
+            if settings.SPARSE_MODEL_NAME:
+                try:
+                    self.sparse_model = SparseTextEmbedding(model_name=settings.SPARSE_MODEL_NAME, threads=threads)
+                except Exception as e:
+                    print(f"⚠️ Sparse model unavailable, hybrid search disabled: {e}")
+            self.model = model  # останнім: інші потоки перевіряють саме self.model
+
+    async def load(self):
+        """Local models in the embedding pool, or a handshake with the shared embedding server."""
+        if self.remote is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.load_models)
+        elif self.remote_info is None:
+            self.remote_info = await self.remote.wait_ready(settings.EMBED_SERVER_WAIT_SECONDS)
+            print(f"🧠 Using shared embedding server {settings.EMBED_SERVER_SOCKET} (pid {self.remote_info['pid']})")
+
+    @property
+    def has_sparse_model(self) -> bool:
+        if self.remote is not None:
+            return bool(self.remote_info and self.remote_info["sparse"])
+        return self.sparse_model is not None
+
+    async def ensure_collection(self):
+        # Чи є sparse-модель, треба знати до перевірки схеми колекції
+        await self.load()
+        if not await self._collection_or_alias_exists():
+            print(f"🔨 Creating collection '{self.collection_name}' (profile '{self.profile.name}')...")
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                **create_collection_kwargs(self.profile, settings.HNSW_M, settings.HNSW_EF_CONSTRUCT)
+            )
+        info = await self.client.get_collection(self.collection_name)
+        diffs = profile_mismatches(self.profile, info, settings.HNSW_M, settings.HNSW_EF_CONSTRUCT)
+        if diffs and not settings.QDRANT_LOCATION:
+            # Існуючу колекцію не чіпаємо: перебудова — окремий крок (scripts/migrate_collection.py)
+            print(f"⚠️ Collection '{self.collection_name}' differs from profile '{self.profile.name}': {'; '.join(diffs)}")
+        self.sparse_enabled = self.has_sparse_model and has_sparse_vectors(info)
+        if self.has_sparse_model and not self.sparse_enabled:
+            # Додати sparse-вектор у вже існуючу колекцію Qdrant не дозволяє — потрібне переіндексування
+            print(f"⚠️ Collection '{self.collection_name}' has no '{SPARSE_VECTOR_NAME}' vectors, using dense search only")
+        await self.ensure_payload_indexes(info)
+        await self.refresh_state()
+
+    async def _collection_or_alias_exists(self) -> bool:
+        if await self.client.collection_exists(self.collection_name):
+            return True
+        aliases = await self.client.get_aliases()
+        return any(a.alias_name == self.collection_name for a in aliases.aliases)
+
+    async def ensure_payload_indexes(self, info):
+        """
+        Keyword indexes on `workspace`, `filename` and `extension`: filtered search,
+        delete, scroll and set_payload use them instead of scanning the collection.
+        """
+        schema = info.payload_schema or {}
+        for field in FILTER_KEYS:
+            if field not in schema:
+                print(f"🔨 Creating payload index on '{field}'...")
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+
+    async def backfill_workspace(self) -> int:
+        """
+        Points indexed before workspaces existed go to DEFAULT_WORKSPACE (and get `extension`).
+        One pass over the legacy points in id order; run by a single process (see Readiness).
+        """
+        total, offset = 0, None
+        while True:
+            # offset — id наступної точки, тож оновлені (і вже не legacy) точки позаду нього не заважають
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=unscoped_filter(),
+                limit=1000,
+                offset=offset,
+                with_payload=["filename"],
+                with_vectors=False
+            )
+            if not points:
+                break
+            by_extension: dict[str, list] = {}
+            for p in points:
+                by_extension.setdefault(file_extension((p.payload or {}).get("filename", "")), []).append(p.id)
+            await self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=[
+                    models.SetPayloadOperation(set_payload=models.SetPayload(
+                        payload={"workspace": settings.DEFAULT_WORKSPACE, "extension": ext}, points=ids
+                    ))
+                    for ext, ids in by_extension.items()
+                ],
+                wait=True
+            )
+            total += len(points)
+            if offset is None:
+                break
+        if total:
+            print(f"📦 Moved {total} existing points to workspace '{settings.DEFAULT_WORKSPACE}'")
+        return total
+
+    async def refresh_state(self):
+        """Оновлює локальний знімок (кількість точок, статус) з Qdrant."""
         try:
-            self.client.get_collection(self.collection_name)
-        except Exception:
-            print(f"🔨 Creating collection '{self.collection_name}'...")
-            self.client.create_collection(
+            info = await self.client.get_collection(self.collection_name)
+            self.points_count = info.points_count
+            self.collection_status = str(info.status)
+            self.state_refreshed_at = time.time()
+        except Exception as e:
+            print(f"⚠️ Collection refresh failed: {e}")
+
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh_state()
+
+    def start_background_refresh(self):
+        if settings.COLLECTION_REFRESH_SECONDS > 0 and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(settings.COLLECTION_REFRESH_SECONDS))
+
+    async def close(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        await self.client.close()
+        if self.remote:
+            self.remote.close()
+        self._executor.shutdown(wait=False)
+
+    def _embed_sync(self, texts: list[str]) -> list[list[float]]:
+        if self.model is None:
+            self.load_models()
+        return [v.tolist() for v in self.model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE)]
+
+    def _embed_sparse_sync(self, texts: list[str]) -> list[models.SparseVector]:
+        return [to_sparse_vector(e) for e in self.sparse_model.embed(texts, batch_size=settings.EMBED_BATCH_SIZE)]
+
+    def _sparse_query_sync(self, query: str) -> models.SparseVector:
+        return to_sparse_vector(next(iter(self.sparse_model.query_embed(query))))
+
+    async def embed(self, texts: list[str], query: bool = False) -> list[list[float]]:
+        """Runs FastEmbed in the embedding pool (or the shared embedding server) so the event loop stays free."""
+        if self.remote:
+            return await self.remote.embed(texts, query=query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._embed_sync, texts)
+
+    async def embed_sparse(self, texts: list[str]) -> list[models.SparseVector]:
+        if self.remote:
+            pairs = await self.remote.embed_sparse(texts)
+            return [models.SparseVector(indices=indices, values=values) for indices, values in pairs]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._embed_sparse_sync, texts)
+
+    async def embed_query(self, query: str) -> list[float]:
+        """Query embedding with an LRU cache, so repeats and regenerations skip ONNX."""
+        vector = embedding_cache.get(self.model_name, query)
+        if vector is None:
+            vector = (await self.embed([query], query=True))[0]
+            embedding_cache.put(self.model_name, query, vector)
+        return vector
+
+    async def add_document(self, text: str, meta: dict = None):
+        return (await self.add_documents([text], [meta or {}]))[0]
+
+    async def add_documents(self, chunks: list[str], metas: list[dict] = None, wait: bool = None) -> list[str]:
+        """
+        Bulk indexing: embeds chunks in batches of EMBED_BATCH_SIZE and upserts
+        them in point lists of UPSERT_BATCH_SIZE. Returns the created point IDs.
+        """
+        if not chunks:
+            return []
+        if metas is None:
+            metas = [{} for _ in chunks]
+        if len(metas) != len(chunks):
+            raise ValueError("chunks and metas must have the same length")
+        if wait is None:
+            wait = settings.UPSERT_WAIT
+
+        ids = []
+        step = settings.UPSERT_BATCH_SIZE
+        for start in range(0, len(chunks), step):
+            texts = chunks[start:start + step]
+            with stage(INGEST_STAGE_SECONDS, "embed"):
+                vectors = await self.embed(texts)
+                sparse = None
+                if self.sparse_enabled:
+                    sparse = await self.embed_sparse(texts)
+
+            points = build_points(texts, metas[start:start + step], vectors, sparse)
+            ids.extend(p.id for p in points)
+            with stage(INGEST_STAGE_SECONDS, "upsert"):
+                await self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+
+        # Точна кількість прийде з наступного refresh, для search важливо лише "не порожньо"
+        self.points_count = (self.points_count or 0) + len(ids)
+        return ids
+
+    async def file_chunk_counts(self) -> dict[tuple[str, str], int]:
+        """
+        Full scan that only fetches `workspace` and `filename`, as {(workspace, filename): chunks}.
+        Used to rebuild the file catalog; normal listing goes through file_catalog.
+        """
+        counts = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
                 collection_name=self.collection_name,
-                vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
+                limit=1000,
+                with_payload=["workspace", "filename"],
+                with_vectors=False,
+                offset=offset
             )
+            for p in points:
+                payload = p.payload or {}
+                key = (payload.get("workspace", settings.DEFAULT_WORKSPACE), payload.get("filename", "Unknown"))
+                counts[key] = counts.get(key, 0) + 1
+            if offset is None: break
+        return counts
 
-    def add_document(self, text: str, meta: dict = None):
-        doc_id = str(uuid.uuid4())
-        # FastEmbed повертає генератор, тому беремо list()[0]
-        vector = list(self.model.embed([text]))[0].tolist()
+    async def file_points(self, filename: str, workspace: str) -> dict[str, dict]:
+        """Existing points of a file as {point_id: position payload}, without vectors."""
+        existing = {}
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=file_filter(filename, workspace),
+                limit=1000,
+                with_payload=list(POSITION_KEYS),
+                with_vectors=False,
+                offset=offset
+            )
+            for p in points:
+                existing[str(p.id)] = p.payload or {}
+            if offset is None: break
+        return existing
 
-        payload = {"content": text}
-        if meta: payload.update(meta)
+    async def update_payloads(self, updates: list[tuple[str, dict]]):
+        """Patches payloads of individual points in one batch request."""
+        if updates:
+            await self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=payload_update_ops(updates),
+                wait=settings.UPSERT_WAIT
+            )
 
-        self.client.upsert(
+    async def delete_points(self, ids: list[str]):
+        if ids:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=ids)
+            )
+
+    async def set_file_payload(self, filename: str, payload: dict, workspace: str):
+        """Merges payload fields into every chunk of a file."""
+        await self.client.set_payload(
+            collection_name=self.collection_name,
+            payload=payload,
+            points=models.FilterSelector(filter=file_filter(filename, workspace))
+        )
+
+    async def delete_file(self, filename: str, workspace: str):
+        await self.client.delete(
             collection_name=self.collection_name,
-            points=[models.PointStruct(id=doc_id, vector=vector, payload=payload)]
+            points_selector=models.FilterSelector(filter=file_filter(filename, workspace))
         )
-        return doc_id
+        await self.refresh_state()
 
-    def search(self, query: str, limit: int = 3):
+    async def search(
+        self, query: str = None, limit: int = 3, query_vector: list[float] = None, mode: str = None,
+        dense_weight: float = 1.0, sparse_weight: float = 1.0, rrf_k: int = None,
+        workspace: str = None, filenames: list[str] = None, extensions: list[str] = None
+    ):
+        """
+        Retrieval in one Qdrant round trip. `mode`: "dense" (vectors), "sparse" (BM25)
+        or "hybrid" (both legs in one query_batch_points call, fused with weighted RRF).
+        Sparse/hybrid need the query text and fall back to dense if BM25 is unavailable.
+        Pass `query_vector` if the embedding is already known to skip the embedding step.
+        Hits carry their score scale in the payload (see fusion.label_scores).
+        Only `workspace` (default: DEFAULT_WORKSPACE) is searched, optionally narrowed
+        to `filenames` / `extensions`; the filters run on the payload indexes.
+        """
+        if query is None and query_vector is None:
+            raise ValueError("Either query or query_vector is required")
+        if self.points_count == 0:
+            return []
+        mode = mode or settings.RETRIEVAL_MODE
+        if mode not in ("dense", "sparse", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if mode != "dense" and (not self.sparse_enabled or query is None):
+            mode = "dense"
+        query_filter = search_filter(workspace or settings.DEFAULT_WORKSPACE, filenames, extensions)
         try:
-            collection_info = self.client.get_collection(self.collection_name)
-            if collection_info.points_count == 0:
-                return []
-
-            query_vector = list(self.model.embed([query]))[0].tolist()
-            
-            results = self.client.query_points(
-                collection_name=self.collection_name,
-                query=query_vector,
-                limit=limit,
-                score_threshold=0.4  # Трохи знизив поріг для кращого пошуку
-            ).points
-            return results
+            if mode == "sparse":
+                sparse_vector = await self._embed_sparse_query(query)
+                response = await self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=sparse_vector,
+                    using=SPARSE_VECTOR_NAME,
+                    query_filter=query_filter,
+                    limit=limit,
+                    score_threshold=settings.SPARSE_SCORE_THRESHOLD or None
+                )
+                return label_scores(response.points, "bm25")
+
+            if query_vector is None:
+                query_vector = await self.embed_query(query)
+
+            if mode == "dense":
+                response = await self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=query_vector,
+                    query_filter=query_filter,
+                    limit=limit,
+                    score_threshold=0.4,  # Трохи знизив поріг для кращого пошуку
+                    search_params=self.search_params
+                )
+                return label_scores(response.points, "cosine")
+
+            # Hybrid: обидва списки беремо ширше за limit, щоб злиття мало з чого вибирати
+            fetch = max(limit, settings.HYBRID_PREFETCH)
+            sparse_vector = await self._embed_sparse_query(query)
+            dense, sparse = await self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(query=query_vector, filter=query_filter, limit=fetch, score_threshold=0.4,
+                                        with_payload=True, params=self.search_params),
+                    models.QueryRequest(query=sparse_vector, using=SPARSE_VECTOR_NAME, filter=query_filter, limit=fetch,
+                                        score_threshold=settings.SPARSE_SCORE_THRESHOLD or None, with_payload=True),
+                ]
+            )
+            fused = rrf_fuse(
+                [(dense.points, dense_weight), (sparse.points, sparse_weight)],
+                k=rrf_k or settings.RRF_K, limit=limit
+            )
+            # RRF-скор лишається для порядку, а для показу зберігаємо косинус dense-гілки (якщо хіт там був)
+            cosine = {p.id: p.score for p in dense.points}
+            return label_scores(fused, "rrf", cosine)
         except Exception as e:
             print(f"⚠️ Vector Search Error: {e}")
             return []
 
-vector_service = VectorService()
\ No newline at end of file
+    async def _embed_sparse_query(self, query: str) -> models.SparseVector:
+        if self.remote:
+            (indices, values), = await self.remote.embed_sparse([query], query=True)
+            return models.SparseVector(indices=indices, values=values)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._sparse_query_sync, query)
+
+vector_service = VectorService()
@@ -0,0 +1,76 @@
+"""
+Multi-worker deployment:  cd backend && gunicorn -c gunicorn.conf.py app.main:app
+
+The master starts one shared embedding process (app/services/embed_server.py)
+before forking and restarts it if it dies. Every Uvicorn worker embeds through its
+Unix socket instead of loading its own ONNX model. Concurrent queries from all
+workers are micro-batched into one model call. Ingestion jobs run in exactly one worker (flock on JOBS_DB).
+LOCAL_MAX_CONCURRENCY is split between the workers (API_WORKERS is set from
+WEB_CONCURRENCY here). /metrics is per worker: each scrape shows the histograms of
+whichever worker answered.
+
+Env: WEB_CONCURRENCY (workers, default 2), BIND (default 0.0.0.0:8000),
+EMBED_SERVER_SOCKET (default /tmp/vectrieve-embed.sock), EMBED_THREADS.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Воркери успадковують env майстра, тож Settings у кожному з них бачить сокет і кількість воркерів
+os.environ.setdefault("EMBED_SERVER_SOCKET", "/tmp/vectrieve-embed.sock")
+os.environ["API_WORKERS"] = str(workers)
+
+_embed_server = None
+_stopping = threading.Event()
+
+
+def _start_embed_server(server):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.services.embed_server", "--socket", os.environ["EMBED_SERVER_SOCKET"]],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    server.log.info("Embedding server started (pid %s)", process.pid)
+    return process
+
+
+def _supervise(server):
+    """Restarts the embedding server if it dies (backoff up to 30 s); workers reconnect on their next request."""
+    global _embed_server
+    delay = 1.0
+    while True:
+        started = time.monotonic()
+        code = _embed_server.wait()
+        if _stopping.is_set():
+            return
+        if time.monotonic() - started > 60:
+            delay = 1.0  # пропрацював довго — це не цикл падінь на старті
+        server.log.error("Embedding server exited with code %s, restarting in %.0fs", code, delay)
+        if _stopping.wait(delay):
+            return
+        _embed_server = _start_embed_server(server)
+        delay = min(delay * 2, 30.0)
+
+
+def on_starting(server):
+    global _embed_server
+    _embed_server = _start_embed_server(server)
+    threading.Thread(target=_supervise, args=(server,), name="embed-supervisor", daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _embed_server and _embed_server.poll() is None:
+        _embed_server.terminate()
+        try:
+            _embed_server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _embed_server.kill()
@@ -0,0 +1,44 @@
+"""
+Rebuilds the /analytics aggregates (analytics snapshot) from the full query log.
+
+Use it after importing old logs (scripts/import_csv_logs.py), after changing the
+aggregates, or if the snapshot was lost. Stop the API first: a running server owns
+the snapshot (flock next to it) and keeps its own in-memory aggregates.
+
+Run from backend/:  python scripts/backfill_analytics.py [--db logs.db] [--snapshot analytics_snapshot.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.analytics_service import AnalyticsEngine  # noqa: E402
+from app.services.query_log import QueryLog  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=settings.LOGS_DB)
+    parser.add_argument("--snapshot", default=settings.ANALYTICS_SNAPSHOT)
+    args = parser.parse_args()
+
+    engine = AnalyticsEngine(args.snapshot)
+    log = QueryLog(args.db, analytics=engine)
+    start = time.perf_counter()
+    log.rebuild_analytics()
+    if not engine.save():
+        sys.exit(f"❌ {args.snapshot} is owned by a running API process: stop it and rerun")
+    duration = time.perf_counter() - start
+
+    snapshot = engine.snapshot()
+    snapshot.pop("history")
+    print(json.dumps(snapshot, indent=2))
+    print(f"Rebuilt from {snapshot['total']} queries in {duration:.2f}s -> {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,374 @@
+"""
+End-to-end load test: open-loop traffic against /query, /upload and /files.
+
+Requests are fired on a fixed schedule (--rps, optionally Poisson arrivals with
+--poisson) regardless of how fast the server answers, and latency is measured
+from the scheduled send time, so a slow server shows up as latency instead of
+silently lowering the load. At most --concurrency requests are in flight; arrivals
+beyond that are counted as "dropped".
+
+By default the harness is self-contained and runs offline:
+  - scripts/stub_servers.py plays Groq and Ollama,
+  - the API runs under uvicorn with an in-memory Qdrant (QDRANT_LOCATION=:memory:),
+    dense retrieval, the answer cache off and all sidecar DBs in a temp dir,
+  - a corpus (backend/app by default) is uploaded first so /query has something to find.
+The FastEmbed model must already be in the local cache. Use --url to target a
+running server instead (no stubs, no seeding).
+
+Reported per scenario: ok / errors / dropped, throughput, p50/p95/p99/max latency,
+and the server's RSS and CPU (psutil, including child processes). --out writes the
+results as JSON; --baseline compares with an earlier JSON and prints the deltas.
+
+Run from backend/:
+  python scripts/benchmark.py --rps 5 --duration 20 --out ../docs/benchmarks/loadtest.json
+  python scripts/benchmark.py --baseline ../docs/benchmarks/loadtest_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
 import time
-import requests
+
+import httpx
 import psutil
-import statistics
-import os
 
-# Налаштування
-API_URL = "http://127.0.0.1:8000"
-ENDPOINTS = {
-    "Health Check": "/health",
-    # Можна додати інші ендпоінти, наприклад аналітику
-    "Analytics": "/analytics" 
-}
-ITERATIONS = 10  # Кількість запитів для усереднення
-
-def get_server_memory_usage():
-    """Знаходить процес, який слухає порт 8000, і повертає його RAM (MB)."""
-    for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    "How does the vector service search Qdrant?",
+    "Where are uploaded files chunked?",
+    "What does the circuit breaker do when a provider fails?",
+    "How is the prompt fitted into the token budget?",
+    "Which settings control the rerank stage?",
+    "How are analytics aggregates updated?",
+    "What happens when the same file is uploaded twice?",
+    "How is .gitignore handled for archives?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: list[float], q: float):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def upload_payload(i: int) -> dict:
+    """A small, unique Python module per request, so every upload really gets embedded."""
+    body = "\n\n".join(
+        f"def handler_{i}_{j}(request):\n    \"\"\"Handles case {j} of load test file {i}.\"\"\"\n"
+        f"    return {{'id': {i * 100 + j}, 'status': 'ok', 'value': {random.random()!r}}}"
+        for j in range(8)
+    )
+    return {"file": (f"loadtest/file_{i}_{random.randrange(10**9)}.py", body.encode(), "text/x-python")}
+
+
+class ResourceSampler:
+    """Samples RSS and CPU of the server process (and its children) in the background."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.interval = interval
+        self.process = psutil.Process(pid) if pid else None
+        self.rss, self.cpu = [], []
+        self._task = None
+        # cpu_percent(None) рахує від попереднього виклику на тому ж об'єкті, тож процеси кешуємо за pid
+        self._known: dict[int, psutil.Process] = {}
+
+    def _processes(self):
         try:
-            for conn in proc.net_connections(kind='inet'):
-                if conn.laddr.port == 8000:
-                    mem_usage = proc.memory_info().rss / (1024 * 1024) # Конвертація в MB
-                    return mem_usage, proc.name()
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            current = [self.process] + self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+        self._known = {p.pid: self._known.get(p.pid, p) for p in current}
+        return list(self._known.values())
+
+    def _sample(self):
+        rss = cpu = 0.0
+        for p in self._processes():
+            try:
+                rss += p.memory_info().rss
+                cpu += p.cpu_percent(None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return rss / (1024 * 1024), cpu
+
+    async def _loop(self):
+        self._sample()  # первинний виклик cpu_percent, що задає точку відліку
+        while True:
+            await asyncio.sleep(self.interval)
+            rss, cpu = self._sample()
+            self.rss.append(rss)
+            self.cpu.append(cpu)
+
+    def start(self):
+        if self.process:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> dict:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if not self.rss:
+            return {"rss_mb_peak": None, "rss_mb_mean": None, "cpu_percent_mean": None}
+        return {
+            "rss_mb_peak": round(max(self.rss), 1),
+            "rss_mb_mean": round(sum(self.rss) / len(self.rss), 1),
+            "cpu_percent_mean": round(sum(self.cpu) / len(self.cpu), 1),
+        }
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, make_request, rps: float, duration: float,
+                       concurrency: int, poisson: bool, server_pid: int) -> dict:
+    latencies, errors, dropped = [], {}, 0
+    in_flight: set[asyncio.Task] = set()
+    sampler = ResourceSampler(server_pid)
+
+    async def fire(i: int, scheduled: float):
+        try:
+            response = await make_request(client, i)
+            if response.status_code >= 400:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                return
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+        except Exception as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    sampler.start()
+    start = time.perf_counter()
+    scheduled, i = start, 0
+    while scheduled < start + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= concurrency:
+            dropped += 1
+        else:
+            task = asyncio.create_task(fire(i, scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        i += 1
+        scheduled += random.expovariate(rps) if poisson else 1 / rps
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - start
+    resources = await sampler.stop()
+
+    latencies.sort()
+    def r(v):
+        return round(v, 1) if v is not None else None
+    return {
+        "scenario": name,
+        "target_rps": rps,
+        "concurrency": concurrency,
+        "sent": i - dropped,
+        "ok": len(latencies),
+        "errors": errors,
+        "dropped": dropped,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": r(percentile(latencies, 0.50)),
+        "p95_ms": r(percentile(latencies, 0.95)),
+        "p99_ms": r(percentile(latencies, 0.99)),
+        "max_ms": r(latencies[-1] if latencies else None),
+        **resources,
+    }
+
+
+async def query_request(client, i):
+    question = QUESTIONS[i % len(QUESTIONS)]
+    return await client.post("/query", json={"messages": [{"role": "user", "content": question}]})
+
+
+async def upload_request(client, i):
+    return await client.post("/upload", files=upload_payload(i))
+
+
+async def files_request(client, i):
+    return await client.get("/files", params={"limit": 100})
+
+
+SCENARIOS = {"query": query_request, "upload": upload_request, "files": files_request}
+
+
+def launch_stack(args, workdir: str):
+    """Starts the LLM stubs and the API; returns (processes, base_url, api_pid)."""
+    stub_port, api_port = free_port(), free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "scripts", "stub_servers.py"), "--port", str(stub_port),
+         "--cloud-ttft-ms", str(args.stub_ttft_ms), "--cloud-tokens", str(args.stub_tokens)],
+        cwd=BACKEND_DIR,
+    )
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "stub", "GROQ_BASE_URL": stub_url, "OLLAMA_HOST": stub_url,
+        "QDRANT_LOCATION": ":memory:", "RETRIEVAL_MODE": "dense", "SPARSE_MODEL_NAME": "",
+        "CACHE_ENABLED": "false", "SENTRY_DSN": "", "COLLECTION_REFRESH_SECONDS": "0",
+        "LOGS_DB": os.path.join(workdir, "logs.db"), "CATALOG_DB": os.path.join(workdir, "catalog.db"),
+        "JOBS_DB": os.path.join(workdir, "jobs.db"), "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "ANALYTICS_SNAPSHOT": os.path.join(workdir, "analytics.json"),
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    return [api, stub], f"http://127.0.0.1:{api_port}", api.pid
+
+
+async def wait_ready(client: httpx.AsyncClient, processes, timeout: float = 180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if any(p.poll() is not None for p in processes):
+            raise RuntimeError("API or stub server exited during startup")
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
             pass
-    return None, None
+        await asyncio.sleep(0.5)
+    raise RuntimeError("API did not become ready")
 
-def measure_latency(url):
-    """Міряє час відповіді сервера."""
-    start = time.time()
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return (time.time() - start) * 1000  # Конвертація в мілісекунди (ms)
-    except Exception as e:
-        print(f"❌ Помилка запиту до {url}: {e}")
-        return None
 
-def run_benchmark():
-    print(f"🚀 Запуск бенчмарку Vectrieve AI...")
-    print(f"📡 API URL: {API_URL}")
-    print("-" * 40)
-
-    # 1. Вимірювання пам'яті
-    ram_usage, proc_name = get_server_memory_usage()
-    if ram_usage:
-        print(f"💾 RAM Usage (Process '{proc_name}'): {ram_usage:.2f} MB")
-    else:
-        print("⚠️ Не вдалося знайти процес сервера на порту 8000. Переконайся, що сервер запущений!")
-        ram_usage = 0
-
-    print("-" * 40)
-
-    # 2. Вимірювання затримки (Latency)
-    results = {}
-    
-    for name, endpoint in ENDPOINTS.items():
-        url = f"{API_URL}{endpoint}"
-        latencies = []
-        print(f"⏱️  Тестування '{name}' ({ITERATIONS} запитів)...", end="", flush=True)
-        
-        for _ in range(ITERATIONS):
-            lat = measure_latency(url)
-            if lat:
-                latencies.append(lat)
-            time.sleep(0.1) # Невелика пауза між запитами
-        
-        if latencies:
-            avg_lat = statistics.mean(latencies)
-            max_lat = max(latencies)
-            min_lat = min(latencies)
-            results[name] = avg_lat
-            print(f" ✅ Avg: {avg_lat:.2f}ms")
+async def seed_corpus(client: httpx.AsyncClient, corpus: str) -> int:
+    count = 0
+    for dirpath, _, filenames in os.walk(corpus):
+        for name in sorted(filenames):
+            if name.endswith((".py", ".md")):
+                path = os.path.join(dirpath, name)
+                with open(path, "rb") as f:
+                    response = await client.post("/upload", files={"file": (os.path.relpath(path, corpus), f.read())})
+                response.raise_for_status()
+                count += 1
+    return count
+
+
+def server_pid_for(url: str):
+    port = httpx.URL(url).port
+    for conn in psutil.net_connections(kind="inet"):
+        if conn.laddr and conn.laddr.port == port and conn.status == psutil.CONN_LISTEN:
+            return conn.pid
+    return None
+
+
+def compare(results: dict, baseline: dict) -> str:
+    """Markdown table of current vs baseline for the headline numbers."""
+    base = {s["scenario"]: s for s in baseline["scenarios"]}
+    lines = ["| Scenario | Metric | Baseline | Current | Change |", "|---|---|---|---|---|"]
+    for s in results["scenarios"]:
+        b = base.get(s["scenario"])
+        if not b:
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "rss_mb_peak", "cpu_percent_mean"):
+            old, new = b.get(metric), s.get(metric)
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "-"
+            lines.append(f"| {s['scenario']} | {metric} | {old} | {new} | {change} |")
+    return "\n".join(lines)
+
+
+def markdown(results: dict) -> str:
+    lines = [
+        f"## Load Test ({results['date']}, {results['cpu_count']} CPU)",
+        f"`python scripts/benchmark.py {results['command']}`",
+        "",
+        "| Scenario | Target RPS | OK | Errors | Dropped | Throughput (rps) | p50 (ms) | p95 (ms) | p99 (ms) | Peak RSS (MB) | CPU % |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for s in results["scenarios"]:
+        lines.append(
+            f"| {s['scenario']} | {s['target_rps']} | {s['ok']} | {sum(s['errors'].values())} | {s['dropped']} | "
+            f"{s['throughput_rps']} | {s['p50_ms']} | {s['p95_ms']} | {s['p99_ms']} | {s['rss_mb_peak']} | {s['cpu_percent_mean']} |"
+        )
+    return "\n".join(lines)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of launching stubs + API")
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--rps", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max requests in flight")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed rate")
+    parser.add_argument("--warmup", type=int, default=3, help="Requests per scenario before measuring")
+    parser.add_argument("--corpus", default=os.path.join(BACKEND_DIR, "app"), help="Uploaded before the run (launch mode)")
+    parser.add_argument("--stub-ttft-ms", type=int, default=200)
+    parser.add_argument("--stub-tokens", type=int, default=40)
+    parser.add_argument("--out", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    processes, workdir = [], tempfile.mkdtemp(prefix="vectrieve_bench_")
+    try:
+        if args.url:
+            base_url, server_pid = args.url.rstrip("/"), server_pid_for(args.url)
         else:
-            print(" ❌ Failed")
-
-    # 3. Генерація звіту для Markdown
-    print("\n📝 Скопіюй цей блок у docs/benchmarks.md:")
-    print("=" * 40)
-    print(f"## Benchmark Report ({time.strftime('%Y-%m-%d %H:%M')})")
-    print(f"- **RAM Usage:** {ram_usage:.2f} MB")
-    print("\n| Endpoint | Avg Latency (ms) | Min (ms) | Max (ms) |")
-    print("|---|---|---|---|")
-    for name, endpoint in ENDPOINTS.items():
-        url = f"{API_URL}{endpoint}"
-        # Повторний прогін для точних цифр у таблиці або використання попередніх
-        # Для простоти виведемо середні, які вже порахували (тут спрощено)
-        print(f"| {name} | {results.get(name, 0):.2f} | - | - |")
-    print("=" * 40)
+            processes, base_url, server_pid = launch_stack(args, workdir)
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=120,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            if processes:
+                print("⏳ Starting stub LLMs + API (in-memory Qdrant)...")
+                await wait_ready(client, processes)
+                start = time.perf_counter()
+                seeded = await seed_corpus(client, args.corpus)
+                print(f"📚 Seeded {seeded} files in {time.perf_counter() - start:.1f}s")
+
+            results = {
+                "date": time.strftime("%Y-%m-%d %H:%M"),
+                "command": " ".join(sys.argv[1:]),
+                "cpu_count": os.cpu_count(),
+                "python": platform.python_version(),
+                "launched": not args.url,
+                "scenarios": [],
+            }
+            for name in args.scenarios:
+                make_request = SCENARIOS[name]
+                for i in range(args.warmup):
+                    await make_request(client, -1 - i)
+                print(f"🚀 {name}: {args.rps} rps for {args.duration}s (max {args.concurrency} in flight)...")
+                stats = await run_scenario(client, name, make_request, args.rps, args.duration,
+                                           args.concurrency, args.poisson, server_pid)
+                results["scenarios"].append(stats)
+                print(f"   ok={stats['ok']} errors={stats['errors']} dropped={stats['dropped']} "
+                      f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                      f"rss={stats['rss_mb_peak']}MB cpu={stats['cpu_percent_mean']}%")
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n📝 docs/benchmarks.md:\n")
+    print(markdown(results))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results: {args.out}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print(f"\n📊 vs {args.baseline}:\n")
+            print(compare(results, json.load(f)))
+
 
 if __name__ == "__main__":
-    run_benchmark()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""
+Chunking benchmark: the original 2000-char windows vs the structure-aware chunkers.
+
+For every strategy it reports, over a corpus of real files:
+  - throughput (MB/s, chunks/s) of chunking alone (files are read into memory first;
+    --repeat N feeds the corpus N times for a steadier number)
+  - chunk size in estimated tokens (mean / p95) and how many chunks exceed 512 tokens,
+    the bge-small input limit (everything past it is silently truncated by the embedder)
+  - intact functions: share of Python functions/classes (via `ast`) that fit in the
+    chunk limit and end up whole inside a single chunk
+With --retrieval it also embeds the chunks (EMBED_MODEL_NAME, in-process, no Qdrant)
+and measures recall@k for docstring queries: the first docstring line of a Python
+function should retrieve the chunk that contains its `def`.
+
+Run from backend/:  python scripts/benchmark_chunking.py [--corpus app ../vectrieve-ui/lib] [--repeat 20] [--retrieval]
+"""
+import argparse
+import ast
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.core.tokens import estimate_tokens  # noqa: E402
+from app.services.chunking_service import get_chunker  # noqa: E402
+from app.services.parser_service import CODE_EXTENSIONS  # noqa: E402
+
+STRATEGIES = ["window", "auto"]
+EMBED_LIMIT = 512
+
+
+def load_corpus(roots: list[str]) -> list[tuple[str, str]]:
+    files = []
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in ("node_modules", "__pycache__", ".next", ".git")]
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in CODE_EXTENSIONS:
+                    path = os.path.join(dirpath, name)
+                    with open(path, encoding="utf-8", errors="ignore") as f:
+                        files.append((path, f.read()))
+    return files
+
+
+def chunk_corpus(files, strategy: str) -> dict[str, list[tuple[str, int]]]:
+    """{path: [(chunk, start_offset)]}"""
+    result = {}
+    for path, text in files:
+        chunks, offset = [], 0
+        for chunk, _, _ in get_chunker(path, strategy).chunk([(text, None)]):
+            start = text.find(chunk, max(0, offset - 400))
+            chunks.append((chunk, start))
+            offset = start + len(chunk)
+        result[path] = chunks
+    return result
+
+
+def python_definitions(text: str):
+    """(name, start_offset, end_offset, docstring first line) for every def/class."""
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return []
+    line_starts = [0]
+    for line in text.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    defs = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            first = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            start, end = line_starts[first - 1], line_starts[node.end_lineno]
+            doc = (ast.get_docstring(node) or "").strip().splitlines()
+            defs.append((node.name, start, end, doc[0] if doc else None))
+    return defs
+
+
+def intact_functions(files, chunked) -> float:
+    total = intact = 0
+    for path, text in files:
+        if not path.endswith(".py"):
+            continue
+        spans = [(s, s + len(c)) for c, s in chunked[path]]
+        for _, start, end, _ in python_definitions(text):
+            if estimate_tokens(text[start:end]) > settings.CHUNK_MAX_TOKENS:
+                continue
+            total += 1
+            if any(s <= start and end <= e for s, e in spans):
+                intact += 1
+    return intact / total if total else 0.0
+
+
+def retrieval_recall(files, chunked, ks: list[int]) -> dict[int, float]:
+    import numpy as np
+    from fastembed import TextEmbedding
+
+    model = TextEmbedding(model_name=settings.EMBED_MODEL_NAME)
+    chunks, owners = [], []
+    for path, items in chunked.items():
+        for chunk, start in items:
+            chunks.append(chunk)
+            owners.append((path, start, start + len(chunk)))
+    matrix = np.array(list(model.embed(chunks, batch_size=settings.EMBED_BATCH_SIZE)))
+
+    queries = []
+    for path, text in files:
+        if path.endswith(".py"):
+            for name, start, _, doc in python_definitions(text):
+                if doc and len(doc) > 15:
+                    def_line = text.find(f" {name}", start) + 1
+                    relevant = {i for i, (p, s, e) in enumerate(owners) if p == path and s <= def_line < e}
+                    queries.append((doc, relevant))
+    if not queries:
+        return {}
+
+    vectors = np.array(list(model.query_embed([q for q, _ in queries])))
+    ranking = np.argsort(-(vectors @ matrix.T), axis=1)
+    return {
+        k: sum(bool(set(ranking[i, :k]) & relevant) for i, (_, relevant) in enumerate(queries)) / len(queries)
+        for k in ks
+    }
+
+
+def main():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="*", default=[os.path.join(backend, "app"), os.path.join(backend, "..", "vectrieve-ui")])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--retrieval", action="store_true")
+    parser.add_argument("--k", type=int, nargs="*", default=[1, 5])
+    args = parser.parse_args()
+
+    files = load_corpus(args.corpus)
+    size_mb = sum(len(t.encode("utf-8")) for _, t in files) / (1024 * 1024)
+    print(f"Corpus: {len(files)} files, {size_mb:.2f} MB (x{args.repeat} for throughput)\n")
+
+    header = ["Strategy", "Chunks", "MB/s", "Chunks/s", "Mean tokens", "p95 tokens", f">{EMBED_LIMIT} tokens", "Intact functions"]
+    if args.retrieval:
+        header += [f"recall@{k}" for k in args.k]
+    print("| " + " | ".join(header) + " |")
+    print("|" + "---|" * len(header))
+
+    for strategy in STRATEGIES:
+        start = time.perf_counter()
+        count = 0
+        for _ in range(args.repeat):
+            for path, text in files:
+                count += sum(1 for _ in get_chunker(path, strategy).chunk([(text, None)]))
+        duration = time.perf_counter() - start
+
+        chunked = chunk_corpus(files, strategy)
+        tokens = sorted(estimate_tokens(c) for items in chunked.values() for c, _ in items)
+        row = [
+            strategy, str(len(tokens)), f"{size_mb * args.repeat / duration:.1f}", f"{count / duration:.0f}",
+            f"{statistics.mean(tokens):.0f}", str(tokens[int(0.95 * (len(tokens) - 1))]),
+            str(sum(t > EMBED_LIMIT for t in tokens)), f"{intact_functions(files, chunked):.0%}",
+        ]
+        if args.retrieval:
+            recall = retrieval_recall(files, chunked, args.k)
+            row += [f"{recall.get(k, 0):.2f}" for k in args.k]
+        print("| " + " | ".join(row) + " |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Collection profile benchmark: recall vs latency vs memory (app/services/collection_profiles.py).
+
+Vectors are taken from an existing collection (--source, e.g. the production one:
+only read) or generated as clustered unit vectors of the embedding size. --queries
+vectors are held out of the index and used as queries; the ground truth is an exact
+numpy dot-product top-k over the indexed vectors.
+
+For every profile a scratch collection is built (dense vector only, low indexing
+threshold so the HNSW graph is really built), then --queries searches run one by one
+with the profile's search params. Reported per profile:
+  - recall@k against the exact top-k
+  - p50 / p95 search latency
+  - estimated RAM: vectors that stay in RAM (float32 / int8 / 1 bit per dim, none on
+    disk) + HNSW links (~N * 2m * 4 bytes) unless the graph is on disk
+  - Qdrant resident memory growth while the collection was loaded, from the server's
+    /metrics (`memory_resident_bytes`), when the server exposes it; mmap'ed pages the
+    OS has cached count here too, so it is an upper bound
+
+Needs a running Qdrant server (the local mode ignores quantization and on-disk
+settings). Scratch collections are dropped unless --keep.
+
+Run from backend/:  python scripts/benchmark_collection_profiles.py [--n 100000] [--source Vectrieve_knowledge]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+import httpx
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.collection_profiles import PROFILES, create_collection_kwargs, search_params  # noqa: E402
+from app.services.point_builder import VECTOR_SIZE  # noqa: E402
+
+BYTES_PER_DIM = {None: 4, "scalar": 1, "binary": 1 / 8}
+
+
+def estimated_ram_mb(profile, n: int, dim: int, m: int) -> float:
+    if profile.quantization:
+        vectors = n * dim * BYTES_PER_DIM[profile.quantization]  # always_ram=True
+    else:
+        vectors = 0 if profile.vectors_on_disk else n * dim * 4
+    graph = 0 if profile.hnsw_on_disk else n * 2 * m * 4
+    return (vectors + graph) / (1024 * 1024)
+
+
+def qdrant_rss_mb() -> float | None:
+    try:
+        text = httpx.get(f"http://{settings.QDRANT_HOST}:{settings.QDRANT_PORT}/metrics", timeout=5).text
+    except httpx.HTTPError:
+        return None
+    match = re.search(r"^memory_resident_bytes\s+(\d+)", text, re.MULTILINE)
+    return int(match.group(1)) / (1024 * 1024) if match else None
+
+
+def source_vectors(client: QdrantClient, name: str, total: int) -> np.ndarray:
+    vectors, offset = [], None
+    while len(vectors) < total:
+        points, offset = client.scroll(name, limit=min(1000, total - len(vectors)), offset=offset,
+                                       with_payload=False, with_vectors=[""])
+        vectors.extend(p.vector[""] if isinstance(p.vector, dict) else p.vector for p in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(total: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, total)] + 0.6 * rng.standard_normal((total, dim)).astype(np.float32)
+    return vectors
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> list[set]:
+    truth = []
+    for start in range(0, len(queries), 256):
+        scores = queries[start:start + 256] @ data.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        truth.extend(set(row.tolist()) for row in top)
+    return truth
+
+
+def wait_green(client: QdrantClient, name: str):
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def run_profile(client, profile, data, queries, truth, args) -> dict:
+    name = f"{settings.COLLECTION_NAME}_profile_bench_{profile.name}"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    rss_before = qdrant_rss_mb()
+    kwargs = create_collection_kwargs(profile, settings.HNSW_M, settings.HNSW_EF_CONSTRUCT, sparse=False)
+    start = time.perf_counter()
+    client.create_collection(name, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000), **kwargs)
+    client.upload_collection(name, vectors=data, ids=range(len(data)), batch_size=512, wait=True)
+    wait_green(client, name)
+    build_s = time.perf_counter() - start
+
+    params = search_params(profile, settings.HNSW_EF)
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        result = client.query_points(name, query=query.tolist(), limit=args.k, search_params=params,
+                                     with_payload=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(expected & {p.id for p in result.points})
+    rss_after = qdrant_rss_mb()
+    if not args.keep:
+        client.delete_collection(name)
+    latencies.sort()
+    return {
+        "recall": hits / (len(queries) * args.k),
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "est_ram": estimated_ram_mb(profile, len(data), data.shape[1], settings.HNSW_M or 16),
+        "rss": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "build_s": build_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="indexed vectors")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--source", help="read vectors from this collection instead of generating them")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    client = QdrantClient(host=settings.QDRANT_HOST, port=settings.QDRANT_PORT, timeout=120)
+    total = args.n + args.queries
+    print(f"📦 Loading {total} vectors from {args.source or 'a synthetic generator'}...")
+    vectors = source_vectors(client, args.source, total) if args.source else synthetic_vectors(total, VECTOR_SIZE)
+    if len(vectors) <= args.queries:
+        sys.exit(f"❌ Only {len(vectors)} vectors available, need more than --queries {args.queries}")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)  # cosine == dot
+    data, queries = vectors[:-args.queries], vectors[-args.queries:]
+    truth = exact_top_k(data, queries, args.k)
+
+    results = {}
+    for name in args.profiles:
+        print(f"⚙️ Profile '{name}'...")
+        results[name] = run_profile(client, PROFILES[name], data, queries, truth, args)
+
+    print(f"\n## Collection Profile Benchmark ({time.strftime('%Y-%m-%d %H:%M')}, {len(data)} x {data.shape[1]}-d, "
+          f"{'collection ' + args.source if args.source else 'synthetic'}, HNSW_EF={settings.HNSW_EF or 'default'})\n")
+    print(f"| Profile | Recall@{args.k} | p50 (ms) | p95 (ms) | Est. RAM (MB) | Qdrant RSS growth (MB) | Build (s) |")
+    print("|---|---|---|---|---|---|---|")
+    for name, r in results.items():
+        rss = f"{r['rss']:.0f}" if r["rss"] is not None else "n/a"
+        print(f"| {name} | {r['recall']:.3f} | {r['p50']:.1f} | {r['p95']:.1f} | {r['est_ram']:.0f} | {rss} | "
+              f"{r['build_s']:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
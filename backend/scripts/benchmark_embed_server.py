@@ -0,0 +1,142 @@
+"""
+Shared embedding server vs a model in every worker.
+
+  - memory: RSS of an API process that imports app.main (models lazy) and of one
+    that has also loaded the FastEmbed model, then the estimate for --workers API
+    workers: every worker with its own model, vs plain workers + one embed server
+  - micro-batching: --concurrency clients send single-query embeddings for
+    --duration seconds, once against an in-process model (EMBED_WORKERS threads,
+    one ONNX call per query, as a single worker does today) and once through the
+    embedding server; reports queries/s, p50/p95 latency and queries per ONNX call
+
+The FastEmbed model must be cached locally.
+Run from backend/:  python scripts/benchmark_embed_server.py [--workers 4] [--concurrency 32] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.embed_server import EmbedClient  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUERIES = [f"how does function number {i} handle the upload error" for i in range(1000)]
+
+RSS_PROBE = """
+import psutil, app.main
+from app.services.vector_service import vector_service
+if {load}:
+    vector_service.load_models()
+    vector_service._embed_sync(["warm up"])
+print(psutil.Process().memory_info().rss)
+"""
+
+
+def process_rss(load_model: bool) -> float:
+    env = {**os.environ, "SENTRY_DSN": "", "QDRANT_LOCATION": ":memory:", "EMBED_SERVER_SOCKET": ""}
+    out = subprocess.run([sys.executable, "-c", RSS_PROBE.format(load=load_model)], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return int(out.stdout.strip().splitlines()[-1]) / (1024 * 1024)
+
+
+async def drive(embed_one, concurrency: int, duration: float) -> dict:
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client(offset: int):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await embed_one(QUERIES[i % len(QUERIES)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "qps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "queries": len(latencies),
+    }
+
+
+async def run_local(concurrency: int, duration: float) -> dict:
+    from fastembed import TextEmbedding
+    model = TextEmbedding(model_name=settings.EMBED_MODEL_NAME, threads=settings.EMBED_THREADS or None)
+    list(model.embed(["warm up"]))
+    executor = ThreadPoolExecutor(max_workers=settings.EMBED_WORKERS)
+    loop = asyncio.get_running_loop()
+
+    async def embed_one(text):
+        return await loop.run_in_executor(executor, lambda: list(model.embed([text])))
+
+    stats = await drive(embed_one, concurrency, duration)
+    stats["queries_per_call"] = 1.0
+    return stats
+
+
+async def run_server(concurrency: int, duration: float, socket_path: str) -> dict:
+    server = subprocess.Popen([sys.executable, "-m", "app.services.embed_server", "--socket", socket_path],
+                              cwd=BACKEND_DIR, env={**os.environ, "SENTRY_DSN": ""})
+    try:
+        client = EmbedClient(socket_path, max_idle=concurrency)
+        await client.wait_ready(settings.EMBED_SERVER_WAIT_SECONDS)
+        before = await client.info()
+
+        async def embed_one(text):
+            return await client.embed([text], query=True)
+
+        stats = await drive(embed_one, concurrency, duration)
+        after = await client.info()
+        before, after = before["lanes"]["query"], after["lanes"]["query"]
+        calls = after["model_calls"] - before["model_calls"]
+        stats["queries_per_call"] = round((after["requests"] - before["requests"]) / calls, 2) if calls else None
+        stats["server_rss_mb"] = round(psutil.Process(server.pid).memory_info().rss / (1024 * 1024), 1)
+        client.close()
+        return stats
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="API workers for the memory estimate")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print("📏 Measuring process RSS...")
+    base, with_model = process_rss(False), process_rss(True)
+    print(f"⚡ In-process model, {args.concurrency} concurrent queries...")
+    local = asyncio.run(run_local(args.concurrency, args.duration))
+    print(f"🧠 Embedding server, {args.concurrency} concurrent queries...")
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="vectrieve_embed_"), "embed.sock")
+    shared = asyncio.run(run_server(args.concurrency, args.duration, socket_path))
+
+    w = args.workers
+    print(f"\n## Embedding Server Benchmark ({time.strftime('%Y-%m-%d %H:%M')}, {os.cpu_count()} CPU, "
+          f"EMBED_THREADS={settings.EMBED_THREADS or 'auto'})")
+    print(f"API process RSS: {base:.0f} MB without the model, {with_model:.0f} MB with it.\n")
+    print("| Mode | RSS for %d workers (MB) | Queries/s | p50 (ms) | p95 (ms) | Queries per ONNX call |" % w)
+    print("|---|---|---|---|---|---|")
+    print(f"| model in every worker | {w * with_model:.0f} | {local['qps']} | {local['p50_ms']} | {local['p95_ms']} | 1.0 |")
+    print(f"| shared embedding server | {w * base + shared['server_rss_mb']:.0f} | {shared['qps']} | "
+          f"{shared['p50_ms']} | {shared['p95_ms']} | {shared['queries_per_call']} |")
+
+
+if __name__ == "__main__":
+    main()
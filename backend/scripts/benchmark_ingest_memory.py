@@ -0,0 +1,138 @@
+"""
+Memory benchmark for file ingestion: legacy whole-file parsing vs the streaming pipeline.
+
+Generates synthetic PDF and text files, then measures peak Python heap (tracemalloc)
+while turning each file into chunks. Embedding/upsert is excluded: both paths hand
+chunks to Qdrant in the same batches, the difference is how much text is held at once.
+
+Run from backend/:  python scripts/benchmark_ingest_memory.py --pdf-pages 200 1000 --text-mb 20 100
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.chunking_service import chunk_text, iter_file_chunks  # noqa: E402
+
+WORDS = ("vector search embedding chunk qdrant latency python function class "
+         "module request response token stream batch index payload filter").split()
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 45):
+    """Writes a minimal text PDF page by page (Helvetica, one content stream per page)."""
+    offsets = []
+
+    with open(path, "wb") as f:
+        def obj(num: int, body: bytes):
+            offsets.append((num, f.tell()))
+            f.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+        obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        for i in range(pages):
+            lines = []
+            for j in range(lines_per_page):
+                words = " ".join(WORDS[(i + j + k) % len(WORDS)] for k in range(12))
+                lines.append(f"(page {i + 1} line {j + 1} {words}) '")
+            stream = ("BT /F1 9 Tf 40 800 Td 11 TL\n" + "\n".join(lines) + "\nET").encode()
+            page_num, content_num = 4 + 2 * i, 5 + 2 * i
+            obj(page_num, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                           f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_num} 0 R >>").encode())
+            obj(content_num, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref_at = f.tell()
+        total = 4 + 2 * pages
+        f.write(f"xref\n0 {total}\n0000000000 65535 f \n".encode())
+        by_num = dict(offsets)
+        for num in range(1, total):
+            f.write(f"{by_num[num]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+
+
+def write_synthetic_text(path: str, megabytes: int):
+    line = ("def handler(request):  # " + " ".join(WORDS) + "\n")
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written < megabytes * 1024 * 1024:
+            f.write(line)
+            written += len(line)
+
+
+def legacy_chunks(path: str, filename: str) -> int:
+    """The pre-streaming path: whole read -> BytesIO -> join all pages -> chunk_text."""
+    with open(path, "rb") as f:
+        content = f.read()
+    if filename.endswith(".pdf"):
+        import pypdf
+        reader = pypdf.PdfReader(io.BytesIO(content))
+        text = "\n".join(t for t in (p.extract_text() for p in reader.pages) if t)
+    else:
+        text = content.decode("utf-8")
+    return len(chunk_text(text))
+
+
+def streaming_chunks(path: str, filename: str, batch_size: int = 256) -> int:
+    count = 0
+    batch = []
+    for chunk in iter_file_chunks(path, filename):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            count += len(batch)
+            batch = []
+    return count + len(batch)
+
+
+def measure(fn, path: str, filename: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn(path, filename)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, peak / (1024 * 1024), duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-pages", type=int, nargs="*", default=[100, 500])
+    parser.add_argument("--text-mb", type=int, nargs="*", default=[10, 50])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = []
+        for pages in args.pdf_pages:
+            path = os.path.join(tmp, f"synthetic_{pages}p.pdf")
+            write_synthetic_pdf(path, pages)
+            cases.append((f"PDF {pages} pages", path))
+        for mb in args.text_mb:
+            path = os.path.join(tmp, f"synthetic_{mb}mb.txt")
+            write_synthetic_text(path, mb)
+            cases.append((f"Text {mb} MB", path))
+
+        for label, path in cases:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            name = os.path.basename(path)
+            for mode, fn in (("legacy", legacy_chunks), ("streaming", streaming_chunks)):
+                print(f"⏱️  {label} / {mode}...", flush=True)
+                chunks, peak, duration = measure(fn, path, name)
+                rows.append((label, f"{size_mb:.1f}", mode, chunks, f"{peak:.1f}", f"{duration:.2f}"))
+
+    print(f"\n## Ingestion Memory Benchmark ({time.strftime('%Y-%m-%d %H:%M')})")
+    print("\n| File | Size (MB) | Pipeline | Chunks | Peak heap (MB) | Time (s) |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        print("| " + " | ".join(str(c) for c in row) + " |")
+
+
+if __name__ == "__main__":
+    main()
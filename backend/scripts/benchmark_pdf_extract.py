@@ -0,0 +1,62 @@
+"""
+PDF extraction benchmark: single process vs a pool of N worker processes.
+
+Generates synthetic multi-hundred-page PDFs and times `iter_pdf_pages` with
+workers=1 and each requested worker count, checking that pages come back
+complete and in order.
+
+Run from backend/:  python scripts/benchmark_pdf_extract.py --pages 300 600 --workers 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.parser_service import iter_pdf_pages, shutdown_pdf_pool  # noqa: E402
+from benchmark_ingest_memory import write_synthetic_pdf  # noqa: E402
+
+
+def run(path: str, workers: int):
+    start = time.perf_counter()
+    pages = [page for page, _ in iter_pdf_pages(path, workers=workers)]
+    duration = time.perf_counter() - start
+    assert pages == sorted(pages), "pages out of order"
+    return len(pages), duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="*", default=[300])
+    parser.add_argument("--workers", type=int, nargs="*", default=[2, 4])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in args.pages:
+            path = os.path.join(tmp, f"synthetic_{page_count}p.pdf")
+            write_synthetic_pdf(path, page_count)
+            baseline = None
+            for workers in [1] + args.workers:
+                # Пул створюється під конкретну кількість воркерів
+                shutdown_pdf_pool()
+                settings.PDF_EXTRACT_WORKERS = workers
+                print(f"⏱️  {page_count} pages / {workers} worker(s)...", flush=True)
+                extracted, duration = run(path, workers)
+                baseline = baseline or duration
+                rows.append((page_count, workers, extracted, f"{duration:.2f}",
+                             f"{extracted / duration:.1f}", f"{baseline / duration:.2f}x"))
+            shutdown_pdf_pool()
+
+    print(f"\n## PDF Extraction Benchmark ({time.strftime('%Y-%m-%d %H:%M')}, {os.cpu_count()} CPU)")
+    print("\n| Pages | Workers | Extracted | Time (s) | Pages/s | Speedup |")
+    print("|---|---|---|---|---|---|")
+    for row in rows:
+        print("| " + " | ".join(str(c) for c in row) + " |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Retrieval benchmark: recall@k and latency for dense, sparse (BM25) and hybrid (RRF) search.
+
+The corpus is real code (by default this backend's own app/ package), chunked the
+same way uploads are. Queries are the things dense-only search tends to miss:
+  - identifiers: every `def name` / `class Name` -> query "name"
+  - error strings: every `raise SomeError("message")` -> query "message"
+A query counts as a hit@k if any of the top-k chunks contains its definition line.
+
+Needs a running Qdrant server (sparse search is not supported by the local in-memory
+mode of the pinned qdrant-client) and the FastEmbed models. Uses a separate
+collection, dropped at the end unless --keep is given.
+
+Run from backend/:  python scripts/benchmark_retrieval.py [--corpus app] [--k 1 5 10]
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.chunking_service import batch_texts_and_metas, iter_file_chunks  # noqa: E402
+from app.services.parser_service import CODE_EXTENSIONS  # noqa: E402
+from app.services.vector_service import vector_service  # noqa: E402
+
+IDENTIFIER = re.compile(r"^\s*(?:async\s+)?(?:def|class)\s+([A-Za-z_]\w{3,})", re.MULTILINE)
+ERROR_STRING = re.compile(r"raise\s+\w+\(\s*f?[\"']([^\"'{}]{12,})[\"']")
+
+
+def load_corpus(root: str):
+    """Returns (texts, metas) for every code file under root."""
+    texts, metas = [], []
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() not in CODE_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root)
+            batch = list(iter_file_chunks(path, rel))
+            t, m = batch_texts_and_metas(batch, rel, 0)
+            texts.extend(t)
+            metas.extend(m)
+    return texts, metas
+
+
+def build_queries(texts: list[str]) -> dict[str, list[tuple[str, set[int]]]]:
+    """{query_set: [(query, {relevant chunk indexes})]}"""
+    sets = {"identifiers": {}, "error strings": {}}
+    for i, text in enumerate(texts):
+        for name in IDENTIFIER.findall(text):
+            sets["identifiers"].setdefault(name, set()).add(i)
+        for message in ERROR_STRING.findall(text):
+            sets["error strings"].setdefault(message, set()).add(i)
+    return {name: sorted(queries.items()) for name, queries in sets.items()}
+
+
+async def run_mode(mode: str, queries, ids: list[str], ks: list[int]):
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for query, relevant in queries:
+        relevant_ids = {ids[i] for i in relevant}
+        start = time.perf_counter()
+        results = await vector_service.search(query, limit=max(ks), mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked = [str(hit.id) for hit in results]
+        for k in ks:
+            if relevant_ids & set(ranked[:k]):
+                hits[k] += 1
+    latencies.sort()
+    return {
+        **{f"recall@{k}": hits[k] / len(queries) for k in ks},
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+    parser.add_argument("--k", type=int, nargs="*", default=[1, 5, 10])
+    parser.add_argument("--collection", default=f"{settings.COLLECTION_NAME}_retrieval_bench")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    vector_service.collection_name = args.collection
+    if await vector_service.client.collection_exists(args.collection):
+        await vector_service.client.delete_collection(args.collection)
+    await vector_service.ensure_collection()
+    if not vector_service.sparse_enabled:
+        sys.exit("Sparse (BM25) search is not available: check SPARSE_MODEL_NAME and the Qdrant server")
+
+    texts, metas = load_corpus(args.corpus)
+    start = time.perf_counter()
+    ids = await vector_service.add_documents(texts, metas, wait=True)
+    await vector_service.refresh_state()
+    print(f"Indexed {len(texts)} chunks from {args.corpus} in {time.perf_counter() - start:.1f}s\n")
+
+    try:
+        for set_name, queries in build_queries(texts).items():
+            if not queries:
+                continue
+            print(f"## {set_name} ({len(queries)} queries)\n")
+            header = ["mode"] + [f"recall@{k}" for k in args.k] + ["p50 ms", "p95 ms"]
+            print("| " + " | ".join(header) + " |")
+            print("|" + "---|" * len(header))
+            for mode in ("dense", "sparse", "hybrid"):
+                r = await run_mode(mode, queries, ids, args.k)
+                cells = [mode] + [f"{r[f'recall@{k}']:.2f}" for k in args.k] + [f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}"]
+                print("| " + " | ".join(cells) + " |")
+            print()
+    finally:
+        if not args.keep:
+            await vector_service.client.delete_collection(args.collection)
+        await vector_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
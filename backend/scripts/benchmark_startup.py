@@ -0,0 +1,151 @@
+"""
+Startup benchmark: how fast a fresh API process can take traffic.
+
+For --runs fresh processes it measures:
+  - import: `import app.main` in a clean interpreter (what every worker pays before
+    uvicorn can bind; nothing here should touch the network or load a model)
+  - live: launch -> first 200 from /health (port bound, liveness)
+  - ready: launch -> first 200 from /health/ready (models loaded, collection reachable,
+    warm-up embedding done), plus the per-stage breakdown the server reports
+--imports prints the slowest modules of the import (python -X importtime).
+--qdrant-down points the API at a closed port and checks that it still goes live,
+keeps answering 503 on /health/ready and retries Qdrant instead of exiting.
+
+Qdrant is in-process (QDRANT_LOCATION=:memory:) unless --qdrant-down; the FastEmbed
+model must be cached locally for the "ready" column.
+
+Run from backend/:  python scripts/benchmark_startup.py [--runs 5] [--imports] [--qdrant-down]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmark import BACKEND_DIR, free_port
+
+
+def base_env(workdir: str) -> dict:
+    return {
+        **os.environ,
+        "SENTRY_DSN": "", "QDRANT_LOCATION": ":memory:", "GROQ_API_KEY": "",
+        "LOGS_DB": os.path.join(workdir, "logs.db"), "CATALOG_DB": os.path.join(workdir, "catalog.db"),
+        "JOBS_DB": os.path.join(workdir, "jobs.db"), "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "ANALYTICS_SNAPSHOT": os.path.join(workdir, "analytics.json"),
+    }
+
+
+def measure_import(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int = 15) -> list[tuple[float, str]]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        # Лише пакети верхнього рівня (qdrant_client, numpy, ...): підмодулі вже входять у їхній cumulative
+        if "." not in name:
+            rows.append((int(cumulative_us) / 1e6, name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure_launch(env: dict, timeout: float) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"live": None, "ready": None, "status": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=2) as client:
+            while time.perf_counter() - start < timeout and api.poll() is None:
+                try:
+                    if result["live"] is None and client.get("/health").status_code == 200:
+                        result["live"] = time.perf_counter() - start
+                    if result["live"] is not None:
+                        response = client.get("/health/ready")
+                        result["status"] = response.json()
+                        if response.status_code == 200:
+                            result["ready"] = time.perf_counter() - start
+                            break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.05)
+        result["exited"] = api.poll() is not None
+    finally:
+        api.terminate()
+        try:
+            api.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            api.kill()
+    return result
+
+
+def fmt(values: list) -> str:
+    values = [v for v in values if v is not None]
+    if not values:
+        return "n/a"
+    return f"{statistics.median(values):.2f}" + (f" (min {min(values):.2f}, max {max(values):.2f})" if len(values) > 1 else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for readiness per run")
+    parser.add_argument("--imports", action="store_true", help="Show the slowest top-level packages")
+    parser.add_argument("--qdrant-down", action="store_true", help="Start against an unreachable Qdrant")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="vectrieve_startup_")
+    env = base_env(workdir)
+
+    if args.imports:
+        print("🐢 Slowest imports (cumulative s):")
+        for seconds, name in slowest_imports(env):
+            print(f"   {seconds:6.3f}  {name}")
+
+    if args.qdrant_down:
+        env = {**env, "QDRANT_LOCATION": "", "QDRANT_HOST": "127.0.0.1", "QDRANT_PORT": str(free_port()),
+               "STARTUP_RETRY_MAX_SECONDS": "2"}
+        result = measure_launch(env, timeout=min(args.timeout, 15))
+        print(f"🔌 Qdrant down: live after {fmt([result['live']])}s, ready={result['ready'] is not None}, "
+              f"process exited={result['exited']}, status={result['status']}")
+        return
+
+    imports, lives, readies, stages = [], [], [], []
+    for i in range(args.runs):
+        imports.append(measure_import(env))
+        result = measure_launch(env, args.timeout)
+        lives.append(result["live"])
+        readies.append(result["ready"])
+        if result["ready"] is not None:
+            stages.append(result["status"]["timings"])
+        else:
+            print(f"⚠️ Run {i + 1} not ready after {args.timeout:.0f}s: {result['status']}")
+        print(f"⏱️ Run {i + 1}: import {imports[-1]:.2f}s, live {fmt([result['live']])}s, ready {fmt([result['ready']])}s")
+
+    print(f"\n## Startup Benchmark ({time.strftime('%Y-%m-%d %H:%M')}, {os.cpu_count()} CPU, {args.runs} runs, median)")
+    print("| import app.main (s) | Launch -> /health (s) | Launch -> /health/ready (s) |")
+    print("|---|---|---|")
+    print(f"| {fmt(imports)} | {fmt(lives)} | {fmt(readies)} |")
+    if stages:
+        names = list(stages[0])
+        print("\n| " + " | ".join(names) + " |")
+        print("|" + "---|" * len(names))
+        print("| " + " | ".join(f"{statistics.median(s.get(n, 0) for s in stages):.2f}" for n in names) + " |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+One-off import of the legacy chat_logs.csv into the SQLite query log (logs.db).
+
+CSV rows are Timestamp,Query,Response,Latency,Model,Feedback,QueryID[,ThinkingMode];
+rows whose last column is "feedback" go to the feedback table. Query IDs that are
+already present in logs.db are skipped, so the script can be re-run safely.
+
+Run from backend/:  python scripts/import_csv_logs.py [--csv chat_logs.csv]
+"""
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.query_log import QueryLog  # noqa: E402
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_csv(path: str):
+    """Yields ("queries" | "feedback", row tuple) in QueryLog column order."""
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for row in csv.reader(f):
+            if len(row) < 7 or row[0] == "Timestamp":
+                continue
+            try:
+                ts = datetime.fromisoformat(row[0]).timestamp()
+            except ValueError:
+                continue
+            query, response, latency, model, feedback, query_id = row[1], row[2], _float(row[3]), row[4], row[5], row[6]
+            thinking_mode = row[7] if len(row) > 7 else None
+            if thinking_mode == "feedback":
+                yield "feedback", (ts, query_id, feedback, query, response, latency)
+            else:
+                yield "queries", (ts, query_id, query, response, model, thinking_mode, None, 0, latency, None, None, None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=settings.LOG_FILE)
+    parser.add_argument("--db", default=settings.LOGS_DB)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv):
+        sys.exit(f"CSV not found: {args.csv}")
+
+    log = QueryLog(args.db)
+    with log._connect() as conn:
+        known = {
+            (table, qid)
+            for table in ("queries", "feedback")
+            for (qid,) in conn.execute(f"SELECT query_id FROM {table}")
+        }
+
+    rows = {"queries": [], "feedback": []}
+    for table, row in read_csv(args.csv):
+        if (table, row[1]) not in known:
+            rows[table].append(row)
+    for table, values in rows.items():
+        log.write_now(table, values)
+    print(f"Imported {len(rows['queries'])} queries and {len(rows['feedback'])} feedback rows into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
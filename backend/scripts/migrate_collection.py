@@ -0,0 +1,163 @@
+"""
+Move an existing collection to a storage profile (app/services/collection_profiles.py).
+
+Rebuild (default): creates `<name>_<profile>_<timestamp>` with the profile's vector,
+HNSW, quantization and payload settings, copies every point (ids, dense + sparse
+vectors and payload) in --batch pages, waits for indexing, checks the point count
+and points the alias COLLECTION_NAME at the new collection in one atomic
+update_collection_aliases call. The API never sees a half-built collection.
+  - If COLLECTION_NAME is already an alias, the previous target is kept (drop it by
+    hand once the new one is verified).
+  - If COLLECTION_NAME is a real collection, a name cannot be both, so --drop-old is
+    required: the old collection is deleted right before the alias is created (a
+    few seconds of "collection not found" for the API).
+Pause uploads during a rebuild: points written to the old collection after the copy
+started are not carried over.
+
+--in-place: update_collection on the existing collection instead (vectors/HNSW on
+disk, quantization on/off, on-disk payload). No copy and no extra disk, but Qdrant
+re-optimizes segments in the background and searches are slower until it is green.
+
+Run from backend/:  python scripts/migrate_collection.py --profile scalar [--drop-old | --in-place]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client.http import models  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services.collection_profiles import (  # noqa: E402
+    create_collection_kwargs, get_profile, hnsw_config, profile_mismatches, quantization_config,
+)
+from app.services.point_builder import FILTER_KEYS, has_sparse_vectors  # noqa: E402
+from app.services.vector_service import vector_service  # noqa: E402
+
+
+async def resolve(client, name: str) -> tuple[str, bool]:
+    """(collection behind `name`, whether `name` is an alias)."""
+    aliases = await client.get_aliases()
+    for alias in aliases.aliases:
+        if alias.alias_name == name:
+            return alias.collection_name, True
+    return name, False
+
+
+async def wait_green(client, name: str, timeout: float = 3600):
+    deadline = time.monotonic() + timeout
+    while (await client.get_collection(name)).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Collection '{name}' still not green after {timeout:.0f}s")
+        await asyncio.sleep(2)
+
+
+async def copy_points(client, source: str, target: str, batch: int) -> int:
+    copied, offset = 0, None
+    while True:
+        points, offset = await client.scroll(
+            collection_name=source, limit=batch, offset=offset, with_payload=True, with_vectors=True
+        )
+        if points:
+            await client.upsert(
+                collection_name=target,
+                points=[models.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+                wait=True,
+            )
+            copied += len(points)
+            print(f"   ... {copied} points")
+        if offset is None:
+            return copied
+
+
+async def rebuild(client, alias: str, profile, drop_old: bool, batch: int):
+    source, is_alias = await resolve(client, alias)
+    if not is_alias and not drop_old:
+        sys.exit(f"❌ '{alias}' is a collection, not an alias: rerun with --drop-old to replace it "
+                 f"(or --in-place to convert it without a copy)")
+    info = await client.get_collection(source)
+    target = f"{alias}_{profile.name}_{time.strftime('%Y%m%d%H%M%S')}"
+    print(f"🔨 Creating '{target}' (profile '{profile.name}')...")
+    await client.create_collection(
+        collection_name=target,
+        **create_collection_kwargs(profile, settings.HNSW_M, settings.HNSW_EF_CONSTRUCT,
+                                   sparse=has_sparse_vectors(info))
+    )
+    for field in FILTER_KEYS:
+        await client.create_payload_index(
+            collection_name=target, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD
+        )
+
+    start = time.perf_counter()
+    print(f"📦 Copying '{source}' -> '{target}'...")
+    copied = await copy_points(client, source, target, batch)
+    await wait_green(client, target)
+    source_count = (await client.count(source, exact=True)).count
+    target_count = (await client.count(target, exact=True)).count
+    if target_count != source_count:
+        sys.exit(f"❌ Point count mismatch ({source_count} in '{source}', {target_count} in '{target}'); "
+                 f"alias not switched, '{target}' left for inspection")
+    print(f"✅ Copied {copied} points in {time.perf_counter() - start:.1f}s")
+
+    if not is_alias:
+        print(f"🗑️ Dropping collection '{source}' to free the name for the alias...")
+        await client.delete_collection(source)
+    actions = [models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=alias))]
+    if is_alias:
+        actions.insert(0, models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    await client.update_collection_aliases(change_aliases_operations=actions)
+    print(f"🔀 '{alias}' -> '{target}'")
+    if is_alias:
+        print(f"ℹ️ Previous collection '{source}' kept; delete it once the new one is verified")
+
+
+async def in_place(client, alias: str, profile):
+    name, _ = await resolve(client, alias)
+    info = await client.get_collection(name)
+    quantization = quantization_config(profile)
+    if quantization is None and info.config.quantization_config is not None:
+        quantization = models.Disabled.DISABLED
+    print(f"🔧 Updating '{name}' to profile '{profile.name}'...")
+    await client.update_collection(
+        collection_name=name,
+        vectors_config={"": models.VectorParamsDiff(on_disk=profile.vectors_on_disk)},
+        hnsw_config=hnsw_config(profile, settings.HNSW_M, settings.HNSW_EF_CONSTRUCT)
+        or models.HnswConfigDiff(on_disk=profile.hnsw_on_disk),
+        quantization_config=quantization,
+        collection_params=models.CollectionParamsDiff(on_disk_payload=profile.payload_on_disk),
+    )
+    start = time.perf_counter()
+    await wait_green(client, name)
+    print(f"✅ Re-optimized in {time.perf_counter() - start:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default=settings.COLLECTION_PROFILE)
+    parser.add_argument("--collection", default=settings.COLLECTION_NAME, help="collection or alias the API uses")
+    parser.add_argument("--batch", type=int, default=256)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--drop-old", action="store_true", help="COLLECTION_NAME is a collection: replace it")
+    mode.add_argument("--in-place", action="store_true", help="update_collection instead of a rebuild")
+    args = parser.parse_args()
+
+    profile = get_profile(args.profile)
+    client = vector_service.client
+    name, _ = await resolve(client, args.collection)
+    diffs = profile_mismatches(profile, await client.get_collection(name), settings.HNSW_M, settings.HNSW_EF_CONSTRUCT)
+    if not diffs:
+        print(f"✅ '{args.collection}' already matches profile '{profile.name}'")
+        return
+    print(f"ℹ️ Changes: {'; '.join(diffs)}")
+    if args.in_place:
+        await in_place(client, args.collection, profile)
+    else:
+        await rebuild(client, args.collection, profile, args.drop_old, args.batch)
+    print(f"ℹ️ Set COLLECTION_PROFILE={profile.name} for the API so searches use the matching params")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
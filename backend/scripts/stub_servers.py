@@ -0,0 +1,135 @@
+"""
+Local stand-ins for the two LLM backends, to exercise the provider router
+(fallback, hedging, circuit breaker, concurrency limits) without Groq or Ollama.
+
+One server speaks both protocols:
+  - Groq / OpenAI-compatible streaming:  POST /openai/v1/chat/completions  (SSE)
+  - Ollama:                              POST /api/chat                    (NDJSON)
+Latency and failures are configurable per backend, and can be changed at runtime
+with POST /control {"cloud": {"ttft_ms": 3000}, "local": {"error_rate": 0.5}}.
+
+Run from backend/:
+  python scripts/stub_servers.py --port 9100 --cloud-ttft-ms 2500 --cloud-error-rate 0.3
+then start the API with
+  GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:9100 OLLAMA_HOST=http://127.0.0.1:9100 LLM_HEDGE_MS=800
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+BEHAVIOUR = {
+    "cloud": {"ttft_ms": 200, "token_ms": 10, "tokens": 40, "error_rate": 0.0, "error_status": 429},
+    "local": {"ttft_ms": 600, "token_ms": 30, "tokens": 40, "error_rate": 0.0, "error_status": 500},
+}
+STATS = {"cloud": {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0},
+         "local": {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}}
+
+app = FastAPI(title="LLM stub servers")
+
+
+def _start(backend: str):
+    stats = STATS[backend]
+    stats["requests"] += 1
+    if random.random() < BEHAVIOUR[backend]["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": f"stub {backend} failure"}}, status_code=BEHAVIOUR[backend]["error_status"])
+    return None
+
+
+async def _tokens(backend: str):
+    b, stats = BEHAVIOUR[backend], STATS[backend]
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(b["ttft_ms"] / 1000)
+        for i in range(b["tokens"]):
+            if i:
+                await asyncio.sleep(b["token_ms"] / 1000)
+            yield f"{backend}{i} "
+    finally:
+        stats["in_flight"] -= 1
+
+
+@app.post("/openai/v1/chat/completions")
+async def groq_chat(request: Request):
+    body = await request.json()
+    error = _start("cloud")
+    if error:
+        return error
+
+    async def sse():
+        created = int(time.time())
+        async for token in _tokens("cloud"):
+            chunk = {
+                "id": "stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        done = {"id": "stub", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    if not body.get("stream"):
+        text = "".join([t async for t in _tokens("cloud")])
+        return {"id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+
+@app.post("/api/chat")
+async def ollama_chat(request: Request):
+    body = await request.json()
+    error = _start("local")
+    if error:
+        return error
+
+    async def ndjson():
+        async for token in _tokens("local"):
+            yield json.dumps({"model": body.get("model"), "created_at": "2026-01-01T00:00:00Z",
+                              "message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+        yield json.dumps({"model": body.get("model"), "created_at": "2026-01-01T00:00:00Z",
+                          "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+    if not body.get("stream", True):
+        text = "".join([t async for t in _tokens("local")])
+        return {"model": body.get("model"), "created_at": "2026-01-01T00:00:00Z",
+                "message": {"role": "assistant", "content": text}, "done": True}
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/control")
+async def control(changes: dict):
+    for backend, values in changes.items():
+        BEHAVIOUR[backend].update(values)
+    return BEHAVIOUR
+
+
+@app.get("/stats")
+async def stats():
+    return {"behaviour": BEHAVIOUR, "stats": STATS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    for backend in ("cloud", "local"):
+        for key in ("ttft_ms", "token_ms", "tokens", "error_rate", "error_status"):
+            default = BEHAVIOUR[backend][key]
+            parser.add_argument(f"--{backend}-{key.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+    for backend in ("cloud", "local"):
+        for key in BEHAVIOUR[backend]:
+            BEHAVIOUR[backend][key] = getattr(args, f"{backend}_{key}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
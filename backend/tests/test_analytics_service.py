@@ -0,0 +1,41 @@
+import random
+
+from app.core.config import settings
+from app.services.analytics_service import AnalyticsEngine, QuantileSketch, RollingCounter
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 1) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+    values.sort()
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.011
+    assert QuantileSketch.from_dict(sketch.to_dict()).quantile(0.95) == sketch.quantile(0.95)
+
+
+def test_rolling_counter_expires_old_events():
+    counter = RollingCounter(window_seconds=3600)
+    counter.add("positive", 1000.0)
+    counter.add("negative", 4000.0)
+    assert counter.get(now=4000.0) == {"positive": 1, "negative": 1}
+    assert counter.get(now=5000.0) == {"negative": 1}
+
+
+def test_engine_rates_and_feedback_ratio():
+    engine = AnalyticsEngine()
+    engine.observe_query(settings.MODEL_NAME, "mentor", "cloud", 1.0)
+    engine.observe_query(settings.LOCAL_MODEL_NAME, "mentor", "cloud", 2.0, cached=True)
+    engine.observe_feedback("positive")
+    engine.observe_feedback("negative")
+    engine.observe_feedback("positive")
+
+    snap = engine.snapshot()
+    assert snap["fallback_rate"] == 0.5
+    assert snap["cache_hit_rate"] == 0.5
+    assert snap["thinking_modes"] == {"mentor": 2}
+    assert snap["feedback"]["24h"]["positive_ratio"] == round(2 / 3, 3)
+    assert (snap["likes"], snap["dislikes"]) == (2, 1)
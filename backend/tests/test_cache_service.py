@@ -0,0 +1,87 @@
+import time
+
+from app.services.cache_service import EmbeddingCache, ResponseCache
+
+
+def make_cache(**kwargs):
+    params = dict(max_entries=10, max_bytes=1024 * 1024, ttl_seconds=60, similarity_threshold=0.95)
+    params.update(kwargs)
+    return ResponseCache(**params)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = make_cache()
+    ctx = cache.context_key("mentor", 0.3, ["a", "b"])
+    cache.put("What is RAG?", ctx, "answer", "model-x", {"doc.pdf"})
+
+    hit = cache.get("  what is   rag ", ctx)
+    assert hit is not None and hit.response_text == "answer"
+    assert cache.stats()["hits"] == 1
+
+
+def test_context_key_depends_on_chunks_and_mode():
+    cache = make_cache()
+    assert cache.context_key("mentor", 0.3, ["a", "b"]) == cache.context_key("mentor", 0.3, ["b", "a"])
+    assert cache.context_key("mentor", 0.3, ["a"]) != cache.context_key("auditor", 0.3, ["a"])
+    assert cache.context_key("mentor", 0.3, ["a"]) != cache.context_key("mentor", 0.3, ["a", "c"])
+    assert cache.context_key("mentor", 0.3, [], workspace="a") != cache.context_key("mentor", 0.3, [], workspace="b")
+
+
+def test_semantic_hit_uses_query_vector():
+    cache = make_cache()
+    ctx = cache.context_key("mentor", 0.3, ["a"])
+    cache.put("how do I upload files", ctx, "answer", "model-x", {"doc.pdf"}, query_vector=[1.0, 0.0, 0.0])
+
+    assert cache.get("how can I upload a file", ctx, query_vector=[0.99, 0.05, 0.0]) is not None
+    assert cache.get("something else", ctx, query_vector=[0.0, 1.0, 0.0]) is None
+    stats = cache.stats()
+    assert stats["semantic_hits"] == 1 and stats["misses"] == 1
+
+
+def test_lru_and_memory_eviction():
+    cache = make_cache(max_entries=2)
+    ctx = cache.context_key("mentor", 0.3, [])
+    cache.put("q1", ctx, "a1", "m", set())
+    cache.put("q2", ctx, "a2", "m", set())
+    cache.get("q1", ctx)
+    cache.put("q3", ctx, "a3", "m", set())
+
+    assert cache.get("q2", ctx) is None
+    assert cache.get("q1", ctx) is not None
+
+    small = make_cache(max_bytes=600)
+    small.put("q1", ctx, "x" * 200, "m", set())
+    small.put("q2", ctx, "y" * 200, "m", set())
+    assert small.stats()["entries"] == 1
+
+
+def test_ttl_expiry():
+    cache = make_cache(ttl_seconds=0.01)
+    ctx = cache.context_key("mentor", 0.3, [])
+    cache.put("q", ctx, "a", "m", set())
+    time.sleep(0.02)
+    assert cache.get("q", ctx) is None
+
+
+def test_invalidate_files():
+    cache = make_cache()
+    ctx = cache.context_key("mentor", 0.3, ["a"])
+    cache.put("q1", ctx, "a1", "m", {"doc.pdf"})
+    cache.put("q2", ctx, "a2", "m", {"other.md"})
+
+    assert cache.invalidate_files(["doc.pdf"]) == 1
+    assert cache.get("q1", ctx) is None
+    assert cache.get("q2", ctx) is not None
+
+
+def test_embedding_cache_lru_and_stats():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("bge", "a", [1.0])
+    cache.put("bge", "b", [2.0])
+    assert cache.get("bge", "a") == [1.0]
+    cache.put("bge", "c", [3.0])
+
+    assert cache.get("bge", "b") is None
+    assert cache.get("other-model", "a") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["hits"] == 1 and stats["misses"] == 2
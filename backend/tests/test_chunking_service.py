@@ -0,0 +1,77 @@
+import random
+
+from app.services.chunking_service import chunk_text, iter_chunks, iter_chunks_with_pages
+
+
+def legacy_chunk_text(text, chunk_size=2000, overlap=200):
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def test_streaming_chunks_match_whole_text_chunking():
+    rng = random.Random(7)
+    text = "".join(rng.choice("abcdef \n") for _ in range(23_456))
+
+    pieces, pos = [], 0
+    while pos < len(text):
+        size = rng.randint(1, 5000)
+        pieces.append(text[pos:pos + size])
+        pos += size
+
+    assert list(iter_chunks(pieces)) == legacy_chunk_text(text)
+    assert chunk_text(text) == legacy_chunk_text(text)
+
+
+def test_short_and_empty_text():
+    assert chunk_text("") == []
+    assert chunk_text("hello") == ["hello"]
+
+
+def test_chunks_carry_page_range():
+    pieces = [("a" * 1500, 1), ("\n" + "b" * 1500, 2), ("\n" + "c" * 1500, 3)]
+    chunks = list(iter_chunks_with_pages(pieces, chunk_size=2000, overlap=200))
+
+    assert "".join(c for c, _, _ in chunks[:1]) == ("a" * 1500 + "\n" + "b" * 1500)[:2000]
+    assert [(first, last) for _, first, last in chunks] == [(1, 2), (2, 3), (3, 3)]
+    assert [c for c, _, _ in chunks] == legacy_chunk_text("".join(p for p, _ in pieces))
+
+
+def test_code_chunker_cuts_at_functions_and_keeps_decorators():
+    from app.services.chunking_service import CodeChunker, _PY_BOUNDARY
+
+    functions = [
+        f"@decorator\ndef function_{i}(x):\n" + "".join(f"    x = x + {j}\n" for j in range(40)) + "    return x\n\n"
+        for i in range(6)
+    ]
+    source = "import os\n\n" + "".join(functions)
+    chunker = CodeChunker(_PY_BOUNDARY, target_tokens=200, max_tokens=300)
+    chunks = [c for c, _, _ in chunker.chunk([(source[:500], None), (source[500:], None)])]
+
+    assert "".join(chunks) == source
+    for chunk in chunks[1:]:
+        assert chunk.lstrip("\n").startswith("@decorator\ndef function_")
+
+
+def test_prose_chunker_tracks_pages_and_splits_long_paragraphs():
+    from app.core.tokens import estimate_tokens
+    from app.services.chunking_service import ProseChunker
+
+    page_one = "Intro paragraph.\n\n" + "A long sentence about retrieval. " * 200
+    pages = [(page_one, 1), ("\n# Heading\nSecond page text.\n", 2)]
+    chunks = list(ProseChunker(target_tokens=100, max_tokens=150).chunk(pages))
+
+    assert "".join(c for c, _, _ in chunks) == page_one + pages[1][0]
+    assert all(estimate_tokens(c) <= 150 for c, _, _ in chunks)
+    assert chunks[0][1] == 1
+    assert chunks[-1][0].startswith("# Heading") and chunks[-1][1:] == (2, 2)
+
+
+def test_line_token_counts_matches_estimate_tokens():
+    from app.core.tokens import estimate_tokens, line_token_counts
+
+    lines = ["", "def f(x):\n", "    return x  # comment\n", "a_very_long_identifier_name = 12345678\n", "   \n", "end"]
+    assert line_token_counts(lines) == [estimate_tokens(line) for line in lines]
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client.http import models
+
+from app.services.collection_profiles import (
+    PROFILES, create_collection_kwargs, get_profile, profile_mismatches, search_params,
+)
+
+
+def _info(quantization=None, vectors_on_disk=None, on_disk_payload=True, hnsw_on_disk=None, m=16):
+    return SimpleNamespace(config=SimpleNamespace(
+        params=SimpleNamespace(vectors=models.VectorParams(size=384, distance=models.Distance.COSINE,
+                                                           on_disk=vectors_on_disk),
+                               on_disk_payload=on_disk_payload),
+        hnsw_config=SimpleNamespace(m=m, ef_construct=100, on_disk=hnsw_on_disk),
+        quantization_config=quantization,
+    ))
+
+
+def test_profiles_map_to_qdrant_params():
+    assert search_params(PROFILES["memory"]) is None
+    assert search_params(PROFILES["memory"], hnsw_ef=128).hnsw_ef == 128
+    binary = search_params(PROFILES["binary"])
+    assert binary.quantization.rescore and binary.quantization.oversampling == 4.0
+    assert search_params(PROFILES["scalar"], oversampling=3).quantization.oversampling == 3
+
+    kwargs = create_collection_kwargs(PROFILES["scalar"], sparse=False)
+    assert kwargs["vectors_config"].on_disk and kwargs["on_disk_payload"]
+    assert isinstance(kwargs["quantization_config"], models.ScalarQuantization)
+    assert kwargs["sparse_vectors_config"] is None and kwargs["hnsw_config"] is None
+    assert create_collection_kwargs(PROFILES["disk"], m=32)["hnsw_config"].on_disk
+    with pytest.raises(ValueError):
+        get_profile("zstd")
+
+
+def test_profile_mismatches():
+    assert profile_mismatches(PROFILES["memory"], _info()) == []
+    assert profile_mismatches(PROFILES["memory"], _info(), m=32) == ["hnsw m 16 -> 32"]
+
+    scalar = models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8))
+    assert profile_mismatches(PROFILES["scalar"], _info(scalar, vectors_on_disk=True)) == []
+    assert profile_mismatches(PROFILES["binary"], _info(scalar, vectors_on_disk=True)) == [
+        "quantization scalar -> binary"
+    ]
+    assert len(profile_mismatches(PROFILES["disk"], _info())) == 2
@@ -0,0 +1,50 @@
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.models.schemas import ChatMessage, QueryRequest
+from app.services.chunking_service import chunk_text
+from app.services.context_builder import merge_hits, plan_prompt
+
+
+def _hit(i, filename, index, content, score, overlap=None):
+    payload = {"filename": filename, "chunk_index": index, "content": content}
+    if overlap:
+        payload["chunk_overlap"] = overlap
+    return models.ScoredPoint(id=i, version=0, score=score, payload=payload)
+
+
+def test_adjacent_chunks_are_merged_without_overlap():
+    text = "".join(f"line {i}\n" for i in range(600))
+    chunks = chunk_text(text)
+    hits = [_hit(1, "a.py", 1, chunks[1], 0.9, 200), _hit(2, "b.md", 0, "other", 0.95),
+            _hit(3, "a.py", 0, chunks[0], 0.8, 200)]
+
+    blocks, merged = merge_hits(hits)
+    assert merged == 1
+    assert [b.filename for b in blocks] == ["b.md", "a.py"]
+    assert blocks[1].content == text[:len(chunks[0]) + len(chunks[1]) - 200]
+
+    # Структурні чанки не перекриваються: спільний кінець/початок — це справжній текст
+    first, second = "    return x\n}\n", "}\nfn next() {\n"
+    blocks, _ = merge_hits([_hit(1, "c.rs", 0, first, 0.9), _hit(2, "c.rs", 1, second, 0.8)])
+    assert blocks[0].content == first + second
+
+
+def test_plan_prompt_respects_budget_and_keeps_latest_message():
+    history = [ChatMessage(role="user" if i % 2 == 0 else "assistant", content="word " * 400) for i in range(10)]
+    request = QueryRequest(messages=history + [ChatMessage(role="user", content="final question")])
+    hits = [_hit(i, f"f{i}.txt", 0, "token " * 1500, 1.0 - i / 10) for i in range(5)]
+
+    plan = plan_prompt(request, hits, ["unknown-model"])  # DEFAULT_PROMPT_TOKENS
+
+    assert plan.prompt_tokens <= plan.budget
+    assert plan.request.messages[-1].content == "final question"
+    assert plan.messages_dropped > 0 and plan.truncated
+    assert estimate_tokens(plan.context_str) <= plan.context_tokens
+    assert len(request.messages) == 11  # оригінальний запит не змінюється
+
+    # Запасна модель з меншим бюджетом обмежує весь промпт
+    fallback = plan_prompt(request, hits, [settings.MODEL_NAME, settings.LOCAL_MODEL_NAME])
+    assert fallback.budget == settings.PROMPT_TOKEN_BUDGETS[settings.LOCAL_MODEL_NAME]
+    assert fallback.prompt_tokens <= fallback.budget
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.embed_server import MicroBatcher, encode_message, read_message
+
+
+def test_micro_batcher_merges_concurrent_requests():
+    calls = []
+
+    def dense(texts):
+        calls.append(list(texts))
+        return [f"v:{t}" for t in texts]
+
+    async def run():
+        batcher = MicroBatcher({"dense": dense}, max_batch=256, max_wait_ms=20, executor=ThreadPoolExecutor(1))
+        loop_task = asyncio.create_task(batcher.run())
+        results = await asyncio.gather(*(batcher.submit("dense", [f"q{i}", f"r{i}"]) for i in range(5)))
+        loop_task.cancel()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    # Кожен запит отримує саме свої вектори, хоча модель викликалась один раз
+    assert results[3] == ["v:q3", "v:r3"]
+    assert len(calls) == 1 and len(calls[0]) == 10
+    assert stats["requests_per_call"] == 5
+
+
+def test_message_roundtrip():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_message({"ok": True, "count": 2}, b"\x00\x01\x02"))
+        reader.feed_eof()
+        return await read_message(reader)
+
+    assert asyncio.run(run()) == ({"ok": True, "count": 2}, b"\x00\x01\x02")
+
+
+def test_micro_batcher_never_exceeds_max_batch():
+    calls = []
+
+    def dense(texts):
+        calls.append(len(texts))
+        return list(texts)
+
+    async def run():
+        batcher = MicroBatcher({"dense": dense}, max_batch=8, max_wait_ms=20, executor=ThreadPoolExecutor(1))
+        loop_task = asyncio.create_task(batcher.run())
+        results = await asyncio.gather(*(batcher.submit("dense", [f"t{i}"] * n) for i, n in enumerate((3, 4, 5, 2))))
+        loop_task.cancel()
+        return results
+
+    results = asyncio.run(run())
+    # 3 + 4 влазять у 8, п'ятірка чекає наступного виклику разом із двійкою
+    assert calls == [7, 7]
+    assert [len(r) for r in results] == [3, 4, 5, 2]
@@ -0,0 +1,38 @@
+import sqlite3
+
+from app.services.file_catalog import FileCatalog
+
+
+def test_catalog_upsert_list_and_remove(tmp_path):
+    catalog = FileCatalog(str(tmp_path / "catalog.db"))
+    catalog.upsert("b.pdf", 10, 2048)
+    catalog.upsert("a.md", 3, 100)
+    catalog.upsert("b.pdf", 12)  # повторне завантаження без відомого розміру
+
+    assert catalog.count() == 2
+    assert [f["filename"] for f in catalog.list(0, 10)] == ["a.md", "b.pdf"]
+    assert [f["filename"] for f in catalog.list(1, 10)] == ["b.pdf"]
+    assert catalog.get("b.pdf")["chunks"] == 12
+    assert catalog.get("b.pdf")["size_bytes"] == 2048
+
+    catalog.remove("a.md")
+    catalog.replace_all({("default", "c.txt"): 5})
+    assert [f["filename"] for f in catalog.list()] == ["c.txt"]
+
+
+def test_catalog_is_scoped_by_workspace(tmp_path):
+    db = str(tmp_path / "catalog.db")
+    with sqlite3.connect(db) as conn:
+        # Каталог з часів до просторів
+        conn.execute("CREATE TABLE files (filename TEXT PRIMARY KEY, chunks INTEGER NOT NULL DEFAULT 0, "
+                     "size_bytes INTEGER, uploaded_at REAL NOT NULL)")
+        conn.execute("INSERT INTO files VALUES ('old.md', 4, 10, 0)")
+    catalog = FileCatalog(db)
+    assert catalog.get("old.md")["workspace"] == "default"
+
+    catalog.upsert("old.md", 7, workspace="team-b")
+    catalog.remove("old.md")
+    assert catalog.get("old.md") is None
+    assert catalog.get("old.md", "team-b")["chunks"] == 7
+    assert catalog.count() == 1 and catalog.count("default") == 0
+    assert catalog.workspaces() == [{"workspace": "team-b", "files": 1, "chunks": 7, "size_bytes": None}]
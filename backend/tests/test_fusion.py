@@ -0,0 +1,28 @@
+from qdrant_client.http import models
+
+from app.services.fusion import COSINE_KEY, SCORE_KIND_KEY, label_scores, rrf_fuse
+
+
+def _hits(*ids):
+    return [models.ScoredPoint(id=i, version=0, score=1.0 / n, payload={}) for n, i in enumerate(ids, start=1)]
+
+
+def test_rrf_rewards_agreement_and_respects_weights():
+    dense = _hits(1, 2, 3)
+    sparse = _hits(3, 4)
+
+    fused = rrf_fuse([(dense, 1.0), (sparse, 1.0)], k=60, limit=3)
+    assert [h.id for h in fused] == [3, 1, 2]  # 3 є в обох списках
+    assert fused[0].score == 1 / 63 + 1 / 61
+
+    sparse_only = rrf_fuse([(dense, 0.0), (sparse, 1.0)], k=60, limit=5)
+    assert [h.id for h in sparse_only] == [3, 4]
+
+
+def test_label_scores_keeps_cosine_for_display():
+    dense = label_scores(_hits(1, 2), "cosine")
+    assert dense[1].payload == {SCORE_KIND_KEY: "cosine", COSINE_KEY: 0.5}
+
+    fused = label_scores(rrf_fuse([(_hits(1, 2), 1.0), (_hits(3), 1.0)], k=60), "rrf", {1: 1.0, 2: 0.5})
+    assert {h.id: h.payload[COSINE_KEY] for h in fused} == {1: 1.0, 2: 0.5, 3: None}
+    assert all(h.payload[SCORE_KIND_KEY] == "rrf" for h in fused)
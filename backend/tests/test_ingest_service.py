@@ -0,0 +1,41 @@
+import asyncio
+
+from app.services import ingest_service
+from app.services.file_catalog import FileCatalog
+from app.services.source_tree import SourceFile
+
+
+def test_tree_indexer_handles_new_file_with_repeated_chunks(tmp_path, monkeypatch):
+    path = tmp_path / "rule.txt"
+    path.write_text("=" * 20000)
+    calls = {"added": [], "totals": []}
+    vs = ingest_service.vector_service
+
+    async def file_points(filename, workspace=None):
+        return {}
+
+    async def add_documents(texts, metas, wait=None):
+        calls["added"] += texts
+        return []
+
+    async def noop(items):
+        return None
+
+    async def set_file_payload(filename, payload, workspace=None):
+        calls["totals"].append((filename, payload["total_chunks"]))
+
+    monkeypatch.setattr(ingest_service, "file_catalog", FileCatalog(str(tmp_path / "catalog.db")))
+    monkeypatch.setattr(vs, "file_points", file_points)
+    monkeypatch.setattr(vs, "add_documents", add_documents)
+    monkeypatch.setattr(vs, "update_payloads", noop)
+    monkeypatch.setattr(vs, "delete_points", noop)
+    monkeypatch.setattr(vs, "set_file_payload", set_file_payload)
+
+    indexer = ingest_service.TreeIndexer("repo/")
+    report, = asyncio.run(indexer.run([SourceFile(str(path), "rule.txt", path.stat().st_size)]))
+
+    # Однакові вікна дають один і той самий point id: вбудовуємо лише унікальні
+    assert report["status"] == "indexed" and report["skipped"] > 0
+    assert len(calls["added"]) == report["chunks"] - report["skipped"]
+    assert calls["totals"] == [("repo/rule.txt", report["chunks"])]
+    assert ingest_service.file_catalog.get("repo/rule.txt")["chunks"] == report["chunks"]
@@ -0,0 +1,30 @@
+from app.services.job_store import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+def test_job_lifecycle(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    first = store.create("a.pdf", "/tmp/a.pdf", 100)
+    second = store.create("b.txt", "/tmp/b.txt", 10)
+
+    job = store.claim_next()
+    assert job["id"] == first and job["status"] == RUNNING
+    store.update_progress(first, 5)
+    store.finish(first, chunks_done=7)
+    assert store.get(first)["status"] == DONE
+    assert store.get(first)["chunks_done"] == 7
+
+    assert store.claim_next()["id"] == second
+    store.finish(second, error="Empty file")
+    assert store.get(second)["status"] == FAILED
+    assert store.claim_next() is None
+
+
+def test_running_jobs_are_requeued_after_restart(tmp_path):
+    db = str(tmp_path / "jobs.db")
+    store = JobStore(db)
+    job_id = store.create("a.pdf", "/tmp/a.pdf", 100)
+    store.claim_next()
+
+    restarted = JobStore(db)
+    assert restarted.requeue_interrupted() == 1
+    assert restarted.get(job_id)["status"] == QUEUED
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_router import CircuitBreaker, LLMRouter, Provider, ProviderUnavailable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubProvider(Provider):
+    def __init__(self, name, ttft=0.0, fail=False, tokens=("a", "b"), max_concurrency=4, gate=None):
+        super().__init__(name, f"{name}-model", max_concurrency)
+        self.delay, self.fail, self.tokens, self.gate = ttft, fail, tokens, gate
+        self.started = 0
+
+    async def _stream(self, messages, temperature):
+        self.started += 1
+        await asyncio.sleep(self.delay)
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("rate limited")
+        for token in self.tokens:
+            yield token
+
+
+def collect(router, candidates):
+    async def run():
+        return [item async for item in router.stream([], 0.3, candidates)]
+    return asyncio.run(run())
+
+
+def test_breaker_opens_after_failures_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()  # лише одна пробна спроба
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_router_falls_back_and_skips_open_breaker():
+    cloud, local = StubProvider("cloud", fail=True), StubProvider("local")
+    cloud.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    router = LLMRouter({"cloud": cloud, "local": local})
+
+    for _ in range(2):
+        assert collect(router, router.candidates("cloud")) == [("a", "local-model"), ("b", "local-model")]
+    assert cloud.started == 2 and cloud.breaker.state == "open"
+
+    # Breaker відкритий: хмару навіть не пробуємо
+    assert router.candidates("cloud") == [local]
+    collect(router, router.candidates("cloud"))
+    assert cloud.started == 2 and router.fallbacks == 2
+
+    with pytest.raises(ProviderUnavailable):
+        collect(router, [cloud])
+
+
+def test_router_hedges_slow_provider():
+    cloud, local = StubProvider("cloud", ttft=0.5), StubProvider("local", ttft=0.01)
+    router = LLMRouter({"cloud": cloud, "local": local}, hedge_ms=50)
+
+    assert collect(router, [cloud, local])[0] == ("a", "local-model")
+    assert router.hedges == 1 and router.hedge_wins == 1
+    # Хмара програла гонку: скасована, а не записана як збій
+    assert cloud.cancelled == 1 and cloud.failures == 0 and cloud.in_flight == 0
+
+    fast = LLMRouter({"cloud": StubProvider("cloud"), "local": local}, hedge_ms=50)
+    assert collect(fast, fast.candidates("cloud"))[0] == ("a", "cloud-model")
+    assert fast.hedges == 0
+
+
+def test_semaphore_limits_concurrent_generations(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUT", 0.05)
+    local = StubProvider("local", ttft=0.2, max_concurrency=1)
+    router = LLMRouter({"local": local})
+
+    async def run():
+        async def one():
+            return [item async for item in router.stream([], 0.3, [local])]
+        return await asyncio.gather(one(), one(), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert sum(isinstance(r, ProviderUnavailable) for r in results) == 1
+    assert local.rejected == 1 and local.started == 1
+
+
+def test_losers_that_finish_in_the_same_round_release_their_slot():
+    async def run():
+        gate = asyncio.Event()
+        cloud = StubProvider("cloud", gate=gate, max_concurrency=1)
+        local = StubProvider("local", gate=gate, max_concurrency=1)
+        router = LLMRouter({"cloud": cloud, "local": local}, hedge_ms=10)
+        asyncio.get_running_loop().call_later(0.05, gate.set)  # обидва дають перший токен в одному тіку
+        result = [item async for item in router.stream([], 0.3, [cloud, local])]
+        # Перевіряємо до виходу з asyncio.run: там незакриті генератори закрились би й самі
+        return result, cloud.in_flight, local.in_flight, cloud.cancelled + local.cancelled
+
+    result, cloud_in_flight, local_in_flight, cancelled = asyncio.run(run())
+    assert [delta for delta, _ in result] == ["a", "b"]
+    assert cloud_in_flight == local_in_flight == 0
+    assert cancelled == 1
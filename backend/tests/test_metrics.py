@@ -0,0 +1,27 @@
+from app.core.metrics import Histogram, stage
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value, stage="embed")
+    h.observe(0.2, stage='se"arch')
+
+    text = "\n".join(h.render())
+    assert 't_seconds_bucket{stage="embed",le="0.1"} 2' in text  # межа бакета включна (le)
+    assert 't_seconds_bucket{stage="embed",le="1.0"} 3' in text
+    assert 't_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 't_seconds_count{stage="embed"} 4' in text
+    assert 't_seconds_sum{stage="embed"} 3.65' in text
+    assert 'stage="se\\"arch"' in text
+
+
+def test_stage_records_duration_even_on_error():
+    h = Histogram("t_seconds", "Test.", ("stage",))
+    timings = {}
+    try:
+        with stage(h, "llm", timings):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert "llm" in timings and h.snapshot()[("llm",)]["count"] == 1
@@ -0,0 +1,44 @@
+from app.services.point_builder import ReindexPlan, build_points, point_id, search_filter
+
+
+def _metas(n, start=0):
+    return [{"filename": "doc.md", "chunk_index": start + i} for i in range(n)]
+
+
+def test_point_id_is_deterministic():
+    assert point_id("doc.md", "hello") == point_id("doc.md", "hello")
+    assert point_id("doc.md", "hello") != point_id("other.md", "hello")
+    points = build_points(["hello"], _metas(1), [[0.0]])
+    assert points[0].id == point_id("doc.md", "hello")
+
+
+def test_reindex_plan_embeds_only_changes():
+    existing = {
+        point_id("doc.md", "a"): {"chunk_index": 0},
+        point_id("doc.md", "b"): {"chunk_index": 1},
+        point_id("doc.md", "gone"): {"chunk_index": 2},
+    }
+    plan = ReindexPlan(existing)
+    # "new" вставлено на початок, тому "a" і "b" зсунулись
+    texts, metas, updates = plan.diff(["new", "a", "b", "a"], _metas(4))
+
+    assert texts == ["new"]
+    assert updates == [(point_id("doc.md", "a"), {"chunk_index": 1}), (point_id("doc.md", "b"), {"chunk_index": 2})]
+    assert plan.removed_ids() == [point_id("doc.md", "gone")]
+    assert plan.stats(4) == {"chunks": 4, "skipped": 3, "updated": 1, "removed": 1}
+
+
+def test_points_are_scoped_by_workspace():
+    # Простір за замовчуванням зберігає старі ID, інші простори отримують власні
+    assert point_id("doc.md", "hello", "default") == point_id("doc.md", "hello")
+    assert point_id("doc.md", "hello", "team-b") != point_id("doc.md", "hello")
+
+    metas = [{"filename": "src/App.PY", "chunk_index": 0, "workspace": "team-b"}, {"filename": "doc.md"}]
+    points = build_points(["a", "b"], metas, [[0.0], [0.0]])
+    assert points[0].id == point_id("src/App.PY", "a", "team-b")
+    assert points[0].payload["extension"] == ".py"
+    assert points[1].payload["workspace"] == "default"
+
+    conditions = search_filter("team-b", ["doc.md"], ["MD", ".py"]).must
+    assert [c.key for c in conditions] == ["workspace", "filename", "extension"]
+    assert conditions[2].match.any == [".md", ".py"]
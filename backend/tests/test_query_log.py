@@ -0,0 +1,51 @@
+from app.services.analytics_service import AnalyticsEngine
+from app.services.query_log import QueryLog
+
+
+def test_rows_are_flushed_in_background_and_feed_analytics(tmp_path):
+    engine = AnalyticsEngine(str(tmp_path / "snapshot.json"))
+    log = QueryLog(str(tmp_path / "logs.db"), analytics=engine)
+    log.start()
+    log.log_query("1", "hi", "hello", "groq-model", "mentor", "cloud", 1.0, {"embed": 0.1, "llm": 0.8})
+    log.log_query("2", "hi again", "hello", "local-model", "auditor", "local", 3.0, cached=True)
+    log.log_feedback("1", "positive")
+    log.stop()
+
+    assert log.stats()["written"] == 3
+    assert [row[1] for row in log.iter_queries()] == ["groq-model", "local-model"]
+    assert list(log.iter_feedback())[0][1] == "positive"
+
+    # Після рестарту агрегати піднімаються зі снапшоту, а без нього — з логу
+    live = engine.snapshot()
+    restored = QueryLog(str(tmp_path / "logs.db"), analytics=AnalyticsEngine(str(tmp_path / "snapshot.json")))
+    restored.start()
+    rebuilt = QueryLog(str(tmp_path / "logs.db"), analytics=AnalyticsEngine(str(tmp_path / "missing.json")))
+    rebuilt.start()
+    for other in (restored, rebuilt):
+        snap = other.analytics.snapshot()
+        other.stop()
+        assert snap["total"] == live["total"] == 2
+        assert snap["models"] == live["models"]
+        assert snap["feedback"]["1h"]["positive"] == 1
+
+
+def test_workers_share_analytics_through_the_log(tmp_path):
+    # Два воркери: спільні logs.db і снапшот, окремі рушії
+    snapshot, db = str(tmp_path / "snapshot.json"), str(tmp_path / "logs.db")
+    first = QueryLog(db, analytics=AnalyticsEngine(snapshot))
+    second = QueryLog(db, analytics=AnalyticsEngine(snapshot))
+    first.start()
+    second.start()
+    first.log_query("1", "q", "a", "groq-model", "mentor", "cloud", 1.0)
+    second.log_query("2", "q", "a", "local-model", "mentor", "local", 2.0)
+    second.log_feedback("1", "negative")
+    first.stop()
+    second.stop()
+
+    for log in (first, second):
+        log.sync_analytics()
+        snap = log.analytics.snapshot()
+        assert snap["total"] == 2 and snap["dislikes"] == 1
+        assert snap["models"] == {"groq-model": 1, "local-model": 1}
+    # Снапшот пише лише власник flock
+    assert [log.analytics.save() for log in (first, second)].count(True) == 1
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from qdrant_client.http import models
+
+from app.services.rerank_service import RerankService
+
+
+class FakeCrossEncoder:
+    """Score = how many query words the chunk contains."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def rerank(self, query, documents, batch_size=64):
+        self.calls += 1
+        time.sleep(self.delay)
+        words = query.split()
+        return [float(sum(w in doc for w in words)) for doc in documents]
+
+
+def _hits(*contents):
+    return [
+        models.ScoredPoint(id=i, version=0, score=1.0 - i / 10, payload={"content": c})
+        for i, c in enumerate(contents)
+    ]
+
+
+def test_rerank_reorders_and_caches_scores():
+    model = FakeCrossEncoder()
+    service = RerankService(model=model)
+    hits = _hits("nothing here", "parse file", "parse")
+
+    top = asyncio.run(service.rerank("parse file", hits, top_k=2, budget_ms=1000))
+    assert [h.id for h in top] == [1, 2]
+    assert top[0].score == 2.0
+
+    asyncio.run(service.rerank("parse file", hits, top_k=2, budget_ms=1000))
+    assert model.calls == 1  # другий раз усе з кешу
+    assert service.stats()["cache_hits"] == 3
+
+
+def test_rerank_falls_back_to_vector_order_when_over_budget():
+    service = RerankService(model=FakeCrossEncoder(delay=0.05))
+    hits = _hits(*[f"chunk {i}" for i in range(40)])
+
+    top = asyncio.run(service.rerank("chunk 39", hits, top_k=3, budget_ms=10))
+    assert [h.id for h in top] == [0, 1, 2]
+    assert service.stats()["budget_fallbacks"] == 1
@@ -0,0 +1,84 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from app.services.source_tree import ArchiveError, GitIgnore, extract_archive, is_ignored, walk_tree
+
+
+def test_gitignore_rules():
+    rules = (GitIgnore(["# comment", "*.log", "build/", "/secret.env", "docs/**/*.tmp", "!keep.log"]),)
+
+    assert is_ignored(rules, "app.log", False)
+    assert is_ignored(rules, "src/deep/debug.log", False)
+    assert not is_ignored(rules, "src/keep.log", False)
+    assert is_ignored(rules, "src/build", True)
+    assert not is_ignored(rules, "src/build", False)  # лише каталоги
+    assert is_ignored(rules, "secret.env", False)
+    assert not is_ignored(rules, "config/secret.env", False)  # правило прив'язане до кореня
+    assert is_ignored(rules, "docs/a/b/x.tmp", False)
+    assert not is_ignored(rules, "src/x.tmp", False)
+
+    nested = rules + (GitIgnore(["!debug.log"], base="src"),)
+    assert not is_ignored(nested, "src/debug.log", False)
+    assert is_ignored(nested, "other/debug.log", False)
+
+
+def test_walk_tree_honours_gitignore_and_limits(tmp_path):
+    (tmp_path / ".gitignore").write_text("dist/\n*.min.js\n")
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / ".gitignore").write_text("generated_*.py\n")
+    (tmp_path / "src" / "main.py").write_text("print('hi')\n")
+    (tmp_path / "src" / "pkg" / "util.py").write_text("x = 1\n")
+    (tmp_path / "src" / "pkg" / "generated_api.py").write_text("x = 2\n")
+    (tmp_path / "src" / "app.min.js").write_text("var a=1;")
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / "bundle.js").write_text("var b=2;")
+    (tmp_path / "node_modules" / "lib").mkdir(parents=True)
+    (tmp_path / "node_modules" / "lib" / "index.js").write_text("module.exports = 1;")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    (tmp_path / "huge.txt").write_text("a" * 2048)
+    (tmp_path / "README.md").write_text("# Readme\n")
+
+    result = walk_tree(str(tmp_path), max_file_bytes=1024, workers=3)
+
+    assert [f.rel_path for f in result.files] == ["README.md", "src/main.py", "src/pkg/util.py"]
+    assert result.skipped == {"gitignored": 2, "unsupported": 3, "too_large": 1}  # png + два .gitignore
+
+    with pytest.raises(ArchiveError):
+        walk_tree(str(tmp_path), max_file_bytes=1024, max_files=2)
+
+
+def test_extract_archive_drops_unsafe_members(tmp_path):
+    zip_path = tmp_path / "repo.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("repo/main.py", "print('ok')\n")
+        archive.writestr("../escape.py", "boom")
+        archive.writestr("/abs.py", "boom")
+
+    dest = tmp_path / "out"
+    dest.mkdir()
+    assert extract_archive(str(zip_path), "repo.zip", str(dest)) == 1
+    assert (dest / "repo" / "main.py").read_text() == "print('ok')\n"
+    assert not (tmp_path / "escape.py").exists()
+
+    tar_path = tmp_path / "repo.tar.gz"
+    with tarfile.open(tar_path, "w:gz") as archive:
+        data = b"x" * 4096
+        info = tarfile.TarInfo("big.txt")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo("link.py")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        archive.addfile(link)
+
+    from app.core.config import settings
+    original = settings.INGEST_MAX_EXTRACTED_MB
+    settings.INGEST_MAX_EXTRACTED_MB = 1 / 1024  # 1 KB
+    try:
+        with pytest.raises(ArchiveError):
+            extract_archive(str(tar_path), "repo.tar.gz", str(tmp_path / "tar_out"))
+    finally:
+        settings.INGEST_MAX_EXTRACTED_MB = original
@@ -0,0 +1,65 @@
+import asyncio
+
+from app.core.config import settings
+from app.services import startup
+from app.services.startup import Readiness
+
+
+def test_warm_up_retries_qdrant_until_ready(monkeypatch):
+    vs = startup.vector_service
+    calls = []
+
+    async def flaky_ensure_collection():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("connection refused")
+
+    async def fake_embed(texts):
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "COLLECTION_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(vs, "load", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(vs, "ensure_collection", flaky_ensure_collection)
+    monkeypatch.setattr(vs, "embed", fake_embed)
+    monkeypatch.setattr(vs, "points_count", 0)
+    monkeypatch.setattr(startup.rerank_service, "load", lambda: None)
+
+    readiness = Readiness()
+    assert readiness.status()["status"] == "starting"
+    asyncio.run(readiness.warm_up())
+
+    assert readiness.ready and readiness.attempts == 3 and readiness.last_error is None
+    assert set(readiness.status()["timings"]) >= {"models", "qdrant", "warmup_embed", "total"}
+
+
+def test_warm_up_retries_other_stages_then_fails_liveness(monkeypatch):
+    vs = startup.vector_service
+    loads = []
+
+    async def flaky_load():
+        loads.append(1)
+        if len(loads) < 2:
+            raise OSError("model download failed")
+
+    async def broken_embed(texts):
+        raise RuntimeError("onnx session crashed")
+
+    async def ok():
+        return None
+
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STARTUP_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(vs, "load", flaky_load)
+    monkeypatch.setattr(vs, "ensure_collection", ok)
+    monkeypatch.setattr(vs, "embed", broken_embed)
+    monkeypatch.setattr(vs, "points_count", 0)
+    monkeypatch.setattr(startup.rerank_service, "load", lambda: None)
+
+    readiness = Readiness()
+    asyncio.run(readiness.warm_up())
+
+    assert len(loads) == 2 and "models" in readiness.timings
+    assert readiness.failed and not readiness.ready
+    assert readiness.status()["status"] == "error" and readiness.stage == "warmup_embed"
+    assert readiness.last_error == "warmup_embed: onnx session crashed"
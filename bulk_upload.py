@@ -1,10 +1,17 @@
+import argparse
 import os
 import requests
+import tempfile
 import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Налаштування
 FOLDER_PATH = "books_to_test"  # Папка з книгами
 API_URL = "http://127.0.0.1:8000/upload"
+JOBS_URL = "http://127.0.0.1:8000/jobs"
+ARCHIVE_URL = "http://127.0.0.1:8000/upload/archive"
+POLL_INTERVAL = 1.0
 
 def bulk_upload():
     if not os.path.exists(FOLDER_PATH):
@@ -42,5 +49,103 @@ def bulk_upload():
     print("-" * 30)
     print(f"🏁 Стрес-тест завантаження завершено за {total_time:.2f}s")
 
+def _submit_job(filename):
+    file_path = os.path.join(FOLDER_PATH, filename)
+    with open(file_path, 'rb') as f:
+        response = requests.post(f"{JOBS_URL}/upload", files={"file": (filename, f)})
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+def bulk_upload_concurrent(concurrency):
+    """Відправляє всі файли паралельно в чергу /jobs і чекає, поки воркери їх проіндексують."""
+    if not os.path.exists(FOLDER_PATH):
+        print(f"❌ Папка {FOLDER_PATH} не знайдена!")
+        return
+
+    files = [f for f in os.listdir(FOLDER_PATH) if f.endswith(('.pdf', '.txt', '.md'))]
+    print(f"📦 Знайдено файлів: {len(files)} (паралельно: {concurrency})")
+    print("-" * 30)
+
+    total_start = time.time()
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for filename, future in [(f, pool.submit(_submit_job, f)) for f in files]:
+            try:
+                jobs[future.result()] = filename
+                print(f"📨 В черзі: {filename}")
+            except Exception as e:
+                print(f"❌ {filename}: {e}")
+
+    pending = set(jobs)
+    total_chunks = 0
+    total_bytes = 0
+    while pending:
+        time.sleep(POLL_INTERVAL)
+        for job_id in list(pending):
+            job = requests.get(f"{JOBS_URL}/{job_id}").json()
+            if job["status"] == "done":
+                pending.discard(job_id)
+                total_chunks += job["chunks_done"]
+                total_bytes += job["size_bytes"]
+                print(f"✅ {job['filename']}: {job['chunks_done']} chunks [{job['elapsed']:.2f}s, {job['chunks_per_sec']} chunks/s]")
+            elif job["status"] == "failed":
+                pending.discard(job_id)
+                print(f"❌ {job['filename']}: {job['error']}")
+
+    total_time = time.time() - total_start
+    print("-" * 30)
+    print(f"🏁 Завершено за {total_time:.2f}s: {total_chunks} chunks, "
+          f"{total_chunks / total_time:.1f} chunks/s, {total_bytes / (1024 * 1024) / total_time:.2f} MB/s")
+
+def bulk_upload_archive(folder):
+    """Пакує всю папку (код, документи, .gitignore) в один zip і індексує її одним запитом."""
+    if not os.path.isdir(folder):
+        print(f"❌ Папка {folder} не знайдена!")
+        return
+
+    total_start = time.time()
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        archive_path = tmp.name
+    try:
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for dirpath, dirnames, filenames in os.walk(folder):
+                dirnames[:] = [d for d in dirnames if d not in (".git", "node_modules")]
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    archive.write(path, os.path.relpath(path, folder))
+        name = os.path.basename(os.path.abspath(folder)) + ".zip"
+        print(f"📦 Архів: {os.path.getsize(archive_path) / (1024 * 1024):.2f} MB")
+        with open(archive_path, "rb") as f:
+            response = requests.post(ARCHIVE_URL, files={"file": (name, f)})
+    finally:
+        os.remove(archive_path)
+
+    if response.status_code != 200:
+        print(f"❌ Помилка: {response.status_code} - {response.text}")
+        return
+    data = response.json()
+    for item in data["files"]:
+        if item["status"] == "failed":
+            print(f"❌ {item['filename']}: {item['error']}")
+        else:
+            print(f"✅ {item['filename']}: {item['chunks']} chunks ({item['status']}) [{item['mb_per_sec']} MB/s]")
+    print("-" * 30)
+    print(f"🏁 {data['files_indexed']} проіндексовано, {data['files_unchanged']} без змін, {data['files_failed']} з помилками, "
+          f"пропущено: {data['files_skipped']}")
+    print(f"🏁 Сервер: {data['duration']:.2f}s, {data['chunks_per_sec']} chunks/s, {data['mb_per_sec']} MB/s; "
+          f"разом з пакуванням і передачею: {time.time() - total_start:.2f}s")
+
 if __name__ == "__main__":
-    bulk_upload()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Bulk upload of a folder into Vectrieve")
+    parser.add_argument("--concurrent", type=int, default=0, metavar="N",
+                        help="Use the background job queue with N parallel submissions (0 = old serial /upload)")
+    parser.add_argument("--archive", metavar="DIR", nargs="?", const=FOLDER_PATH,
+                        help="Zip the folder (or DIR) and index it in one /upload/archive request")
+    args = parser.parse_args()
+
+    if args.archive:
+        bulk_upload_archive(args.archive)
+    elif args.concurrent > 0:
+        bulk_upload_concurrent(args.concurrent)
+    else:
+        bulk_upload()
\ No newline at end of file
@@ -13,7 +13,9 @@ export interface Message {
 export interface Source {
   filename: string;
   content: string;
-  score: number;
+  score: number | null; // косинусна схожість; null, якщо джерело знайшов лише BM25
+  rank_score?: number;
+  score_kind?: string; // cosine | bm25 | rrf | rerank
 }
 
 export async function checkHealth() {
@@ -62,9 +64,17 @@ export async function uploadFile(file: File) {
   return response.json();
 }
 
+// /files віддає сторінками (limit до 1000), тож догортаємо до total
 export async function getFiles() {
-  const response = await fetch(`${API_URL}/files`);
-  return response.json().then((data) => data.files || []);
+  const pageSize = 1000;
+  const files: string[] = [];
+  for (let offset = 0; ; offset += pageSize) {
+    const response = await fetch(`${API_URL}/files?offset=${offset}&limit=${pageSize}`);
+    const data = await response.json();
+    const page: string[] = data.files || [];
+    files.push(...page);
+    if (page.length < pageSize || files.length >= (data.total ?? 0)) return files;
+  }
 }
 
 export async function deleteFile(filename: string) {